@@ -0,0 +1,41 @@
+from typing import Any, Dict
+
+from .rate_limiter import QuotaExceededError
+from .resilience import CircuitOpenError
+from .token_budget import PromptTooLargeError
+
+# Errors that mean "try again later" wherever an AI-backed call is made
+RETRY_LATER_ERRORS = (QuotaExceededError, CircuitOpenError)
+
+
+def retry_later_error(error: Exception) -> Dict[str, Any]:
+    """Status, message and Retry-After seconds for a RETRY_LATER_ERRORS error"""
+    if isinstance(error, QuotaExceededError):
+        return {'status': 429, 'message': 'Token quota exceeded, try again later', 'retryAfter': round(error.retry_after)}
+    return {'status': 503, 'message': 'Upstream service unavailable, try again later', 'retryAfter': round(error.retry_after)}
+
+
+def retry_later_response(error: Exception) -> Dict[str, Any]:
+    """API response for a RETRY_LATER_ERRORS error"""
+    body = retry_later_error(error)
+    return {
+        'status': body.pop('status'),
+        'headers': {'Retry-After': str(body['retryAfter'])},
+        'body': body,
+    }
+
+
+def prompt_too_large_error(error: PromptTooLargeError) -> Dict[str, Any]:
+    """Status and message for a request whose prompt cannot fit the model"""
+    return {
+        'status': 400,
+        'message': 'Request is too long for the model',
+        'promptTokens': error.tokens,
+        'maxPromptTokens': error.budget,
+    }
+
+
+def prompt_too_large_response(error: PromptTooLargeError) -> Dict[str, Any]:
+    """API response for a request whose prompt cannot fit the model"""
+    body = prompt_too_large_error(error)
+    return {'status': body.pop('status'), 'body': body}
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .database_service import database_service
+from .rate_limiter import BATCH
+from .request_context import start_deadline
+from .token_budget import token_budget
+
+# Once unsummarized turns exceed this many tokens, older ones are folded into the summary
+HISTORY_TOKEN_THRESHOLD = int(os.getenv('CHAT_HISTORY_MAX_TOKENS', '1500'))
+# Most recent turns always kept verbatim (one user/assistant exchange is two turns)
+RECENT_TURNS_KEPT = int(os.getenv('CHAT_RECENT_TURNS', '4'))
+# Sessions idle for longer than this are deleted with their turns
+SESSION_TTL = float(os.getenv('CHAT_SESSION_TTL_SECONDS', '604800'))
+
+SUMMARY_PROMPT = """Update the running summary of a conversation about a research source.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+
+Return only the updated summary, at most 200 words. Keep the user's goals, questions already answered and any conclusions reached."""
+
+
+class ChatSessionService:
+    """Server-side chat sessions whose older turns are folded into a rolling summary.
+
+    The prompt for each message carries the summary plus the recent turns,
+    so its size stays bounded however long the conversation gets. Folding
+    runs in a background task, so responses never wait on the summary.
+    """
+
+    def __init__(self, threshold: int = HISTORY_TOKEN_THRESHOLD, recent_turns: int = RECENT_TURNS_KEPT,
+                 session_ttl: float = SESSION_TTL):
+        self.threshold = threshold
+        self.recent_turns = recent_turns
+        self.session_ttl = session_ttl
+        # Sessions being summarized, and the tasks doing it
+        self._summarizing = set()
+        self._summaries = set()
+
+    async def open(self, session_id: Optional[str], source_id: int, user_id: str) -> Optional[Dict[str, Any]]:
+        """Load the caller's session, or start one when no ID is given.
+
+        None if the ID is unknown or the session belongs to another user or source.
+        """
+        await database_service.create_chat_tables()
+        if not session_id:
+            await database_service.delete_idle_chat_sessions(self.session_ttl)
+            session_id = str(uuid.uuid4())
+            await database_service.create_chat_session(session_id, source_id, user_id)
+            return {'id': session_id, 'source_id': source_id, 'user_id': user_id, 'summary': None, 'turns': []}
+
+        session = await database_service.get_chat_session(session_id)
+        if session is None or session['source_id'] != source_id or session['user_id'] != user_id:
+            return None
+        return session
+
+    def history_messages(self, session: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Chat messages carrying the session's context into the next prompt"""
+        messages = []
+        if session['summary']:
+            messages.append({'role': 'system', 'content': f"Summary of the conversation so far:\n{session['summary']}"})
+        messages.extend({'role': turn['role'], 'content': turn['content']} for turn in session['turns'])
+        return messages
+
+    async def record_exchange(self, session: Dict[str, Any], user_message: str, answer: str, openai, logger):
+        """Store a question and answer, folding older turns in the background once over the threshold"""
+        turns = [
+            {'role': 'user', 'content': user_message, 'tokens': token_budget.count(user_message, openai.model)},
+            {'role': 'assistant', 'content': answer, 'tokens': token_budget.count(answer, openai.model)},
+        ]
+        ids = await database_service.add_chat_turns(session['id'], turns)
+        for turn, turn_id in zip(turns, ids):
+            turn['id'] = turn_id
+        session['turns'].extend(turns)
+
+        if self._needs_folding(session) and session['id'] not in self._summarizing:
+            self._summarizing.add(session['id'])
+            task = asyncio.get_running_loop().create_task(self._fold(session['id'], openai, logger))
+            self._summaries.add(task)
+            task.add_done_callback(self._summaries.discard)
+
+    def _needs_folding(self, session: Dict[str, Any]) -> bool:
+        history_tokens = sum(turn['tokens'] for turn in session['turns'])
+        return history_tokens > self.threshold and len(session['turns']) > self.recent_turns
+
+    async def _fold(self, session_id: str, openai, logger):
+        """Fold all but the recent turns of a session into its summary"""
+        # The task copied the request's context; give it its own time budget
+        start_deadline()
+        try:
+            # Reloaded so turns folded since the request read the session are skipped
+            session = await database_service.get_chat_session(session_id)
+            if session is None or not self._needs_folding(session):
+                return
+            history_tokens = sum(turn['tokens'] for turn in session['turns'])
+            folded = session['turns'][:-self.recent_turns]
+            try:
+                summary = await self.summarize(session['summary'], folded, openai, logger)
+            except Exception as error:
+                # The turns stay unsummarized and are retried after the next message
+                logger.warn('Chat summarization failed', {'sessionId': session_id, 'error': str(error)})
+                return
+
+            await database_service.save_chat_summary(session_id, summary, folded[-1]['id'])
+            logger.info('Folded chat turns into summary', {
+                'sessionId': session_id,
+                'foldedTurns': len(folded),
+                'historyTokensBefore': history_tokens,
+                'historyTokensAfter': token_budget.count(summary, openai.model) + sum(
+                    turn['tokens'] for turn in session['turns'][-self.recent_turns:]
+                ),
+            })
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def wait_for_summaries(self):
+        """Wait for background summarization to finish, e.g. at shutdown"""
+        while self._summaries:
+            await asyncio.gather(*self._summaries, return_exceptions=True)
+
+    async def summarize(self, summary: Optional[str], turns: List[Dict[str, Any]], openai, logger) -> str:
+        transcript = '\n'.join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        response = await openai.create_completion(
+            messages=[
+                {'role': 'system', 'content': 'You summarize conversations concisely and faithfully.'},
+                {'role': 'user', 'content': SUMMARY_PROMPT.format(summary=summary or '(none)', turns=transcript)},
+            ],
+            temperature=0.2,
+            max_tokens=400,
+            logger=logger,
+            priority=BATCH,
+        )
+        return response.choices[0].message.content.strip()
+
+
+chat_session_service = ChatSessionService()
@@ -1,17 +1,95 @@
+import json
 import sqlite3
 import os
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
+from .request_context import remaining_time
+from .ttl_cache import MISSING, TTLCache
+from .types import SOURCE_COLUMNS, Source
+
+# Seconds to wait for a locked database (sqlite3's default)
+DB_LOCK_TIMEOUT = 5.0
+
+# Parsed source records are cached so hot sources never touch SQLite. Unknown
+# IDs are cached briefly too; set the negative TTL to 0 to disable that.
+SOURCE_CACHE_SIZE = int(os.getenv('SOURCE_CACHE_SIZE', '512'))
+SOURCE_CACHE_TTL = float(os.getenv('SOURCE_CACHE_TTL_SECONDS', '300'))
+SOURCE_CACHE_NEGATIVE_TTL = float(os.getenv('SOURCE_CACHE_NEGATIVE_TTL_SECONDS', '30'))
+
+# Mode preferences are only written through this service, so the cache is
+# updated on write and the TTL just bounds staleness across processes
+MODE_CACHE_SIZE = int(os.getenv('MODE_CACHE_SIZE', '4096'))
+MODE_CACHE_TTL = float(os.getenv('MODE_CACHE_TTL_SECONDS', '3600'))
+
+def facet_key(value: Any) -> Optional[str]:
+    """Normalized form of a field or type, compared by equality in filters"""
+    if value is None:
+        return None
+    return ' '.join(str(value).lower().split()) or None
+
+def year_range(filters: Dict[str, Any]):
+    """(from, to) years of a filter; an exact year sets both"""
+    if filters.get('year'):
+        return int(filters['year']), int(filters['year'])
+    year_from = int(filters['yearFrom']) if filters.get('yearFrom') else None
+    year_to = int(filters['yearTo']) if filters.get('yearTo') else None
+    return year_from, year_to
+
+def query_match_condition(query: str):
+    """SQL condition matching sources whose title or abstract contains every word of query"""
+    terms = query.split() or [query]
+    condition = ' AND '.join('(title LIKE ? OR abstract LIKE ?)' for _ in terms)
+    params = [pattern for term in terms for pattern in (f'%{term}%', f'%{term}%')]
+    return f'({condition})', params
+
+def source_filter_conditions(filters: Dict[str, Any]):
+    """SQL conditions for field, type and year filters, and their parameters"""
+    conditions, params = [], []
+    if facet_key(filters.get('field')):
+        conditions.append('field_key = ?')
+        params.append(facet_key(filters['field']))
+    if facet_key(filters.get('type')):
+        conditions.append('type_key = ?')
+        params.append(facet_key(filters['type']))
+    year_from, year_to = year_range(filters)
+    if year_from is not None:
+        conditions.append('year >= ?')
+        params.append(year_from)
+    if year_to is not None:
+        conditions.append('year <= ?')
+        params.append(year_to)
+    return conditions, params
 
 class DatabaseService:
     def __init__(self):
         # Use SQLite for development
         self.db_path = os.path.join(os.getcwd(), 'researchly.db')
+        self.source_cache = TTLCache(SOURCE_CACHE_SIZE, SOURCE_CACHE_TTL)
+        self.mode_cache = TTLCache(MODE_CACHE_SIZE, MODE_CACHE_TTL)
+        # Called with the source's fields after it is inserted or updated, so
+        # caches derived from search results can drop entries it now matches
+        self.source_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._sources_table_ready = False
+        self._artifacts_table_ready = False
+    
+    def use_database(self, db_path: str):
+        """Switch to another database file, dropping state cached from the old one"""
+        self.db_path = db_path
+        self.source_cache.clear()
+        self.mode_cache.clear()
+        self._sources_table_ready = False
+        self._artifacts_table_ready = False
         
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        # Never wait on a locked database past the request's deadline. Unlocked
+        # queries are local and cheap, so finished work can still be saved late.
+        remaining = remaining_time()
+        timeout = DB_LOCK_TIMEOUT if remaining is None else min(DB_LOCK_TIMEOUT, remaining)
+        return sqlite3.connect(self.db_path, timeout=timeout)
     
     async def create_sources_table(self):
-        """Create sources table if it doesn't exist"""
+        """Create sources table if it doesn't exist, adding facet columns to older tables"""
+        if self._sources_table_ready:
+            return
         with self.get_connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS sources (
@@ -23,18 +101,34 @@ class DatabaseService:
                     year INTEGER,
                     field TEXT,
                     type TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    field_key TEXT,  -- facet_key(field)
+                    type_key TEXT  -- facet_key(type)
                 )
             """)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(sources)')}
+            if 'field_key' not in columns:
+                conn.execute('ALTER TABLE sources ADD COLUMN field_key TEXT')
+                conn.execute('ALTER TABLE sources ADD COLUMN type_key TEXT')
+                rows = conn.execute('SELECT id, field, type FROM sources').fetchall()
+                conn.executemany(
+                    'UPDATE sources SET field_key = ?, type_key = ? WHERE id = ?',
+                    [(facet_key(field), facet_key(source_type), source_id) for source_id, field, source_type in rows]
+                )
+            # Equality and year-range filters on the facet columns are served by these
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sources_field_year ON sources (field_key, year)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sources_type_year ON sources (type_key, year)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sources_year ON sources (year)')
             conn.commit()
+        self._sources_table_ready = True
     
     async def insert_source(self, source: Dict[str, Any]) -> int:
         """Insert a source and return its ID"""
         with self.get_connection() as conn:
             cur = conn.cursor()
             cur.execute("""
-                INSERT INTO sources (title, authors, abstract, url, year, field, type)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO sources (title, authors, abstract, url, year, field, type, field_key, type_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 source.get('title'),
                 str(source.get('authors', [])),
@@ -42,76 +136,493 @@ class DatabaseService:
                 source.get('url'),
                 source.get('year'),
                 source.get('field'),
-                source.get('type')
+                source.get('type'),
+                facet_key(source.get('field')),
+                facet_key(source.get('type'))
             ))
             conn.commit()
-            return cur.lastrowid
+            # Drop any cached "not found" for the new ID
+            self.source_cache.invalidate(cur.lastrowid)
+        self._notify_source_change(source)
+        return cur.lastrowid
     
-    async def search_sources(self, query: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Search sources with filters"""
+    async def search_sources(self, query: str, filters: Dict[str, Any]) -> List[Source]:
+        """Search sources containing every word of query, with filters"""
         with self.get_connection() as conn:
             cur = conn.cursor()
+            cur.row_factory = Source.from_row
             
             # Build query with filters
-            sql = """
-                SELECT id, title, authors, abstract, url, year, field, type, created_at
+            match, match_params = query_match_condition(query)
+            conditions, params = source_filter_conditions(filters)
+            sql = f"""
+                SELECT {SOURCE_COLUMNS}
                 FROM sources
-                WHERE title LIKE ? OR abstract LIKE ?
+                WHERE {match}
             """
-            params = [f'%{query}%', f'%{query}%']
-            
-            if filters.get('year'):
-                sql += " AND year = ?"
-                params.append(filters['year'])
-            
-            if filters.get('field'):
-                sql += " AND field LIKE ?"
-                params.append(f'%{filters["field"]}%')
-            
-            if filters.get('type'):
-                sql += " AND type LIKE ?"
-                params.append(f'%{filters["type"]}%')
+            params = match_params + params
+            if conditions:
+                sql += ' AND ' + ' AND '.join(conditions)
             
             sql += " ORDER BY created_at DESC"
             
             cur.execute(sql, params)
-            rows = cur.fetchall()
-            
-            results = []
-            for row in rows:
-                results.append({
-                    'id': row[0],
-                    'title': row[1],
-                    'authors': eval(row[2]) if row[2] else [],  # Convert string back to list
-                    'abstract': row[3],
-                    'url': row[4],
-                    'year': row[5],
-                    'field': row[6],
-                    'type': row[7],
-                    'created_at': row[8]
-                })
-            
-            return results
-    async def get_source_by_id(self, source_id: int) -> Dict[str, Any]:
-        """Get a source by its ID"""
+            return cur.fetchall()
+    
+    async def source_facets(self, query: str, filters: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Field, type and year counts for sources matching the query.
+
+        Each facet counts matches under every filter except its own, so the
+        client can show the alternatives to a selected value. All three come
+        from one grouped pass over the matching rows.
+        """
+        match, params = query_match_condition(query)
+        with self.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT field_key, MIN(field), type_key, MIN(type), year, COUNT(*)
+                FROM sources
+                WHERE {match}
+                GROUP BY field_key, type_key, year
+            """, params).fetchall()
+        
+        field, source_type = facet_key(filters.get('field')), facet_key(filters.get('type'))
+        year_from, year_to = year_range(filters)
+        counts = {'field': {}, 'type': {}, 'year': {}}
+        labels = {'field': {}, 'type': {}}
+
+        def add(facet, key, label, count):
+            counts[facet][key] = counts[facet].get(key, 0) + count
+            if facet in labels:
+                # Label each value with the spelling of its largest group, whitespace collapsed
+                label = ' '.join(label.split())
+                best = labels[facet].get(key)
+                if best is None or (count, best[1]) > (best[0], label):
+                    labels[facet][key] = (count, label)
+
+        for field_key_value, field_label, type_key_value, type_label, year, count in rows:
+            field_ok = field is None or field_key_value == field
+            type_ok = source_type is None or type_key_value == source_type
+            year_ok = (year_from is None or (year is not None and year >= year_from)) and \
+                (year_to is None or (year is not None and year <= year_to))
+            if type_ok and year_ok and field_key_value is not None:
+                add('field', field_key_value, field_label, count)
+            if field_ok and year_ok and type_key_value is not None:
+                add('type', type_key_value, type_label, count)
+            if field_ok and type_ok and year is not None:
+                add('year', year, None, count)
+
+        def ranked(facet):
+            values = [{'value': labels[facet][key][1], 'count': total} for key, total in counts[facet].items()]
+            return sorted(values, key=lambda item: (-item['count'], item['value']))
+
+        return {
+            'field': ranked('field'),
+            'type': ranked('type'),
+            'year': [{'value': year, 'count': total} for year, total in sorted(counts['year'].items(), reverse=True)],
+        }
+
+    async def get_source_by_id(self, source_id: int) -> Optional[Source]:
+        """Get a source by its ID, reading through the source cache"""
+        cached = self.source_cache.get(source_id)
+        if cached is not MISSING:
+            return cached
+        source = self._fetch_source(source_id)
+        if source is not None:
+            self.source_cache.set(source_id, source)
+        elif SOURCE_CACHE_NEGATIVE_TTL > 0:
+            self.source_cache.set(source_id, None, ttl_seconds=SOURCE_CACHE_NEGATIVE_TTL)
+        return source
+
+    def _fetch_source(self, source_id: int) -> Optional[Source]:
         with self.get_connection() as conn:
             cur = conn.cursor()
-            
-            cur.execute('SELECT id, title, authors, abstract, url, year, field, type, created_at FROM sources WHERE id = ?', (source_id,))
+            cur.row_factory = Source.from_row
+            cur.execute(f'SELECT {SOURCE_COLUMNS} FROM sources WHERE id = ?', (source_id,))
+            return cur.fetchone()
+    
+    async def get_sources_by_ids(self, source_ids: List[int]) -> Dict[int, Source]:
+        """Get several sources keyed by ID, querying only those not cached"""
+        sources = {}
+        missing = []
+        for source_id in source_ids:
+            cached = self.source_cache.get(source_id)
+            if cached is MISSING:
+                missing.append(source_id)
+            elif cached is not None:
+                sources[source_id] = cached
+        if not missing:
+            return sources
+
+        fetched = self._fetch_sources(missing)
+        for source_id in missing:
+            if source_id in fetched:
+                self.source_cache.set(source_id, fetched[source_id])
+            elif SOURCE_CACHE_NEGATIVE_TTL > 0:
+                self.source_cache.set(source_id, None, ttl_seconds=SOURCE_CACHE_NEGATIVE_TTL)
+        sources.update(fetched)
+        return sources
+
+    def _fetch_sources(self, source_ids: List[int]) -> Dict[int, Source]:
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            cur.row_factory = Source.from_row
+            placeholders = ', '.join('?' for _ in source_ids)
+            cur.execute(f'SELECT {SOURCE_COLUMNS} FROM sources WHERE id IN ({placeholders})', tuple(source_ids))
+            return {source.id: source for source in cur.fetchall()}
+    
+    async def update_source(self, source_id: int, fields: Dict[str, Any]) -> bool:
+        """Update a source and invalidate artifacts derived from its content"""
+        columns = [c for c in ('title', 'authors', 'abstract', 'url', 'year', 'field', 'type') if c in fields]
+        if not columns:
+            return False
+        
+        values = [str(fields[c]) if c == 'authors' else fields[c] for c in columns]
+        for column in ('field', 'type'):
+            if column in fields:
+                columns.append(f'{column}_key')
+                values.append(facet_key(fields[column]))
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                f"UPDATE sources SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?",
+                (*values, source_id)
+            )
+            conn.commit()
+            updated = cur.rowcount > 0
+        
+        self.source_cache.invalidate(source_id)
+        if updated:
+            await self.create_source_artifacts_table()
+            await self.invalidate_source_artifacts(source_id)
+            if self.source_listeners:
+                source = self._fetch_source(source_id)
+                if source is not None:
+                    self._notify_source_change(source.to_dict())
+        return updated
+    
+    def _notify_source_change(self, source: Dict[str, Any]):
+        for listener in self.source_listeners:
+            listener(source)
+    
+    async def create_source_artifacts_table(self):
+        """Create source_artifacts table if it doesn't exist"""
+        if self._artifacts_table_ready:
+            return
+        with self.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_artifacts (
+                    source_id INTEGER NOT NULL,
+                    action_type TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (source_id, action_type, content_hash)
+                )
+            """)
+            conn.commit()
+        self._artifacts_table_ready = True
+    
+    async def get_source_artifact(self, source_id: int, action_type: str, content_hash: str) -> Optional[str]:
+        """Get a materialized action result for the given source content"""
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'SELECT response FROM source_artifacts WHERE source_id = ? AND action_type = ? AND content_hash = ?',
+                (source_id, action_type, content_hash)
+            )
             row = cur.fetchone()
-            
-            if row:
-                return {
-                    'id': row[0],
-                    'title': row[1],
-                    'authors': eval(row[2]) if row[2] else [],
-                    'abstract': row[3],
-                    'url': row[4],
-                    'year': row[5],
-                    'field': row[6],
-                    'type': row[7],
-                    'created_at': row[8]
-                }
+            return row[0] if row else None
+    
+    async def save_source_artifact(self, source_id: int, action_type: str, content_hash: str, response: str):
+        """Store a materialized action result, replacing results for older content"""
+        with self.get_connection() as conn:
+            conn.execute(
+                'DELETE FROM source_artifacts WHERE source_id = ? AND action_type = ? AND content_hash != ?',
+                (source_id, action_type, content_hash)
+            )
+            conn.execute("""
+                INSERT OR REPLACE INTO source_artifacts (source_id, action_type, content_hash, response)
+                VALUES (?, ?, ?, ?)
+            """, (source_id, action_type, content_hash, response))
+            conn.commit()
+    
+    async def invalidate_source_artifacts(self, source_id: int):
+        """Drop every materialized action result for a source"""
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM source_artifacts WHERE source_id = ?', (source_id,))
+            conn.commit()
+    
+    async def create_report_section_feedback_table(self):
+        """Create report_section_feedback table if it doesn't exist"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_section_feedback (
+                    section_hash TEXT NOT NULL,
+                    flags_key TEXT NOT NULL,
+                    feedback TEXT NOT NULL,  -- JSON string for array
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (section_hash, flags_key)
+                )
+            """)
+            conn.commit()
+    
+    async def get_report_section_feedback(self, section_hashes: List[str], flags_key: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Get cached feedback for the given section hashes, keyed by hash"""
+        if not section_hashes:
+            return {}
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            placeholders = ', '.join('?' for _ in section_hashes)
+            cur.execute(
+                f'SELECT section_hash, feedback FROM report_section_feedback WHERE flags_key = ? AND section_hash IN ({placeholders})',
+                (flags_key, *section_hashes)
+            )
+            return {row[0]: json.loads(row[1]) for row in cur.fetchall()}
+    
+    async def save_report_section_feedback(self, entries: Dict[str, List[Dict[str, Any]]], flags_key: str):
+        """Store feedback for reviewed sections, keyed by section hash"""
+        if not entries:
+            return
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO report_section_feedback (section_hash, flags_key, feedback)
+                VALUES (?, ?, ?)
+            """, [(section_hash, flags_key, json.dumps(feedback)) for section_hash, feedback in entries.items()])
+            conn.commit()
+
+
+    async def create_chat_tables(self):
+        """Create chat_sessions and chat_turns tables if they don't exist"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    id TEXT PRIMARY KEY,
+                    source_id INTEGER NOT NULL,
+                    user_id TEXT,
+                    summary TEXT,  -- rolling summary of folded turns
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    summarized INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_turns_session ON chat_turns (session_id, summarized, id)")
+            conn.commit()
+    
+    async def create_chat_session(self, session_id: str, source_id: int, user_id: str):
+        """Create an empty chat session"""
+        with self.get_connection() as conn:
+            conn.execute(
+                'INSERT INTO chat_sessions (id, source_id, user_id) VALUES (?, ?, ?)',
+                (session_id, source_id, user_id)
+            )
+            conn.commit()
+    
+    async def get_chat_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a chat session with the turns not yet folded into its summary"""
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT id, source_id, user_id, summary FROM chat_sessions WHERE id = ?', (session_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            cur.execute(
+                'SELECT id, role, content, tokens FROM chat_turns WHERE session_id = ? AND summarized = 0 ORDER BY id',
+                (session_id,)
+            )
+            return {
+                'id': row[0],
+                'source_id': row[1],
+                'user_id': row[2],
+                'summary': row[3],
+                'turns': [
+                    {'id': turn[0], 'role': turn[1], 'content': turn[2], 'tokens': turn[3]}
+                    for turn in cur.fetchall()
+                ]
+            }
+    
+    async def add_chat_turns(self, session_id: str, turns: List[Dict[str, Any]]) -> List[int]:
+        """Append turns to a session and return their IDs"""
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            ids = []
+            for turn in turns:
+                cur.execute(
+                    'INSERT INTO chat_turns (session_id, role, content, tokens) VALUES (?, ?, ?, ?)',
+                    (session_id, turn['role'], turn['content'], turn['tokens'])
+                )
+                ids.append(cur.lastrowid)
+            cur.execute('UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = ?', (session_id,))
+            conn.commit()
+            return ids
+    
+    async def save_chat_summary(self, session_id: str, summary: str, through_turn_id: int):
+        """Replace the session summary and mark the turns it covers as folded"""
+        with self.get_connection() as conn:
+            conn.execute('UPDATE chat_sessions SET summary = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (summary, session_id))
+            conn.execute(
+                'UPDATE chat_turns SET summarized = 1 WHERE session_id = ? AND id <= ?',
+                (session_id, through_turn_id)
+            )
+            conn.commit()
+    
+    async def delete_idle_chat_sessions(self, older_than_seconds: float) -> int:
+        """Delete chat sessions, and their turns, not updated for the given time"""
+        with self.get_connection() as conn:
+            cur = conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at < datetime('now', ?)",
+                (f'-{int(older_than_seconds)} seconds',)
+            )
+            conn.execute('DELETE FROM chat_turns WHERE session_id NOT IN (SELECT id FROM chat_sessions)')
+            conn.commit()
+            return cur.rowcount
+    
+    async def create_mode_preferences_table(self):
+        """Create source_mode_preferences table if it doesn't exist"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS source_mode_preferences (
+                    user_id TEXT NOT NULL,
+                    source_id INTEGER NOT NULL,
+                    mode TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, source_id)
+                )
+            """)
+            conn.commit()
+    
+    async def get_mode_preference(self, user_id: str, source_id: int) -> Optional[str]:
+        """Get a user's preferred mode for a source, reading through the mode cache"""
+        key = (user_id, source_id)
+        cached = self.mode_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        await self.create_mode_preferences_table()
+        with self.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'SELECT mode FROM source_mode_preferences WHERE user_id = ? AND source_id = ?',
+                (user_id, source_id)
+            )
+            row = cur.fetchone()
+        mode = row[0] if row else None
+        self.mode_cache.set(key, mode)
+        return mode
+    
+    async def save_mode_preference(self, user_id: str, source_id: int, mode: str):
+        """Store a user's preferred mode for a source"""
+        await self.create_mode_preferences_table()
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT INTO source_mode_preferences (user_id, source_id, mode) VALUES (?, ?, ?)
+                ON CONFLICT (user_id, source_id) DO UPDATE SET mode = excluded.mode, updated_at = CURRENT_TIMESTAMP
+            """, (user_id, source_id, mode))
+            conn.commit()
+        self.mode_cache.set((user_id, source_id), mode)
+    
+    async def create_jobs_table(self):
+        """Create jobs table if it doesn't exist"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    user_id TEXT,
+                    status TEXT NOT NULL,  -- queued, running, completed, failed
+                    payload TEXT NOT NULL,  -- JSON job input
+                    progress TEXT,  -- JSON
+                    result TEXT,  -- JSON response body
+                    error TEXT,  -- JSON
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (status, updated_at)")
+            conn.commit()
+    
+    async def create_job(self, job_id: str, kind: str, user_id: str, payload: Dict[str, Any]):
+        """Create a queued job"""
+        with self.get_connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, status, payload) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, user_id, json.dumps(payload))
+            )
+            conn.commit()
+    
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job with its JSON columns decoded"""
+        with self.get_connection() as conn:
+            row = conn.execute(
+                'SELECT id, kind, user_id, status, payload, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        if not row:
             return None
+        return {
+            'id': row[0],
+            'kind': row[1],
+            'user_id': row[2],
+            'status': row[3],
+            'payload': json.loads(row[4]),
+            'progress': json.loads(row[5]) if row[5] else None,
+            'result': json.loads(row[6]) if row[6] else None,
+            'error': json.loads(row[7]) if row[7] else None,
+            'created_at': row[8],
+            'updated_at': row[9]
+        }
+    
+    async def claim_job(self, job_id: str) -> bool:
+        """Move a queued job to running; False if it was already claimed"""
+        with self.get_connection() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP WHERE id = ? AND status = 'queued'",
+                (job_id,)
+            )
+            conn.commit()
+            return cur.rowcount > 0
+    
+    async def update_job(self, job_id: str, status: str, progress: Dict[str, Any] = None,
+                         result: Dict[str, Any] = None, error: Dict[str, Any] = None):
+        """Set a job's status, replacing whichever of progress, result and error are given"""
+        columns = {'status': status}
+        for column, value in (('progress', progress), ('result', result), ('error', error)):
+            if value is not None:
+                columns[column] = json.dumps(value)
+        with self.get_connection() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in columns)}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (*columns.values(), job_id)
+            )
+            conn.commit()
+    
+    async def fail_stale_jobs(self, older_than_seconds: float, error: Dict[str, Any]) -> int:
+        """Fail queued and running jobs not updated for the given time, e.g. after their runner died"""
+        with self.get_connection() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP "
+                "WHERE status IN ('queued', 'running') AND updated_at < datetime('now', ?)",
+                (json.dumps(error), f'-{int(older_than_seconds)} seconds')
+            )
+            conn.commit()
+            return cur.rowcount
+    
+    async def delete_finished_jobs(self, older_than_seconds: float) -> int:
+        """Delete completed and failed jobs not updated for the given time"""
+        with self.get_connection() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < datetime('now', ?)",
+                (f'-{int(older_than_seconds)} seconds',)
+            )
+            conn.commit()
+            return cur.rowcount
 
 database_service = DatabaseService()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import math
+import os
+import re
+import zlib
+from typing import List, Sequence
+
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+from .openai_service import openai_breaker
+from .rate_limiter import INTERACTIVE, openai_rate_limiter
+from .request_context import run_within_deadline, timeout_within_deadline
+from .resilience import LatencyTracker, hedged
+from .token_budget import token_budget
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')
+EMBEDDING_TIMEOUT = float(os.getenv('OPENAI_EMBEDDING_TIMEOUT_SECONDS', '10'))
+
+# Dimensions of the local hashing embedder
+LOCAL_DIMENSIONS = 512
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Includes words that only point at the source being discussed
+STOPWORDS = frozenset(
+    'a an and are as at be by can do does for from how i in is it its me of on or please '
+    'the this that to was what which with you your paper article source study'.split()
+)
+
+
+def normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else list(vector)
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two unit vectors"""
+    return sum(x * y for x, y in zip(a, b))
+
+
+def hash_embed(text: str, dimensions: int = LOCAL_DIMENSIONS) -> List[float]:
+    """Embed text by hashing its content words and word pairs into a fixed vector.
+
+    Deterministic across processes, needs no model, and is good enough to
+    match rephrasings that share most of their words.
+    """
+    words = [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+    features = words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+    vector = [0.0] * dimensions
+    for feature in features:
+        digest = zlib.crc32(feature.encode('utf-8'))
+        vector[digest % dimensions] += 1.0 if digest & 0x80000000 else -1.0
+    return normalize(vector)
+
+
+class EmbeddingService:
+    """Embeds text with the OpenAI embeddings API, or locally without an API key"""
+
+    def __init__(self):
+        api_key = os.getenv('OPENAI_API_KEY')
+        if not api_key or api_key == "dummy-key":
+            self.client = None
+            self.model = 'local-hash'
+        else:
+            # Retries are handled by the shared rate limiter
+            self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+            self.model = EMBEDDING_MODEL
+        self._latency = LatencyTracker()
+
+    async def embed(self, texts: List[str], logger=None, priority: str = INTERACTIVE) -> List[List[float]]:
+        """Embed several texts in one call; vectors are unit length"""
+        if not texts:
+            return []
+        if self.client is None:
+            return [hash_embed(text) for text in texts]
+
+        estimated_tokens = sum(token_budget.count(text, self.model) for text in texts)
+
+        # Embeddings are idempotent, so a slow call is raced by a backup
+        async def attempt():
+            return await openai_rate_limiter.run(
+                lambda: self.client.embeddings.create(
+                    model=self.model,
+                    input=texts,
+                    timeout=timeout_within_deadline(EMBEDDING_TIMEOUT),
+                ),
+                estimated_tokens=estimated_tokens,
+                logger=logger,
+                priority=priority,
+            )
+
+        response = await openai_breaker.call(
+            lambda: run_within_deadline(hedged(attempt, self._latency, logger=logger))
+        )
+        return [normalize(item.embedding) for item in sorted(response.data, key=lambda item: item.index)]
+
+
+embedding_service = EmbeddingService()
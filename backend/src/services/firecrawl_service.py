@@ -1,5 +1,49 @@
+import asyncio
 import os
+from collections import OrderedDict
+import requests
 from firecrawl import FirecrawlApp
+from .rate_limiter import is_retryable
+from .request_context import DeadlineExceededError, run_within_deadline, timeout_within_deadline
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+
+# Last good results, served while Firecrawl is failing
+CACHE_SIZE = int(os.getenv('FIRECRAWL_CACHE_SIZE', '256'))
+# Per-call timeout, capped by what is left of the request's budget
+REQUEST_TIMEOUT = float(os.getenv('FIRECRAWL_TIMEOUT_SECONDS', '30'))
+# Scrapes and searches are idempotent, so a slow call may be raced by a backup.
+# Off by default: the losing SDK call runs on in its thread, so hedging adds
+# load to a degraded upstream.
+HEDGE_REQUESTS = os.getenv('FIRECRAWL_HEDGE_REQUESTS', 'false').lower() == 'true'
+
+# Errors about the page being scraped rather than about Firecrawl itself
+TARGET_ERROR_NAMES = {'DNSResolutionError', 'TLSError', 'WebsiteNotSupportedError'}
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Transport errors, rate limits and 5xx responses from Firecrawl.
+
+    Bad or unreachable URLs from users, and running out of a request's own
+    budget, say nothing about Firecrawl's health.
+    """
+    if isinstance(error, DeadlineExceededError) or type(error).__name__ in TARGET_ERROR_NAMES:
+        return False
+    if isinstance(error, (ConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True
+    return is_retryable(error)
+
+
+firecrawl_breaker = CircuitBreaker.from_env('FIRECRAWL', is_failure=is_upstream_failure)
+_latency = {'search': LatencyTracker(), 'scrape': LatencyTracker()}
+_fallback_cache = OrderedDict()
+
+
+def _remember(key, value):
+    _fallback_cache[key] = value
+    _fallback_cache.move_to_end(key)
+    while len(_fallback_cache) > CACHE_SIZE:
+        _fallback_cache.popitem(last=False)
+
 
 class FirecrawlService:
     def __init__(self):
@@ -8,7 +52,35 @@ class FirecrawlService:
             self.app = None
         else:
             self.app = FirecrawlApp(api_key=api_key)
-    
+
+    async def _call(self, kind, key, fn, *args, logger=None):
+        """Call the SDK off the event loop, behind the breaker, with cached fallback"""
+        async def attempt():
+            # Awaiting stops at the deadline, but the worker thread only stops
+            # when the SDK's own timeout does, so give it the same budget
+            timeout_ms = max(int(timeout_within_deadline(REQUEST_TIMEOUT) * 1000), 1)
+            return await asyncio.to_thread(fn, *args, timeout=timeout_ms)
+
+        async def guarded():
+            if HEDGE_REQUESTS:
+                return await run_within_deadline(hedged(attempt, _latency[kind], logger=logger))
+            return await run_within_deadline(attempt())
+
+        try:
+            result = await firecrawl_breaker.call(guarded)
+        except Exception as e:
+            if (kind, key) in _fallback_cache:
+                logger.warn('Serving cached Firecrawl result', {
+                    'kind': kind,
+                    'key': key,
+                    'circuitOpen': isinstance(e, CircuitOpenError),
+                    'deadlineExceeded': isinstance(e, DeadlineExceededError),
+                })
+                return _fallback_cache[(kind, key)]
+            raise
+        _remember((kind, key), result)
+        return result
+
     async def search(self, query, logger):
         """Search for sources using Firecrawl"""
         if self.app is None:
@@ -22,8 +94,8 @@ class FirecrawlService:
             ]
         try:
             logger.info('Searching with Firecrawl', {'query': query})
-            results = self.app.search(query)
-            
+            results = await self._call('search', query, self.app.search, query, logger=logger)
+
             # Convert to expected format
             sources = []
             for result in results.get('data', []):
@@ -32,12 +104,12 @@ class FirecrawlService:
                     'url': result.get('url', ''),
                     'snippet': result.get('description', ''),
                 })
-            
+
             return sources
         except Exception as e:
             logger.error('Firecrawl search failed', {'error': str(e)})
             raise
-    
+
     async def extract_content(self, url, logger):
         """Extract content from a URL using Firecrawl"""
         if self.app is None:
@@ -45,10 +117,10 @@ class FirecrawlService:
             return f"This is mock extracted content from {url}. Please set FIRECRAWL_API_KEY for real content extraction."
         try:
             logger.info('Extracting content with Firecrawl', {'url': url})
-            result = self.app.scrape_url(url)
-            
+            result = await self._call('scrape', url, self.app.scrape_url, url, logger=logger)
+
             # Return the markdown content
             return result.get('data', {}).get('markdown', '')
         except Exception as e:
             logger.error('Firecrawl extract failed', {'error': str(e)})
-            raise
\ No newline at end of file
+            raise
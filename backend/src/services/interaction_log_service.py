@@ -0,0 +1,294 @@
+import asyncio
+import atexit
+import json
+import os
+import sqlite3
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Interaction logs go to their own append-only database so their write
+# volume never contends with the research data in researchly.db
+INTERACTION_LOG_DB = os.getenv('INTERACTION_LOG_DB', 'interaction_logs.db')
+# Buffered events that trigger an immediate flush
+FLUSH_SIZE = int(os.getenv('INTERACTION_LOG_FLUSH_SIZE', '200'))
+# Longest an event waits in the buffer before being written
+FLUSH_INTERVAL = float(os.getenv('INTERACTION_LOG_FLUSH_SECONDS', '2'))
+# Events held in memory at most; beyond this new events are dropped
+MAX_BUFFERED = int(os.getenv('INTERACTION_LOG_MAX_BUFFERED', '10000'))
+
+# Rollup granularities and their bucket width in seconds
+BUCKET_SECONDS = {'hour': 3600, 'day': 86400}
+
+# (user_id, action, source_id, metadata_json, client_timestamp, received_at)
+LogRow = Tuple[str, str, Optional[str], str, Optional[str], float]
+
+
+def bucket_start(timestamp: float, bucket: str) -> int:
+    """Start of the UTC hour or day containing the timestamp, in epoch seconds"""
+    width = BUCKET_SECONDS[bucket]
+    return int(timestamp // width) * width
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', query).strip().lower()
+
+
+class InteractionLogService:
+    """Buffers interaction events in memory and appends them to SQLite in batches.
+
+    Recording an event only appends to a list. A background task writes the
+    buffer in one transaction when it reaches flush_size or every
+    flush_interval seconds, so the request path never waits on disk.
+    """
+
+    def __init__(self, db_path: str = INTERACTION_LOG_DB, flush_size: int = FLUSH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, max_buffered: int = MAX_BUFFERED):
+        self.db_path = os.path.join(os.getcwd(), db_path)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._buffer: List[LogRow] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        # Flushes run in worker threads; writes to the connection are serialized
+        self._write_lock = threading.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flushes = set()
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'failedFlushes': 0}
+
+    def record(self, events: List[Dict[str, Any]], user_id: str, logger=None) -> int:
+        """Buffer events for writing and return how many were accepted"""
+        received_at = time.time()
+        accepted = 0
+        for event in events:
+            if len(self._buffer) >= self.max_buffered:
+                self.stats['dropped'] += 1
+                continue
+            metadata = event.get('metadata') or {}
+            source_id = event.get('sourceId') or (metadata.get('sourceId') if isinstance(metadata, dict) else None)
+            self._buffer.append((
+                str(event.get('userId') or user_id),
+                str(event['action']),
+                str(source_id) if source_id is not None else None,
+                json.dumps(metadata, default=str),
+                event.get('timestamp'),
+                received_at,
+            ))
+            accepted += 1
+        self.stats['recorded'] += accepted
+        self._schedule(logger)
+        return accepted
+
+    def _schedule(self, logger):
+        """Start the periodic flusher, or flush right away once the buffer is full"""
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._run_flusher(logger))
+        if len(self._buffer) >= self.flush_size:
+            task = loop.create_task(self.flush(logger))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run_flusher(self, logger):
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush(logger)
+
+    async def flush(self, logger=None) -> int:
+        """Write everything buffered so far in one transaction"""
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as error:
+            self.stats['failedFlushes'] += 1
+            # Keep the events for the next flush, within the buffer bound
+            self._buffer = (batch + self._buffer)[-self.max_buffered:]
+            if logger:
+                logger.error('Failed to write interaction logs', {'events': len(batch), 'error': str(error)})
+            return 0
+        return len(batch)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL lets analytics readers run while batches are appended
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS interaction_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    source_id TEXT,
+                    metadata TEXT,  -- JSON object
+                    client_timestamp TEXT,
+                    received_at REAL NOT NULL
+                )
+            """)
+            # Rollups are updated in the same transaction as each batch, so
+            # dashboards read a handful of rows whatever the raw log volume.
+            # source_id is '' for events without a source.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS activity_rollups (
+                    bucket TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    action TEXT NOT NULL,
+                    source_id TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, bucket_start, action, source_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS active_users (
+                    bucket TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    user_id TEXT NOT NULL,
+                    PRIMARY KEY (bucket, bucket_start, user_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS active_user_counts (
+                    bucket TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    users INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, bucket_start)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_rollups (
+                    bucket TEXT NOT NULL,
+                    bucket_start INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, bucket_start, query)
+                ) WITHOUT ROWID
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _write(self, batch: List[LogRow]):
+        with self._write_lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("""
+                    INSERT INTO interaction_logs (user_id, action, source_id, metadata, client_timestamp, received_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+                self._update_rollups(conn, batch)
+            self.stats['written'] += len(batch)
+            self.stats['flushes'] += 1
+
+    def _update_rollups(self, conn: sqlite3.Connection, batch: List[LogRow]):
+        """Fold a batch into the hourly and daily rollups"""
+        actions, queries, users = Counter(), Counter(), set()
+        for user_id, action, source_id, metadata_json, _, received_at in batch:
+            query = json.loads(metadata_json).get('query') if metadata_json.startswith('{') else None
+            for bucket in BUCKET_SECONDS:
+                start = bucket_start(received_at, bucket)
+                actions[(bucket, start, action, source_id or '')] += 1
+                users.add((bucket, start, user_id))
+                if isinstance(query, str) and query.strip():
+                    queries[(bucket, start, normalize_query(query))] += 1
+
+        conn.executemany("""
+            INSERT INTO activity_rollups (bucket, bucket_start, action, source_id, events) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (bucket, bucket_start, action, source_id) DO UPDATE SET events = events + excluded.events
+        """, [(*key, count) for key, count in actions.items()])
+        conn.executemany("""
+            INSERT INTO query_rollups (bucket, bucket_start, query, events) VALUES (?, ?, ?, ?)
+            ON CONFLICT (bucket, bucket_start, query) DO UPDATE SET events = events + excluded.events
+        """, [(*key, count) for key, count in queries.items()])
+
+        # Count each user once per bucket: only first sightings raise the count
+        new_users = Counter()
+        for bucket, start, user_id in users:
+            cur = conn.execute('INSERT OR IGNORE INTO active_users (bucket, bucket_start, user_id) VALUES (?, ?, ?)', (bucket, start, user_id))
+            new_users[(bucket, start)] += cur.rowcount
+        conn.executemany("""
+            INSERT INTO active_user_counts (bucket, bucket_start, users) VALUES (?, ?, ?)
+            ON CONFLICT (bucket, bucket_start) DO UPDATE SET users = users + excluded.users
+        """, [(*key, count) for key, count in new_users.items() if count])
+
+    async def activity(self, bucket: str, start: int, end: int, limit: int = 10) -> Dict[str, Any]:
+        """Aggregates for buckets in [start, end), read from the rollups only"""
+        return await asyncio.to_thread(self._read_activity, bucket, start, end, limit)
+
+    def _read_activity(self, bucket: str, start: int, end: int, limit: int) -> Dict[str, Any]:
+        with self._write_lock:
+            self._connect()  # make sure the schema exists
+        # A separate connection; in WAL mode it reads while batches are appended
+        conn = sqlite3.connect(self.db_path)
+        try:
+            params = (bucket, start, end)
+            in_range = 'bucket = ? AND bucket_start >= ? AND bucket_start < ?'
+            events = dict(conn.execute(
+                f'SELECT bucket_start, SUM(events) FROM activity_rollups WHERE {in_range} GROUP BY bucket_start', params
+            ).fetchall())
+            users = dict(conn.execute(
+                f'SELECT bucket_start, users FROM active_user_counts WHERE {in_range}', params
+            ).fetchall())
+            top_actions = conn.execute(
+                f'SELECT action, SUM(events) AS total FROM activity_rollups WHERE {in_range} GROUP BY action ORDER BY total DESC, action LIMIT ?',
+                params + (limit,)
+            ).fetchall()
+            top_sources = conn.execute(
+                f"SELECT source_id, SUM(events) AS total FROM activity_rollups WHERE {in_range} AND source_id != '' GROUP BY source_id ORDER BY total DESC, source_id LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+            top_queries = conn.execute(
+                f'SELECT query, SUM(events) AS total FROM query_rollups WHERE {in_range} GROUP BY query ORDER BY total DESC, query LIMIT ?',
+                params + (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        width = BUCKET_SECONDS[bucket]
+        return {
+            'series': [
+                {'bucketStart': ts, 'events': events.get(ts, 0), 'activeUsers': users.get(ts, 0)}
+                for ts in range(start, end, width)
+            ],
+            'topActions': [{'action': action, 'events': total} for action, total in top_actions],
+            'topSources': [{'sourceId': source_id, 'events': total} for source_id, total in top_sources],
+            'popularQueries': [{'query': query, 'count': total} for query, total in top_queries],
+        }
+
+    async def popular_queries(self, start: int, end: int, limit: int) -> List[Tuple[str, int]]:
+        """Most frequent normalized queries in days [start, end), from the daily rollups"""
+        return await asyncio.to_thread(self._read_popular_queries, start, end, limit)
+
+    def _read_popular_queries(self, start: int, end: int, limit: int) -> List[Tuple[str, int]]:
+        with self._write_lock:
+            self._connect()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("""
+                SELECT query, SUM(events) AS total FROM query_rollups
+                WHERE bucket = 'day' AND bucket_start >= ? AND bucket_start < ?
+                GROUP BY query ORDER BY total DESC, query LIMIT ?
+            """, (start, end, limit)).fetchall()
+        finally:
+            conn.close()
+
+    def close(self):
+        """Write anything still buffered and close the database"""
+        batch, self._buffer = self._buffer, []
+        if batch:
+            self._write(batch)
+        with self._write_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def snapshot(self) -> dict:
+        return {'buffered': len(self._buffer), **self.stats}
+
+
+interaction_log_service = InteractionLogService()
+# Don't lose the last partial batch on a clean shutdown
+atexit.register(interaction_log_service.close)
@@ -0,0 +1,82 @@
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from .api_errors import RETRY_LATER_ERRORS, prompt_too_large_error, retry_later_error
+from .database_service import database_service
+from .request_context import DeadlineExceededError
+from .token_budget import PromptTooLargeError
+
+# Topic the job runner subscribes to; events carry only the job ID
+JOB_TOPIC = 'job-submitted'
+# Work budget for a job, well beyond what an HTTP request could wait
+JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT_SECONDS', '600'))
+# Finished jobs are kept this long for polling
+JOB_RETENTION = float(os.getenv('JOB_RETENTION_SECONDS', '86400'))
+# Stored for jobs left queued or running past JOB_TIMEOUT
+STALE_JOB_ERROR = {'status': 504, 'message': 'Job deadline exceeded'}
+
+
+def job_error(error: Exception) -> Dict[str, Any]:
+    """The error body a synchronous request would have returned, with its status"""
+    if isinstance(error, RETRY_LATER_ERRORS):
+        return retry_later_error(error)
+    if isinstance(error, PromptTooLargeError):
+        return prompt_too_large_error(error)
+    if isinstance(error, DeadlineExceededError):
+        return {'status': 504, 'message': 'Job deadline exceeded'}
+    return {'status': 500, 'message': 'Job failed', 'error': str(error)}
+
+
+class JobService:
+    """Background jobs for work too slow to hold an HTTP request open.
+
+    Jobs live in SQLite (Motia state is disabled in this project). API
+    handlers submit a job and emit its ID; the job runner step claims it,
+    records progress and stores the result for the status endpoint.
+    """
+
+    async def submit(self, kind: str, payload: Dict[str, Any], user_id: str, context) -> Dict[str, Any]:
+        """Store a queued job, hand it to the runner and return the 202 response body"""
+        await database_service.create_jobs_table()
+        await database_service.delete_finished_jobs(JOB_RETENTION)
+        job_id = str(uuid.uuid4())
+        await database_service.create_job(job_id, kind, user_id, payload)
+        try:
+            await context.emit({
+                'topic': JOB_TOPIC,
+                'data': {'jobId': job_id, 'kind': kind}
+            })
+        except Exception as error:
+            # No runner will ever see the job
+            await self.fail(job_id, job_error(error))
+            raise
+        context.logger.info('Job submitted', {'jobId': job_id, 'kind': kind})
+        return {
+            'message': 'Job submitted',
+            'jobId': job_id,
+            'status': 'queued',
+            'statusUrl': f'/api/jobs/{job_id}'
+        }
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        await database_service.create_jobs_table()
+        # A job whose runner died, or whose event was lost, would otherwise never finish
+        await database_service.fail_stale_jobs(JOB_TIMEOUT, STALE_JOB_ERROR)
+        return await database_service.get_job(job_id)
+
+    async def claim(self, job_id: str) -> bool:
+        """Start a queued job; False when it is already running or done, e.g. on redelivery"""
+        return await database_service.claim_job(job_id)
+
+    async def progress(self, job_id: str, completed: int, total: int):
+        await database_service.update_job(job_id, 'running', progress={'completed': completed, 'total': total})
+
+    async def complete(self, job_id: str, result: Dict[str, Any]):
+        await database_service.update_job(job_id, 'completed', result=result)
+
+    async def fail(self, job_id: str, error: Dict[str, Any]):
+        await database_service.update_job(job_id, 'failed', error=error)
+
+
+job_service = JobService()
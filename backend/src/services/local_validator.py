@@ -0,0 +1,107 @@
+import re
+from typing import Any, Dict, List, Set
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+NUMBER_PATTERN = re.compile(r'(?<![\w.])\d+(?:[.,]\d+)*%?')
+ENTITY_PATTERN = re.compile(r'\b(?:[A-Z][a-z]+(?:[A-Z][a-z]*)*|[A-Z]{2,}[a-z]?|[A-Z][a-zA-Z]*\d[\w-]*)\b')
+QUOTE_PATTERN = re.compile(r'["“]([^"”]{12,})["”]')
+
+SHINGLE_SIZE = 3
+
+# Relative weight of each signal; signals with nothing to check are skipped
+SIGNAL_WEIGHTS = {
+    'shingleContainment': 0.4,
+    'numberSupport': 0.25,
+    'entitySupport': 0.2,
+    'quoteSupport': 0.15,
+}
+
+# Constraints the local stage can check on its own
+LOCAL_CONSTRAINTS = {'must_cite_sources'}
+
+# Capitalized words that are usually just sentence starters
+COMMON_CAPITALIZED = {
+    'The', 'This', 'That', 'These', 'Those', 'It', 'Its', 'In', 'On', 'At', 'For', 'By', 'With',
+    'We', 'Our', 'They', 'Their', 'A', 'An', 'And', 'But', 'Or', 'If', 'As', 'To', 'Of', 'From',
+    'However', 'Moreover', 'Furthermore', 'Overall', 'Finally', 'First', 'Second', 'Also', 'While',
+    'When', 'Where', 'Which', 'What', 'How', 'Why', 'Yes', 'No', 'Based', 'According', 'Source',
+}
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> Set[tuple]:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _numbers(text: str) -> Set[str]:
+    return {n.replace(',', '') for n in NUMBER_PATTERN.findall(text)}
+
+
+def _entities(text: str) -> Set[str]:
+    return {e for e in ENTITY_PATTERN.findall(text) if e not in COMMON_CAPITALIZED}
+
+
+def _ratio(supported: int, total: int):
+    return supported / total if total else None
+
+
+def validate_locally(ai_response: str, source_text: str, constraints: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Score how well a response is grounded in the source without calling a model.
+
+    Combines word-shingle containment, number and entity matching, and whether
+    quoted spans appear verbatim in the source into a single confidence score.
+    """
+    constraints = constraints or {}
+    normalized_source = _normalize(source_text)
+    issues: List[str] = []
+
+    response_shingles = _shingles(ai_response)
+    source_shingles = _shingles(source_text)
+    containment = _ratio(len(response_shingles & source_shingles), len(response_shingles))
+
+    response_numbers = _numbers(ai_response)
+    source_numbers = _numbers(source_text)
+    unsupported_numbers = sorted(response_numbers - source_numbers)
+    number_support = _ratio(len(response_numbers) - len(unsupported_numbers), len(response_numbers))
+    if unsupported_numbers:
+        issues.append(f"Numbers not found in source: {', '.join(unsupported_numbers)}")
+
+    response_entities = _entities(ai_response)
+    unsupported_entities = sorted(e for e in response_entities if e.lower() not in normalized_source)
+    entity_support = _ratio(len(response_entities) - len(unsupported_entities), len(response_entities))
+    if unsupported_entities:
+        issues.append(f"Names or terms not found in source: {', '.join(unsupported_entities)}")
+
+    quotes = QUOTE_PATTERN.findall(ai_response)
+    unsupported_quotes = [q for q in quotes if _normalize(q) not in normalized_source]
+    quote_support = _ratio(len(quotes) - len(unsupported_quotes), len(quotes))
+    for quote in unsupported_quotes:
+        issues.append(f"Quoted text not found in source: \"{quote}\"")
+
+    signals = {
+        'shingleContainment': containment,
+        'numberSupport': number_support,
+        'entitySupport': entity_support,
+        'quoteSupport': quote_support,
+    }
+    scored = {name: value for name, value in signals.items() if value is not None}
+    total_weight = sum(SIGNAL_WEIGHTS[name] for name in scored)
+    confidence = sum(SIGNAL_WEIGHTS[name] * value for name, value in scored.items()) / total_weight if total_weight else 0.0
+
+    if constraints.get('must_cite_sources') and quote_support is None:
+        issues.append("Response does not quote the source")
+        confidence = min(confidence, 0.5)
+
+    return {
+        'confidence': round(confidence, 3),
+        'signals': {name: (round(value, 3) if value is not None else None) for name, value in signals.items()},
+        'issues': issues,
+        # Constraints outside LOCAL_CONSTRAINTS can only be judged by the model
+        'needsModel': any(constraints.get(name) for name in constraints if name not in LOCAL_CONSTRAINTS),
+    }
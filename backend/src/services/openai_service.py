@@ -1,11 +1,25 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 import json
 from dotenv import load_dotenv
+from .rate_limiter import BATCH, INTERACTIVE, is_retryable, openai_rate_limiter
+from .request_context import run_within_deadline, timeout_within_deadline
+from .resilience import CircuitBreaker
+from .token_budget import token_budget
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Completion tokens assumed for rate limiting when max_tokens is not given
+ESTIMATED_COMPLETION_TOKENS = 512
+
+# Per-attempt timeout, further capped by the request's remaining budget
+REQUEST_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '60'))
+
+# Trips when calls keep failing after the limiter's retries, so requests fail
+# fast instead of queueing behind an unhealthy upstream
+openai_breaker = CircuitBreaker.from_env('OPENAI', is_failure=is_retryable)
+
 class OpenAIService:
     def __init__(self):
         api_key = os.getenv('OPENAI_API_KEY')
@@ -13,10 +27,11 @@ class OpenAIService:
             self.client = None
             self.model = "gpt-4"
         else:
-            self.client = OpenAI(api_key=api_key)
+            # Retries are handled by the shared rate limiter
+            self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
             self.model = os.getenv('OPENAI_MODEL', 'gpt-4')
     
-    async def create_completion(self, messages, **kwargs):
+    async def create_completion(self, messages, logger=None, priority=INTERACTIVE, **kwargs):
         if self.client is None:
             # Return mock response for testing
             class MockResponse:
@@ -33,11 +48,27 @@ class OpenAIService:
                     else:
                         self.content = "This is a mock response. Please set OPENAI_API_KEY environment variable for real responses."
             return MockResponse()
-        return await self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            **kwargs
-        )
+        
+        # Every real call goes through the process-wide limiter so bursts queue
+        # up instead of failing with 429s
+        estimated_tokens = token_budget.count_messages(messages, self.model) + kwargs.get('max_tokens', ESTIMATED_COMPLETION_TOKENS)
+        # Queueing, retries and the call itself all stop at the request deadline
+        response = await openai_breaker.call(lambda: run_within_deadline(openai_rate_limiter.run(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                timeout=timeout_within_deadline(REQUEST_TIMEOUT),
+                **kwargs
+            ),
+            estimated_tokens=estimated_tokens,
+            logger=logger,
+            priority=priority,
+        )))
+        
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            openai_rate_limiter.refund_tokens(estimated_tokens - usage.total_tokens)
+        return response
     
     async def research_sources(self, query: str, filters: dict = None) -> list:
         """Generate research sources using OpenAI"""
@@ -56,7 +87,12 @@ class OpenAIService:
             ]
         
         filters = filters or {}
-        year_filter = f" from {filters.get('year')}" if filters.get('year') else ""
+        if filters.get('year'):
+            year_filter = f" from {filters.get('year')}"
+        elif filters.get('yearFrom') or filters.get('yearTo'):
+            year_filter = f" published between {filters.get('yearFrom') or 'any year'} and {filters.get('yearTo') or 'now'}"
+        else:
+            year_filter = ""
         field_filter = f" in the field of {filters.get('field')}" if filters.get('field') else ""
         type_filter = f" of type {filters.get('type')}" if filters.get('type') else ""
         
@@ -78,7 +114,7 @@ Return as JSON array of objects."""
             {"role": "user", "content": prompt}
         ]
         
-        response = await self.create_completion(messages, response_format={"type": "json_object"})
+        response = await self.create_completion(messages, priority=BATCH, response_format={"type": "json_object"})
         content = response.choices[0].message.content
         
         try:
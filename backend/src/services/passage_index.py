@@ -0,0 +1,124 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .embedding_service import cosine_similarity, embedding_service
+from .prompt_builder import render_source_content, source_content_hash
+from .token_budget import token_budget
+from .types import Source
+
+# Target size of a retrievable passage
+PASSAGE_TOKENS = int(os.getenv('PASSAGE_TOKENS', '150'))
+# Sources whose passages are kept embedded in memory
+MAX_INDEXED_SOURCES = int(os.getenv('PASSAGE_INDEX_MAX_SOURCES', '1024'))
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+
+
+class Passage(NamedTuple):
+    source_id: int
+    position: int
+    text: str
+    tokens: int
+
+
+def split_passages(text: str, max_tokens: int, model: str) -> List[str]:
+    """Split text into passages of whole sentences, each at most max_tokens"""
+    passages, current, current_tokens = [], [], 0
+    for sentence in filter(None, (part.strip() for part in SENTENCE_BOUNDARY.split(text))):
+        tokens = token_budget.count(sentence, model)
+        if tokens > max_tokens:
+            pieces = token_budget.chunk(sentence, max_tokens, model)
+        else:
+            pieces = [sentence]
+        for piece in pieces:
+            piece_tokens = min(tokens, max_tokens)
+            if current and current_tokens + piece_tokens > max_tokens:
+                passages.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        passages.append(' '.join(current))
+    return passages
+
+
+class PassageIndex:
+    """In-process embedding index of source passages, shared across requests.
+
+    Sources are indexed on first use, with every new passage across a
+    request embedded in one batched call, and evicted least recently used.
+    Entries are keyed by source content hash, so edited sources re-index.
+    """
+
+    def __init__(self, max_sources: int = MAX_INDEXED_SOURCES, passage_tokens: int = PASSAGE_TOKENS):
+        self.max_sources = max_sources
+        self.passage_tokens = passage_tokens
+        self._sources: "OrderedDict[int, Tuple[str, List[Tuple[Passage, List[float]]]]]" = OrderedDict()
+        self.stats = {'indexedSources': 0, 'indexedPassages': 0, 'reusedSources': 0}
+
+    def _unindexed(self, sources: Iterable[Source], model: str) -> Dict[int, Tuple[str, List[Passage]]]:
+        """Split the sources not already indexed at their current content"""
+        pending = {}
+        for source in sources:
+            content_hash = source_content_hash(source)
+            indexed = self._sources.get(source.id)
+            if indexed is not None and indexed[0] == content_hash:
+                self._sources.move_to_end(source.id)
+                self.stats['reusedSources'] += 1
+                continue
+            texts = split_passages(render_source_content(source), self.passage_tokens, model)
+            pending[source.id] = (content_hash, [
+                Passage(source.id, position, text, token_budget.count(text, model))
+                for position, text in enumerate(texts)
+            ])
+        return pending
+
+    async def retrieve(self, sources: List[Source], query: str, model: str, logger) -> List[Tuple[float, Passage]]:
+        """Rank every passage of the sources against the query, indexing sources as needed.
+
+        The query and all passages still to be indexed are embedded together
+        in a single call.
+        """
+        pending = self._unindexed(sources, model)
+        passages = [passage for _, source_passages in pending.values() for passage in source_passages]
+        vectors = await embedding_service.embed([query] + [passage.text for passage in passages], logger)
+
+        vector_iter = iter(vectors[1:])
+        for source_id, (content_hash, source_passages) in pending.items():
+            self._sources[source_id] = (content_hash, [(passage, next(vector_iter)) for passage in source_passages])
+            self._sources.move_to_end(source_id)
+        while len(self._sources) > self.max_sources:
+            self._sources.popitem(last=False)
+
+        if pending:
+            self.stats['indexedSources'] += len(pending)
+            self.stats['indexedPassages'] += len(passages)
+            logger.info('Indexed source passages', {'sources': len(pending), 'passages': len(passages)})
+
+        return self.search(vectors[0], [source.id for source in sources])
+
+    def search(self, query_vector: List[float], source_ids: Iterable[int]) -> List[Tuple[float, Passage]]:
+        """All passages of the given sources, most similar to the query first"""
+        scored = []
+        for source_id in source_ids:
+            indexed = self._sources.get(source_id)
+            if indexed is None:
+                continue
+            scored.extend((cosine_similarity(query_vector, vector), passage) for passage, vector in indexed[1])
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def select(self, scored: List[Tuple[float, Passage]], token_budget_limit: int) -> List[Tuple[float, Passage]]:
+        """Take the best passages that fit in the token budget, in score order"""
+        selected, used = [], 0
+        for score, passage in scored:
+            if used + passage.tokens > token_budget_limit:
+                continue
+            selected.append((score, passage))
+            used += passage.tokens
+        return selected
+
+
+passage_index = PassageIndex()
@@ -1,37 +1,101 @@
+import asyncio
+import atexit
+import os
 import httpx
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from .types import Order, Pet
 
+PETSTORE_BASE_URL = os.getenv('PETSTORE_BASE_URL', 'https://xnigaj-xtnawg.motiahub.com')
+# Pool sizing; idle connections are kept alive so events skip the TCP/TLS handshake
+MAX_CONNECTIONS = int(os.getenv('PETSTORE_MAX_CONNECTIONS', '20'))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('PETSTORE_MAX_KEEPALIVE_CONNECTIONS', '10'))
+KEEPALIVE_EXPIRY = float(os.getenv('PETSTORE_KEEPALIVE_EXPIRY_SECONDS', '30'))
+REQUEST_TIMEOUT = float(os.getenv('PETSTORE_TIMEOUT_SECONDS', '10'))
+CONNECT_TIMEOUT = float(os.getenv('PETSTORE_CONNECT_TIMEOUT_SECONDS', '5'))
+# Retries of failed connection attempts only. Nothing was sent yet, so they
+# are safe even for the non-idempotent POSTs below.
+CONNECT_RETRIES = int(os.getenv('PETSTORE_CONNECT_RETRIES', '2'))
+
 class PetStoreService:
+    def __init__(self, base_url: str = PETSTORE_BASE_URL, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Clients replaced while their loop was idle, closed once it can run again
+        self._stale_clients: List[Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = []
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, created on first use in the running event loop"""
+        loop = asyncio.get_running_loop()
+        # A pool's connections belong to the loop that opened them
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._retire(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=self._transport or httpx.AsyncHTTPTransport(
+                    retries=CONNECT_RETRIES,
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_EXPIRY,
+                    ),
+                ),
+                timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+                headers={'Content-Type': 'application/json'},
+            )
+            self._loop = loop
+        return self._client
+
+    def _retire(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        """Close a client whose event loop is no longer the running one"""
+        if loop.is_running():
+            # Another thread's loop; close the pool there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        elif not loop.is_closed():
+            self._stale_clients.append((client, loop))
+        # A closed loop can no longer close its connections; they go with the client
+
+    async def aclose(self):
+        """Close pooled connections; call at shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def close_at_exit(self):
+        """Close the pools from an atexit hook, where their event loops can still run"""
+        clients = self._stale_clients + ([(self._client, self._loop)] if self._client is not None else [])
+        self._stale_clients = []
+        for client, loop in clients:
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(client.aclose())
+        self._client = None
+        self._loop = None
+
     async def create_pet(self, pet: Dict[str, Any]) -> Pet:
         pet_data = {
             "name": pet.get("name", ""),
             "photoUrls": [pet.get("photoUrl", "")],
             "status": "available"
         }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                'https://xnigaj-xtnawg.motiahub.com/pet',
-                json=pet_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            return response.json()
-    
+
+        response = await self.client.post('/pet', json=pet_data)
+        return response.json()
+
     async def create_order(self, order: Dict[str, Any]) -> Order:
-        async with httpx.AsyncClient() as client:
-            order_data = {
-                "quantity": order.get("quantity", 1),
-                "petId": order.get("pet_id", '1'),
-                "shipDate": order.get("ship_date", "2025-08-22T22:07:04.730Z"),
-                "status": order.get("status", "placed"),
-            }
-            
-            response = await client.post(
-                'https://xnigaj-xtnawg.motiahub.com/store/order',
-                json=order_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            return response.json()
+        order_data = {
+            "quantity": order.get("quantity", 1),
+            "petId": order.get("pet_id", '1'),
+            "shipDate": order.get("ship_date", "2025-08-22T22:07:04.730Z"),
+            "status": order.get("status", "placed"),
+        }
+
+        response = await self.client.post('/store/order', json=order_data)
+        return response.json()
 
-pet_store_service = PetStoreService()
\ No newline at end of file
+pet_store_service = PetStoreService()
+atexit.register(pet_store_service.close_at_exit)
\ No newline at end of file
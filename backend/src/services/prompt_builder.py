@@ -0,0 +1,162 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+from .token_budget import MESSAGE_OVERHEAD_TOKENS, token_budget
+from .types import Source
+
+# Shared by every source-grounded call (actions, chat) so the system message and
+# source block form a byte-identical prefix that the provider can cache.
+SOURCE_SYSTEM_PROMPT = (
+    "You are a helpful research assistant working with a single academic source. "
+    "Base your answers on the source below and provide clear, accurate, and well-structured responses."
+)
+
+
+MULTI_SOURCE_SYSTEM_PROMPT = (
+    "You are a helpful research assistant working with several academic sources. "
+    "Base your answers on the passages below and cite the sources you use by their labels, e.g. [S1]."
+)
+
+
+def mode_instruction(mode: str, message: str, subject: str = 'this research source') -> str:
+    """The instruction for a chat message in the given interaction mode"""
+    if mode == 'summary':
+        return f"Based on {subject}, provide a point-form summary addressing: {message}"
+    if mode == 'explanation':
+        return f"Explain the concepts in {subject} as they relate to: {message}"
+    if mode == 'implementation':
+        return f"Provide step-by-step implementation guidance based on {subject} for: {message}"
+    return f"Respond to: {message}"
+
+
+def render_source_content(source: Source) -> str:
+    """Render a source record as a deterministic text block.
+
+    Fields are always emitted in the same order with the same labels so that
+    repeated calls on one source produce identical bytes.
+    """
+    # Full text is not stored yet, so the content line is a fixed placeholder
+    return (
+        f"Title: {source.title or ''}\n\n"
+        f"Authors: {', '.join(source.authors)}\n\n"
+        f"Year: {source.year or ''}\n\n"
+        f"Field: {source.field or ''}\n\n"
+        f"Type: {source.type or ''}\n\n"
+        f"Abstract: {source.abstract or ''}\n\n"
+        f"Content: Content not available"
+    )
+
+
+def source_content_hash(source: Source) -> str:
+    """Hash of the rendered source, used to key results derived from it"""
+    return hashlib.sha256(render_source_content(source).encode('utf-8')).hexdigest()
+
+
+def _source_system_message(source_text: str) -> str:
+    return f"{SOURCE_SYSTEM_PROMPT}\n\n=== SOURCE ===\n{source_text}\n=== END SOURCE ==="
+
+
+def build_budgeted_source_messages(
+    source: Source,
+    instruction: str,
+    model: str,
+    logger,
+    history: List[Dict[str, str]] = None,
+    **fields,
+) -> List[Dict[str, str]]:
+    """Build source messages, trimming the source so the prompt fits the model budget.
+
+    Raises PromptTooLargeError when the instruction and history alone do not
+    fit, since no amount of trimming the source would help. Source token counts are cached per source ID and content hash, so hot
+    sources are only tokenized once. Conversation history goes between the
+    source prefix and the instruction so the prefix stays cacheable.
+    """
+    history = history or []
+    source_text = render_source_content(source)
+    source_tokens = token_budget.count_source(source.id, source_content_hash(source), source_text, model)
+    fixed_tokens = (
+        token_budget.count(_source_system_message(''), model)
+        + token_budget.count(instruction, model)
+        + token_budget.count_messages(history, model)
+        + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+    budget = token_budget.prompt_budget(model)
+    room = token_budget.room_for(fixed_tokens, model)
+
+    truncated = source_tokens > room
+    if truncated:
+        source_text = token_budget.truncate(source_text, room, model)
+
+    logger.info('Prompt token budget', {
+        **fields,
+        'model': model,
+        'sourceTokens': source_tokens,
+        'fixedTokens': fixed_tokens,
+        'budget': budget,
+        'truncated': truncated,
+    })
+
+    return [
+        {"role": "system", "content": _source_system_message(source_text)},
+        *history,
+        {"role": "user", "content": instruction},
+    ]
+
+
+def build_multi_source_messages(passages: Dict[str, Tuple[Source, List[str]]], instruction: str) -> List[Dict[str, str]]:
+    """Build chat messages grounding an instruction in passages from several sources.
+
+    passages maps each citation label to its source and the retrieved passages.
+    """
+    blocks = []
+    for label, (source, texts) in passages.items():
+        heading = f"[{label}] {source.title or ''} ({source.year or 'n.d.'})"
+        blocks.append(heading + "\n" + "\n\n".join(texts))
+    sources_text = "\n\n".join(blocks)
+    return [
+        {"role": "system", "content": f"{MULTI_SOURCE_SYSTEM_PROMPT}\n\n=== SOURCES ===\n{sources_text}\n=== END SOURCES ==="},
+        {"role": "user", "content": instruction},
+    ]
+
+
+class PromptCacheStats:
+    """Process-wide counters of prompt tokens served from the provider cache"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, response) -> Dict[str, int]:
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+
+        return {
+            'promptTokens': prompt_tokens,
+            'cachedTokens': cached_tokens,
+        }
+
+    def hit_ratio(self) -> float:
+        if not self.prompt_tokens:
+            return 0.0
+        return self.cached_tokens / self.prompt_tokens
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+def record_cache_usage(response, logger, **fields) -> Dict[str, int]:
+    """Record cached-token usage from a completion response and log it"""
+    usage = prompt_cache_stats.record(response)
+    logger.info('Prompt cache usage', {
+        **fields,
+        **usage,
+        'cacheHitRatio': round(prompt_cache_stats.hit_ratio(), 3),
+    })
+    return usage
@@ -0,0 +1,478 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .request_context import ANONYMOUS_USER, current_user_id
+
+# Priority classes: interactive work is always dispatched first and batch
+# work only gets the capacity interactive callers leave over
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError'}
+
+
+class TokenBucket:
+    """Continuously refilling bucket that allows bursts up to its capacity"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket and return how long to wait before using it"""
+        self._refill()
+        # Requests larger than the bucket would never fit; cap them to a full bucket
+        amount = min(amount, self.capacity)
+        self.available -= amount
+        if self.available >= 0:
+            return 0.0
+        return -self.available / self.refill_per_second
+
+    def refund(self, amount: float):
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    return _status_code(error) in RETRYABLE_STATUS_CODES or type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+class QuotaExceededError(Exception):
+    """Raised when a user has spent their token budget for the current window"""
+
+    def __init__(self, user_id: str, retry_after: float):
+        super().__init__(f'Token quota exceeded for user {user_id}')
+        self.user_id = user_id
+        self.retry_after = retry_after
+
+
+class UserTokenQuota:
+    """Per-user token budget over a sliding time window.
+
+    Callers without a user ID share one anonymous budget, so omitting the ID
+    does not escape the quota.
+    """
+
+    def __init__(self, budget: int, window_seconds: float, anonymous_budget: Optional[int] = None):
+        self.budget = budget
+        self.anonymous_budget = budget if anonymous_budget is None else anonymous_budget
+        self.window_seconds = window_seconds
+        self._usage: Dict[str, deque] = {}
+        self._totals: Dict[str, int] = {}
+
+    def _expire(self, user_id: str, now: float):
+        usage = self._usage.get(user_id)
+        while usage and now - usage[0][0] > self.window_seconds:
+            self._totals[user_id] -= usage.popleft()[1]
+        if usage is not None and not usage:
+            del self._usage[user_id]
+            del self._totals[user_id]
+
+    def budget_for(self, user_id: str) -> int:
+        return self.anonymous_budget if user_id == ANONYMOUS_USER else self.budget
+
+    def enforced(self, user_id: str) -> bool:
+        return self.budget_for(user_id) > 0
+
+    def consume(self, user_id: str, tokens: int):
+        """Record tokens against the user's budget or raise if it would be exceeded"""
+        if not self.enforced(user_id):
+            return
+        now = time.monotonic()
+        self._expire(user_id, now)
+        used = self._totals.get(user_id, 0)
+        if used + tokens > self.budget_for(user_id) and used > 0:
+            oldest = self._usage[user_id][0][0]
+            raise QuotaExceededError(user_id, max(self.window_seconds - (now - oldest), 0.0))
+        self._usage.setdefault(user_id, deque()).append((now, tokens))
+        self._totals[user_id] = used + tokens
+
+    def adjust(self, user_id: str, tokens: int):
+        """Correct a user's recorded usage once the actual token count is known"""
+        if not self.enforced(user_id) or user_id not in self._usage:
+            return
+        self._usage[user_id].append((time.monotonic(), tokens))
+        self._totals[user_id] += tokens
+
+    def used(self, user_id: str) -> int:
+        self._expire(user_id, time.monotonic())
+        return self._totals.get(user_id, 0)
+
+
+class _Waiter:
+    __slots__ = ('enqueued_at', 'future', 'user_id', 'cost')
+
+    def __init__(self, future, user_id: str, cost: int):
+        self.enqueued_at = time.monotonic()
+        self.future = future
+        self.user_id = user_id
+        self.cost = cost
+
+
+class FairQueue:
+    """Deficit round-robin queue across users, weighted by estimated tokens.
+
+    Each user with pending calls earns quantum tokens of credit per turn, so
+    under contention every user gets an equal share of token throughput no
+    matter how many calls they queue.
+    """
+
+    def __init__(self, quantum: int = 1000):
+        self.quantum = quantum
+        self._users = deque()
+        self._entries: Dict[str, deque] = {}
+        self._deficits: Dict[str, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, waiter: _Waiter):
+        if waiter.user_id not in self._entries:
+            self._entries[waiter.user_id] = deque()
+            self._deficits[waiter.user_id] = 0
+            self._users.append(waiter.user_id)
+        self._entries[waiter.user_id].append(waiter)
+        self._size += 1
+
+    def _drop_user_if_idle(self, user_id: str):
+        if not self._entries[user_id]:
+            del self._entries[user_id]
+            del self._deficits[user_id]
+            self._users.remove(user_id)
+
+    def remove(self, waiter: _Waiter):
+        """Drop a waiter, unless dispatch already popped it, e.g. after it was cancelled"""
+        entries = self._entries.get(waiter.user_id)
+        if entries is None or waiter not in entries:
+            return
+        entries.remove(waiter)
+        self._size -= 1
+        self._drop_user_if_idle(waiter.user_id)
+
+    def popleft(self) -> _Waiter:
+        while True:
+            user_id = self._users[0]
+            entries = self._entries[user_id]
+            if self._deficits[user_id] >= entries[0].cost:
+                self._deficits[user_id] -= entries[0].cost
+                waiter = entries.popleft()
+                self._size -= 1
+                self._drop_user_if_idle(user_id)
+                return waiter
+            self._deficits[user_id] += self.quantum
+            self._users.rotate(-1)
+
+    def oldest_enqueued_at(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return min(entries[0].enqueued_at for entries in self._entries.values())
+
+    def users(self) -> int:
+        return len(self._users)
+
+
+class RateLimiter:
+    """Process-wide limiter for calls to a rate-limited upstream.
+
+    Combines request and token buckets sized to the account limits with an
+    AIMD concurrency window: the window grows by roughly one slot per window
+    of successful calls and halves on 429s or shrinks when latency exceeds
+    the target. Retryable failures are retried with full-jitter exponential
+    backoff, honoring Retry-After when the upstream sends it.
+
+    Waiting calls are dispatched by priority class. Batch calls may only use
+    batch_share of the window so interactive calls never wait behind them,
+    and a batch call queued longer than starvation_timeout is served next.
+    Within a class, users share capacity through a fair queue and each user
+    is held to a token budget over a sliding window.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        initial_concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 64,
+        latency_target: float = 30.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0,
+        batch_share: float = 0.75,
+        starvation_timeout: float = 15.0,
+        user_token_budget: int = 0,
+        user_budget_window: float = 3600.0,
+        anonymous_token_budget: Optional[int] = None,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.window = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.batch_share = batch_share
+        self.starvation_timeout = starvation_timeout
+
+        self.in_flight = 0
+        self.in_flight_by_class = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._queues = {priority: FairQueue() for priority in PRIORITY_CLASSES}
+        self.quota = UserTokenQuota(user_token_budget, user_budget_window, anonymous_token_budget)
+
+        self.stats = {
+            'requests': 0,
+            'throttled': 0,
+            'retries': 0,
+            'failures': 0,
+            'queueWaitTotal': 0.0,
+            'queueWaitMax': 0.0,
+            'dispatchedByClass': {priority: 0 for priority in PRIORITY_CLASSES},
+            'starvationPromotions': 0,
+            'quotaRejections': 0,
+        }
+
+    @classmethod
+    def from_env(cls, prefix: str = 'OPENAI') -> 'RateLimiter':
+        # Unset, anonymous callers share a budget the size of one user's
+        anonymous_budget = os.getenv(f'{prefix}_ANONYMOUS_TOKEN_BUDGET')
+        return cls(
+            requests_per_minute=float(os.getenv(f'{prefix}_RPM_LIMIT', '500')),
+            tokens_per_minute=float(os.getenv(f'{prefix}_TPM_LIMIT', '30000')),
+            initial_concurrency=float(os.getenv(f'{prefix}_INITIAL_CONCURRENCY', '4')),
+            max_concurrency=float(os.getenv(f'{prefix}_MAX_CONCURRENCY', '64')),
+            latency_target=float(os.getenv(f'{prefix}_LATENCY_TARGET_SECONDS', '30')),
+            max_retries=int(os.getenv(f'{prefix}_MAX_RETRIES', '4')),
+            batch_share=float(os.getenv(f'{prefix}_BATCH_SHARE', '0.75')),
+            starvation_timeout=float(os.getenv(f'{prefix}_BATCH_STARVATION_SECONDS', '15')),
+            user_token_budget=int(os.getenv(f'{prefix}_USER_TOKEN_BUDGET', '0')),
+            user_budget_window=float(os.getenv(f'{prefix}_USER_BUDGET_WINDOW_SECONDS', '3600')),
+            anonymous_token_budget=int(anonymous_budget) if anonymous_budget else None,
+        )
+
+    # Concurrency window
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(int(self.window), 1)
+
+    def _batch_has_capacity(self) -> bool:
+        return self.in_flight_by_class[BATCH] < max(int(self.window * self.batch_share), 1)
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _next_waiter(self):
+        """Pick the next waiter: starved batch work, then interactive, then batch"""
+        interactive, batch = self._queues[INTERACTIVE], self._queues[BATCH]
+        if batch and time.monotonic() - batch.oldest_enqueued_at() > self.starvation_timeout:
+            if interactive:
+                self.stats['starvationPromotions'] += 1
+            return BATCH, batch.popleft()
+        if interactive:
+            return INTERACTIVE, interactive.popleft()
+        if batch and self._batch_has_capacity():
+            return BATCH, batch.popleft()
+        return None, None
+
+    def _grant(self, priority: str):
+        self.in_flight += 1
+        self.in_flight_by_class[priority] += 1
+        self.stats['dispatchedByClass'][priority] += 1
+
+    def _dispatch(self):
+        while self._has_capacity():
+            priority, waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if not waiter.future.done():
+                self._grant(priority)
+                waiter.future.set_result(None)
+
+    async def _acquire_slot(self, priority: str, user_id: str, cost: int):
+        can_start = self._has_capacity() and (
+            not self._queues[INTERACTIVE] if priority == INTERACTIVE
+            else not self._queued() and self._batch_has_capacity()
+        )
+        if can_start:
+            self._grant(priority)
+            return
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), user_id, cost)
+        self._queues[priority].append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Slot was granted just before cancellation; hand it on
+                self._release_slot(priority)
+            else:
+                self._queues[priority].remove(waiter)
+            raise
+
+    def _release_slot(self, priority: str):
+        self.in_flight -= 1
+        self.in_flight_by_class[priority] -= 1
+        self._dispatch()
+
+    def _on_success(self, latency: float):
+        if latency > self.latency_target:
+            self.window = max(self.min_concurrency, self.window * 0.8)
+        else:
+            self.window = min(self.max_concurrency, self.window + 1 / self.window)
+        self._dispatch()
+
+    def _on_throttle(self):
+        self.stats['throttled'] += 1
+        self.window = max(self.min_concurrency, self.window / 2)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    # Public API
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int = 0,
+        logger=None,
+        priority: str = INTERACTIVE,
+        user_id: Optional[str] = None,
+    ) -> Any:
+        """Run call once capacity is available, retrying retryable failures.
+
+        user_id defaults to the user bound to the current request.
+        """
+        if priority not in self._queues:
+            raise ValueError(f'Unknown priority class: {priority}')
+
+        user_id = user_id or current_user_id.get()
+        try:
+            self.quota.consume(user_id, estimated_tokens)
+        except QuotaExceededError as error:
+            self.stats['quotaRejections'] += 1
+            if logger is not None:
+                logger.warn('User token quota exceeded', {
+                    'userId': user_id,
+                    'used': self.quota.used(user_id),
+                    'budget': self.quota.budget_for(user_id),
+                    'retryAfterSeconds': round(error.retry_after),
+                })
+            raise
+
+        for attempt in range(self.max_retries + 1):
+            queued_at = time.monotonic()
+            await self._acquire_slot(priority, user_id, estimated_tokens)
+            try:
+                wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(estimated_tokens))
+                if wait:
+                    await asyncio.sleep(wait)
+
+                queue_wait = time.monotonic() - queued_at
+                self.stats['requests'] += 1
+                self.stats['queueWaitTotal'] += queue_wait
+                self.stats['queueWaitMax'] = max(self.stats['queueWaitMax'], queue_wait)
+
+                started_at = time.monotonic()
+                try:
+                    result = await call()
+                except Exception as error:
+                    if _status_code(error) == 429:
+                        self._on_throttle()
+                    if not is_retryable(error) or attempt == self.max_retries:
+                        self.stats['failures'] += 1
+                        raise
+                    status = _status_code(error)
+                    delay = self._backoff(attempt, error)
+                else:
+                    self._on_success(time.monotonic() - started_at)
+                    if logger is not None:
+                        logger.info('Rate limiter dispatched request', {
+                            'priority': priority,
+                            'userId': user_id,
+                            'queueWaitMs': round(queue_wait * 1000),
+                            'attempt': attempt + 1,
+                            'window': round(self.window, 2),
+                            'inFlight': self.in_flight,
+                            'queued': self._queued(),
+                        })
+                    return result
+            finally:
+                self._release_slot(priority)
+
+            self.stats['retries'] += 1
+            if logger is not None:
+                logger.warn('Retrying rate-limited request', {
+                    'priority': priority,
+                    'attempt': attempt + 1,
+                    'status': status,
+                    'delaySeconds': round(delay, 2),
+                    'window': round(self.window, 2),
+                })
+            await asyncio.sleep(delay)
+
+    def refund_tokens(self, amount: int, user_id: Optional[str] = None):
+        """Return over-estimated tokens once actual usage is known"""
+        if amount > 0:
+            self.token_bucket.refund(amount)
+        self.quota.adjust(user_id or current_user_id.get(), -amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        requests = self.stats['requests']
+        return {
+            'window': round(self.window, 2),
+            'inFlight': self.in_flight,
+            'inFlightByClass': dict(self.in_flight_by_class),
+            'queued': self._queued(),
+            'queuedByClass': {priority: len(queue) for priority, queue in self._queues.items()},
+            'dispatchedByClass': dict(self.stats['dispatchedByClass']),
+            'starvationPromotions': self.stats['starvationPromotions'],
+            'queuedUsers': sum(queue.users() for queue in self._queues.values()),
+            'quotaRejections': self.stats['quotaRejections'],
+            'requests': requests,
+            'throttled': self.stats['throttled'],
+            'retries': self.stats['retries'],
+            'failures': self.stats['failures'],
+            'queueWaitAvgMs': round(self.stats['queueWaitTotal'] / requests * 1000) if requests else 0,
+            'queueWaitMaxMs': round(self.stats['queueWaitMax'] * 1000),
+        }
+
+
+openai_rate_limiter = RateLimiter.from_env('OPENAI')
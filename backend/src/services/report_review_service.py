@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from .database_service import database_service
+from .openai_service import OpenAIService
+from .rate_limiter import BATCH
+from .request_context import DeadlineExceededError, remaining_time
+from .token_budget import token_budget
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$', re.MULTILINE)
+
+# Sections above this size are split further so they review in parallel too
+MAX_SECTION_TOKENS = int(os.getenv('REPORT_SECTION_MAX_TOKENS', '3000'))
+MAX_CONCURRENT_SECTIONS = int(os.getenv('REPORT_REVIEW_CONCURRENCY', '4'))
+
+SYSTEM_PROMPT = "You are an expert research reviewer. Provide constructive, specific feedback on research reports."
+
+PROMPT_TEMPLATE = """Review this section of a research report and provide structured feedback. Focus on: {flags_text}
+
+Section: {section}
+
+Section Content:
+{content}
+
+Provide feedback in JSON format with the following structure:
+{{
+  "feedback": [
+    {{
+      "section": "{section}",
+      "issueType": "replicability|evidence|citation|methodology|clarity|other",
+      "suggestion": "specific improvement suggestion",
+      "confidence": 0.0-1.0
+    }}
+  ]
+}}"""
+
+
+def flags_to_text(flags: Dict[str, Any]) -> str:
+    flag_descriptions = []
+    if flags.get('replicability'):
+        flag_descriptions.append("Check for replicability issues")
+    if flags.get('evidence_check'):
+        flag_descriptions.append("Verify evidence and citations")
+    return "; ".join(flag_descriptions) if flag_descriptions else "General review"
+
+
+def flags_key(flags: Dict[str, Any]) -> str:
+    """Canonical key of the review flags that change the prompt"""
+    return json.dumps(sorted(name for name, enabled in flags.items() if enabled))
+
+
+def section_hash(label: str, content: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{label}\0{content}".encode('utf-8')).hexdigest()
+
+
+def split_report_sections(report_content: str) -> List[Tuple[str, str]]:
+    """Split a report into (label, content) pairs by markdown headings.
+
+    Text before the first heading is labelled 'general'. Empty sections are
+    dropped.
+    """
+    sections = []
+    matches = list(HEADING_PATTERN.finditer(report_content))
+
+    preamble = report_content[:matches[0].start()] if matches else report_content
+    if preamble.strip():
+        sections.append(('general', preamble.strip()))
+
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(report_content)
+        body = report_content[match.end():end].strip()
+        if body:
+            sections.append((match.group(2).strip(), body))
+
+    return sections
+
+
+class ReportReviewService:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_SECTIONS):
+        self.max_concurrency = max_concurrency
+
+    def plan_sections(self, report_content: str, flags_text: str, model: str) -> List[Tuple[str, str]]:
+        """Split a report into sections that each fit one review prompt"""
+        fixed_tokens = token_budget.count_messages([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": PROMPT_TEMPLATE.format(flags_text=flags_text, section='', content='')},
+        ], model)
+        section_budget = min(MAX_SECTION_TOKENS, token_budget.room_for(fixed_tokens, model))
+
+        planned = []
+        for label, content in split_report_sections(report_content):
+            chunks = token_budget.chunk(content, section_budget, model)
+            if len(chunks) == 1:
+                planned.append((label, content))
+            else:
+                planned.extend((f"{label} (part {i + 1})", chunk) for i, chunk in enumerate(chunks))
+        return planned
+
+    async def review_section(self, openai: OpenAIService, label: str, content: str, flags_text: str, logger=None) -> List[Dict[str, Any]]:
+        response = await openai.create_completion(
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": PROMPT_TEMPLATE.format(flags_text=flags_text, section=label, content=content)}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.3,
+            logger=logger,
+            priority=BATCH,
+        )
+
+        feedback = json.loads(response.choices[0].message.content).get('feedback', [])
+        for item in feedback:
+            item['section'] = label
+        return feedback
+
+    async def review_report(self, report_content: str, flags: Dict[str, Any], logger, on_progress=None) -> Dict[str, Any]:
+        """Review a report, re-analyzing only sections that changed since the last review.
+
+        Feedback is cached per section content hash and flags, so on a
+        resubmission unchanged sections reuse their earlier feedback and only
+        new or edited sections are sent to the model, concurrently. Sections
+        not finished by the request deadline are reported as timed out.
+        on_progress, if given, is awaited with (reviewed, pending) sections
+        as each review finishes.
+        """
+        openai = OpenAIService()
+        flags_text = flags_to_text(flags)
+        review_key = flags_key(flags)
+        sections = self.plan_sections(report_content, flags_text, openai.model)
+        hashes = [section_hash(label, content, openai.model) for label, content in sections]
+
+        await database_service.create_report_section_feedback_table()
+        cached = await database_service.get_report_section_feedback(list(set(hashes)), review_key)
+        pending = [(i, label, content) for i, (label, content) in enumerate(sections) if hashes[i] not in cached]
+
+        logger.info('Reviewing report sections', {
+            'sections': len(sections),
+            'cachedSections': len(sections) - len(pending),
+            'pendingSections': len(pending),
+            'maxConcurrency': self.max_concurrency,
+            'sectionTokens': [token_budget.count(content, openai.model) for _, content in sections],
+        })
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        done = 0
+
+        async def review(label, content):
+            nonlocal done
+            async with semaphore:
+                result = await self.review_section(openai, label, content, flags_text, logger)
+            done += 1
+            if on_progress is not None:
+                await on_progress(done, len(pending))
+            return result
+
+        tasks = [asyncio.ensure_future(review(label, content)) for _, label, content in pending]
+        unfinished = set()
+        if tasks:
+            # Sections still running at the request deadline are abandoned
+            _, unfinished = await asyncio.wait(tasks, timeout=remaining_time())
+            for task in unfinished:
+                task.cancel()
+
+        reviewed = {}
+        failed_sections = []
+        timed_out_sections = []
+        errors = []
+        for (i, label, _), task in zip(pending, tasks):
+            if task in unfinished:
+                timed_out_sections.append(label)
+            elif task.exception() is not None:
+                logger.error('Error reviewing report section', {'section': label, 'error': str(task.exception())})
+                failed_sections.append(label)
+                errors.append(task.exception())
+            else:
+                reviewed[hashes[i]] = task.result()
+
+        if timed_out_sections:
+            logger.warn('Report review deadline exceeded', {'timedOutSections': timed_out_sections})
+
+        # Reused feedback is still worth returning when time ran out, but not
+        # when every section errored
+        if pending and not reviewed and not (timed_out_sections and cached):
+            raise errors[0] if errors else DeadlineExceededError()
+
+        # Mock responses (no API key) are never stored, or they would outlive a configured key
+        if openai.client is not None:
+            await database_service.save_report_section_feedback(reviewed, review_key)
+
+        feedback = []
+        for h in hashes:
+            feedback.extend(reviewed.get(h, cached.get(h, [])))
+
+        return {
+            'feedback': feedback,
+            'sections': [label for label, _ in sections],
+            'reusedSections': [label for (label, _), h in zip(sections, hashes) if h in cached],
+            'failedSections': failed_sections,
+            'timedOutSections': timed_out_sections,
+        }
+
+
+def feedback_result(review: Dict[str, Any]) -> Dict[str, Any]:
+    """Response body for a completed review"""
+    return {
+        'message': 'Feedback generated successfully',
+        'feedback': review['feedback'],
+        'sections': review['sections'],
+        'reusedSections': review['reusedSections'],
+        'failedSections': review['failedSections'],
+        'timedOutSections': review['timedOutSections']
+    }
+
+
+report_review_service = ReportReviewService()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Optional
+
+ANONYMOUS_USER = 'anonymous'
+
+# End-to-end time budget for an API request unless the step asks for another
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT_SECONDS', '30'))
+
+# Identity of the caller for the request being handled; copied into tasks
+# spawned with asyncio.gather/create_task so services can read it directly
+current_user_id: ContextVar[str] = ContextVar('current_user_id', default=ANONYMOUS_USER)
+
+# Monotonic time by which the current request must finish, if it has a budget
+current_deadline: ContextVar[Optional[float]] = ContextVar('current_deadline', default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a request has used up its time budget"""
+
+    def __init__(self, message: str = 'Request deadline exceeded'):
+        super().__init__(message)
+
+
+def resolve_user_id(req: Dict[str, Any], body: Dict[str, Any] = None) -> str:
+    """Find the caller's user ID from the body, query string or headers"""
+    body = body if isinstance(body, dict) else {}
+    headers = {str(k).lower(): v for k, v in (req.get('headers') or {}).items()}
+    user_id = body.get('userId') or (req.get('queryParams') or {}).get('userId') or headers.get('x-user-id')
+    if isinstance(user_id, list):
+        user_id = user_id[0] if user_id else None
+    return str(user_id) if user_id else ANONYMOUS_USER
+
+
+def bind_user(req: Dict[str, Any], body: Dict[str, Any] = None) -> str:
+    """Resolve the caller's user ID and make it current for this request"""
+    user_id = resolve_user_id(req, body)
+    current_user_id.set(user_id)
+    return user_id
+
+
+def start_deadline(timeout: float = None) -> float:
+    """Give the current request a time budget that services will honor"""
+    deadline = time.monotonic() + (DEFAULT_REQUEST_TIMEOUT if timeout is None else timeout)
+    current_deadline.set(deadline)
+    return deadline
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without a deadline"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def check_deadline():
+    """Raise if the current request has no time left"""
+    if remaining_time() == 0:
+        raise DeadlineExceededError()
+
+
+def timeout_within_deadline(timeout: float) -> float:
+    """Cap a per-call timeout by what is left of the request's budget"""
+    check_deadline()
+    remaining = remaining_time()
+    return timeout if remaining is None else min(timeout, remaining)
+
+
+async def run_within_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Await awaitable, cancelling it if the request's deadline passes first"""
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    if remaining == 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceededError()
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except DeadlineExceededError:
+        raise
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError()
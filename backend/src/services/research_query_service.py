@@ -0,0 +1,153 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from .database_service import database_service
+from .interaction_log_service import normalize_query
+from .openai_service import OpenAIService
+from .request_context import DeadlineExceededError
+from .resilience import CircuitOpenError
+from .ttl_cache import MISSING, TTLCache
+from .types import Source
+
+# Sources returned per query
+MAX_RESULTS = 10
+# Fewer stored matches than this and new sources are generated
+MIN_STORED_SOURCES = 5
+
+# Long enough that results warmed before the morning peak last through it
+RESULT_CACHE_SIZE = int(os.getenv('RESEARCH_QUERY_CACHE_SIZE', '256'))
+RESULT_CACHE_TTL = float(os.getenv('RESEARCH_QUERY_CACHE_TTL_SECONDS', '21600'))
+
+
+QUERY_TOKEN = re.compile(r'\w+')
+# Words that don't change which sources a query is after
+QUERY_STOPWORDS = frozenset(
+    'a an and are as at be by for from how in into is it of on or the to what which with'.split()
+)
+
+
+def canonical_query(query: str) -> str:
+    """Lowercased, deduplicated, sorted tokens with stopwords dropped.
+
+    Queries made only of stopwords or punctuation keep their normalized text,
+    so they don't all collapse onto one key.
+    """
+    tokens = sorted({token for token in QUERY_TOKEN.findall(query.lower()) if token not in QUERY_STOPWORDS})
+    return ' '.join(tokens) or normalize_query(query)
+
+
+def canonical_filters(filters: Dict[str, Any]) -> str:
+    """Filters serialized with sorted keys, empty values dropped and text lowercased"""
+    canonical = {}
+    for name, value in (filters or {}).items():
+        if value is None or value == '' or value == []:
+            continue
+        # Field and type match case-insensitively and year by SQLite affinity
+        canonical[name] = str(value).strip().lower()
+    return json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+
+
+def query_cache_key(query: str, filters: Dict[str, Any]) -> Tuple[str, str]:
+    return canonical_query(query), canonical_filters(filters)
+
+
+def source_result(source: Source) -> Dict[str, Any]:
+    """A stored source as returned by the research query API"""
+    return {
+        'title': source.title,
+        # Copied, since the cached record shares its list
+        'authors': list(source.authors),
+        'abstract': source.abstract or '',
+        'url': source.url or '',
+        'year': source.year,
+        'field': source.field,
+        'type': source.type
+    }
+
+
+class ResearchQueryService:
+    """Runs research queries behind a result cache that a cron step keeps warm.
+
+    Results are keyed by the canonical query and filters. Inserting or
+    updating a source drops every cached result it could now appear in.
+    """
+
+    def __init__(self, cache_size: int = RESULT_CACHE_SIZE, cache_ttl: float = RESULT_CACHE_TTL):
+        self.result_cache = TTLCache(cache_size, cache_ttl)
+
+    async def query(self, query: str, filters: Dict[str, Any], logger) -> Tuple[Dict[str, Any], bool]:
+        """Return ({'sources', 'partial', 'facets'}, cached) for a query"""
+        key = query_cache_key(query, filters)
+        cached = self.result_cache.get(key)
+        if cached is not MISSING:
+            return cached, True
+        result = await self.compute(query, filters, logger)
+        self._store(key, result)
+        return result, False
+
+    async def warm(self, query: str, filters: Dict[str, Any], logger) -> Dict[str, Any]:
+        """Recompute a query and refresh its cache entry"""
+        result = await self.compute(query, filters, logger)
+        self._store(query_cache_key(query, filters), result)
+        return result
+
+    def _store(self, key: Tuple[str, str], result: Dict[str, Any]):
+        # Partial results are served once but not kept, so the next request retries upstream
+        if not result['partial']:
+            self.result_cache.set(key, result)
+
+    async def compute(self, query: str, filters: Dict[str, Any], logger) -> Dict[str, Any]:
+        """Search stored sources, generating and storing new ones when there are few"""
+        # Ensure table exists
+        await database_service.create_sources_table()
+
+        # Searched by the canonical query, so every query sharing a cache key
+        # gets the same matches
+        terms = canonical_query(query)
+        sources: List[Any] = await database_service.search_sources(terms, filters)
+
+        partial = False
+        if len(sources) < MIN_STORED_SOURCES:
+            openai = OpenAIService()
+            try:
+                generated_sources = await openai.research_sources(query, filters)
+            except (CircuitOpenError, DeadlineExceededError):
+                # Serve what the database has rather than waiting on a failing upstream
+                logger.warn('OpenAI unavailable, returning stored sources only', {'query': query})
+                generated_sources = []
+                partial = True
+
+            # Store new sources in database
+            for source in generated_sources:
+                try:
+                    await database_service.insert_source(source)
+                except Exception as e:
+                    logger.error('Error storing source', {'error': str(e), 'source': source})
+                # Still add to response even if DB fails
+                sources.append(source)
+
+        return {
+            # Stored records are serialized only here, and only the ones returned
+            'sources': [source_result(source) if isinstance(source, Source) else source for source in sources[:MAX_RESULTS]],
+            'partial': partial,
+            # Counted after generated sources are stored so they are included
+            'facets': await database_service.source_facets(terms, filters),
+        }
+
+    def invalidate_matching(self, source: Dict[str, Any]):
+        """Drop cached results whose query the source's title or abstract could match"""
+        # Search matches every canonical token as a substring; filters are
+        # ignored, erring on dropping
+        text = f"{source.get('title') or ''} {source.get('abstract') or ''}".lower()
+        for key in self.result_cache.keys():
+            if all(token in text for token in key[0].split()):
+                self.result_cache.invalidate(key)
+
+    def snapshot(self) -> dict:
+        return self.result_cache.snapshot()
+
+
+research_query_service = ResearchQueryService()
+database_service.source_listeners.append(research_query_service.invalidate_matching)
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f'{name} is unavailable, circuit open')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast for recovery_timeout seconds. It then lets half_open_max_calls
+    probes through; a successful probe closes the circuit, a failed one opens
+    it again. Only errors matching is_failure count, so bad requests do not
+    take the upstream out of service.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        is_failure: Callable[[BaseException], bool] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.is_failure = is_failure or (lambda error: True)
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.stats = {'opened': 0, 'rejected': 0, 'failures': 0}
+
+    @classmethod
+    def from_env(cls, prefix: str, **kwargs) -> 'CircuitBreaker':
+        return cls(
+            name=prefix.lower(),
+            failure_threshold=int(os.getenv(f'{prefix}_BREAKER_FAILURE_THRESHOLD', '5')),
+            recovery_timeout=float(os.getenv(f'{prefix}_BREAKER_RECOVERY_SECONDS', '30')),
+            **kwargs,
+        )
+
+    def retry_after(self) -> float:
+        return max(self.recovery_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def _admit(self) -> bool:
+        """Check the call may proceed; returns True when it is a half-open probe"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self.retry_after())
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_max_calls:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self.recovery_timeout)
+            self.probes_in_flight += 1
+            return True
+        return False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.stats['opened'] += 1
+
+    def _on_success(self):
+        self.consecutive_failures = 0
+        self.state = CLOSED
+
+    def _on_failure(self):
+        self.stats['failures'] += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    async def call(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call through the breaker, raising CircuitOpenError while open"""
+        probe = self._admit()
+        try:
+            result = await call()
+        except Exception as error:
+            # Other errors (bad requests, local quotas) say nothing about upstream health
+            if self.is_failure(error):
+                self._on_failure()
+            raise
+        finally:
+            if probe:
+                self.probes_in_flight -= 1
+        self._on_success()
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutiveFailures': self.consecutive_failures,
+            'retryAfterSeconds': round(self.retry_after(), 1) if self.state == OPEN else 0,
+            **self.stats,
+        }
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for percentile-based hedging"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    tracker: LatencyTracker,
+    percentile: float = 0.95,
+    min_delay: float = 0.05,
+    logger=None,
+) -> Any:
+    """Run an idempotent call, firing one backup if it outlives the p95 latency.
+
+    Whichever attempt succeeds first wins and the other is cancelled. A call
+    running in a worker thread only stops being awaited; the thread runs on.
+    Until the tracker has enough samples no backup is sent.
+    """
+    started = time.monotonic()
+    delay = tracker.percentile(percentile)
+    primary = asyncio.ensure_future(call())
+    pending = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(pending, timeout=max(delay, min_delay))
+            if not done:
+                if logger is not None:
+                    logger.info('Sending hedged request', {'hedgeDelayMs': round(delay * 1000)})
+                pending.add(asyncio.ensure_future(call()))
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    tracker.record(time.monotonic() - started)
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+    finally:
+        for attempt in pending:
+            attempt.cancel()
@@ -0,0 +1,77 @@
+import itertools
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .embedding_service import cosine_similarity
+
+# Minimum cosine similarity for a previous answer to be reused
+SIMILARITY_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9'))
+# Answers kept across all sources and modes, least recently used evicted first
+MAX_ENTRIES = int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '2048'))
+
+
+class SemanticCache:
+    """In-process vector index of previous answers, partitioned by key.
+
+    Each key (for chat: source, source content hash and mode) holds its own
+    small set of (embedding, answer) entries that are scanned linearly. A
+    single LRU across all keys bounds the total number of entries.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, threshold: float = SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, Tuple[Hashable, List[float], Any]]" = OrderedDict()
+        self._by_key: Dict[Hashable, set] = {}
+        self._ids = itertools.count()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable, vector: List[float]) -> Optional[Tuple[Any, float]]:
+        """Return (answer, similarity) of the closest entry above the threshold"""
+        best_id, best_similarity = None, self.threshold
+        for entry_id in self._by_key.get(key, ()):
+            similarity = cosine_similarity(vector, self._entries[entry_id][1])
+            if similarity >= best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id][2], best_similarity
+
+    def store(self, key: Hashable, vector: List[float], answer: Any):
+        if self.max_entries <= 0:
+            return
+        entry_id = next(self._ids)
+        self._entries[entry_id] = (key, vector, answer)
+        self._by_key.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        entry_id, (key, _, _) = self._entries.popitem(last=False)
+        self._by_key[key].discard(entry_id)
+        if not self._by_key[key]:
+            del self._by_key[key]
+        self.stats['evictions'] += 1
+
+    def hit_rate(self) -> float:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'keys': len(self._by_key),
+            'hitRate': self.hit_rate(),
+            **self.stats,
+        }
+
+
+chat_answer_cache = SemanticCache()
@@ -0,0 +1,123 @@
+from typing import Any, Dict, Tuple
+
+from .database_service import database_service
+from .openai_service import OpenAIService
+from .prompt_builder import build_budgeted_source_messages, record_cache_usage, source_content_hash
+from .rate_limiter import INTERACTIVE
+from .types import Source
+
+VALID_ACTIONS = [
+    'generate_code_snippet',
+    'highlight_method',
+    'explain_term',
+    'summarize_section',
+    'extract_quotes',
+    'find_references',
+    'create_outline'
+]
+
+# Actions whose output depends only on the source, not on request context
+ARTIFACT_ACTIONS = {'highlight_method', 'extract_quotes', 'find_references', 'create_outline'}
+
+
+def build_action_prompt(action_type, context_data):
+    """Build the action-specific instruction placed after the shared source prefix"""
+    # Action-specific instructions go last so the system prompt and source
+    # content stay a stable, cacheable prefix across actions
+    action_prompts = {
+        'generate_code_snippet': f"""Generate a practical code snippet that demonstrates the key concepts discussed in this research source.
+
+Context: {context_data}
+
+Please provide a complete, runnable code snippet with comments explaining how it relates to the research.""",
+        
+        'highlight_method': """Analyze this research source and highlight the key methods, algorithms, or approaches discussed.
+
+Please provide:
+1. Key methods identified
+2. How they work
+3. Their significance to the research
+4. Any limitations mentioned""",
+        
+        'explain_term': f"""Explain the following term or concept from this research source.
+
+Term/Concept to explain: {context_data}
+
+Please provide a clear, comprehensive explanation with examples if relevant.""",
+        
+        'summarize_section': f"""Summarize the section or topic specified from this research source.
+
+Section/Topic: {context_data}
+
+Please provide a concise but comprehensive summary.""",
+        
+        'extract_quotes': """Extract the most important or relevant quotes from this research source.
+
+Please extract 3-5 key quotes that best represent the main findings or conclusions.""",
+        
+        'find_references': """Find and list relevant references or citations from this research source.
+
+Please identify and list key references, related works, or citations mentioned.""",
+        
+        'create_outline': """Create a structured outline of this research source.
+
+Please create a hierarchical outline showing the main sections, subsections, and key points."""
+    }
+    
+    return action_prompts.get(action_type, f"Perform action '{action_type}' on this source.\n\nContext: {context_data}")
+
+
+async def perform_action(source: Source, action_type: str, context_data: str, logger,
+                         priority: str = INTERACTIVE) -> Tuple[str, bool]:
+    """Run an action on a source and return (response, served from a stored artifact)"""
+    # Context-free actions are materialized per source content; a changed
+    # source hashes differently, so stale results are never served
+    content_hash = source_content_hash(source)
+    if action_type in ARTIFACT_ACTIONS:
+        await database_service.create_source_artifacts_table()
+        ai_response = await database_service.get_source_artifact(source.id, action_type, content_hash)
+        if ai_response is not None:
+            logger.info('Serving materialized action result', {
+                'sourceId': source.id,
+                'actionType': action_type
+            })
+            return ai_response, True
+
+    openai = OpenAIService()
+
+    response = await openai.create_completion(
+        messages=build_budgeted_source_messages(
+            source,
+            build_action_prompt(action_type, context_data),
+            openai.model,
+            logger,
+            sourceId=source.id,
+            actionType=action_type,
+        ),
+        temperature=0.3,  # Lower temperature for more focused responses
+        logger=logger,
+        priority=priority,
+    )
+    record_cache_usage(response, logger, sourceId=source.id, actionType=action_type)
+
+    ai_response = response.choices[0].message.content
+
+    # Mock responses (no API key) are never stored, or they would outlive a configured key
+    if action_type in ARTIFACT_ACTIONS and openai.client is not None:
+        await database_service.save_source_artifact(source.id, action_type, content_hash, ai_response)
+    return ai_response, False
+
+
+def action_result(source: Source, action_type: str, ai_response: str, cached: bool) -> Dict[str, Any]:
+    """Response body for a completed action"""
+    return {
+        'message': 'Action completed successfully',
+        'actionType': action_type,
+        'sourceId': str(source.id),
+        'response': ai_response,
+        'cached': cached,
+        'source': {
+            'id': source.id,
+            'title': source.title
+        }
+    }
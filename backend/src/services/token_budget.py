@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Dict, List
+
+try:
+    import tiktoken
+except ImportError:  # tokenizer is optional; fall back to a character estimate
+    tiktoken = None
+
+# Context window per model family, matched by longest prefix
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o-mini': 128000,
+    'gpt-4o': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4.1': 1047576,
+    'gpt-4-32k': 32768,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens kept free for the completion itself
+DEFAULT_COMPLETION_RESERVE = 1024
+
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Rough ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+class PromptTooLargeError(Exception):
+    """Raised when the fixed parts of a prompt alone exceed the model's budget"""
+
+    def __init__(self, tokens: int, budget: int):
+        super().__init__(f'Prompt needs {tokens} tokens but the model allows {budget}')
+        self.tokens = tokens
+        self.budget = budget
+
+
+class TokenBudget:
+    """Counts prompt tokens and fits text into per-model budgets"""
+
+    def __init__(self, max_cached_sources: int = 2048):
+        self._encodings: Dict[str, object] = {}
+        self._source_counts: "OrderedDict[tuple[int, str, str], int]" = OrderedDict()
+        self._max_cached_sources = max_cached_sources
+
+    def _encoding(self, model: str):
+        if tiktoken is None:
+            return None
+        if model not in self._encodings:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding('cl100k_base')
+            except Exception:
+                # Encoding files could not be loaded (e.g. offline); estimate instead
+                encoding = None
+            self._encodings[model] = encoding
+        return self._encodings[model]
+
+    def count(self, text: str, model: str) -> int:
+        """Count the tokens in a piece of text"""
+        if not text:
+            return 0
+        encoding = self._encoding(model)
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_messages(self, messages: List[Dict[str, str]], model: str) -> int:
+        """Count the prompt tokens of a list of chat messages"""
+        return sum(self.count(m.get('content') or '', model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def count_source(self, source_id: int, content_hash: str, text: str, model: str) -> int:
+        """Count tokens of a rendered source, cached by source ID and content hash"""
+        key = (source_id, content_hash, model)
+        if key in self._source_counts:
+            self._source_counts.move_to_end(key)
+            return self._source_counts[key]
+
+        tokens = self.count(text, model)
+        self._source_counts[key] = tokens
+        if len(self._source_counts) > self._max_cached_sources:
+            self._source_counts.popitem(last=False)
+        return tokens
+
+    def context_window(self, model: str) -> int:
+        for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+            if model.startswith(prefix):
+                return MODEL_CONTEXT_WINDOWS[prefix]
+        return DEFAULT_CONTEXT_WINDOW
+
+    def prompt_budget(self, model: str, completion_reserve: int = DEFAULT_COMPLETION_RESERVE) -> int:
+        """Tokens available for the prompt once the completion is reserved"""
+        return max(self.context_window(model) - completion_reserve, 0)
+
+    def room_for(self, fixed_tokens: int, model: str) -> int:
+        """Prompt tokens left beside fixed_tokens; raises PromptTooLargeError if there are none"""
+        budget = self.prompt_budget(model)
+        if fixed_tokens >= budget:
+            raise PromptTooLargeError(fixed_tokens, budget)
+        return budget - fixed_tokens
+
+    def truncate(self, text: str, max_tokens: int, model: str) -> str:
+        """Trim text to at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ''
+        encoding = self._encoding(model)
+        if encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    def chunk(self, text: str, max_tokens: int, model: str) -> List[str]:
+        """Split text into consecutive pieces of at most max_tokens tokens each"""
+        if max_tokens <= 0 or not text:
+            return []
+        encoding = self._encoding(model)
+        if encoding is None:
+            size = max_tokens * CHARS_PER_TOKEN
+            return [text[i:i + size] for i in range(0, len(text), size)]
+        tokens = encoding.encode(text, disallowed_special=())
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+token_budget = TokenBudget()
@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+# Returned by TTLCache.get on a miss, so cached None values can be told apart
+MISSING = object()
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a TTL"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or MISSING if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return MISSING
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def keys(self) -> List[Hashable]:
+        """Keys currently held, including any expired but not yet evicted"""
+        return list(self._entries)
+
+    def invalidate(self, key: Hashable):
+        if self._entries.pop(key, None) is not None:
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self) -> dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            'size': len(self._entries),
+            'maxSize': self.max_size,
+            'hitRate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
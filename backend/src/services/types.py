@@ -1,5 +1,7 @@
+import ast
 from pydantic import BaseModel
 from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional
 
 class OrderStatus(str, Enum):
     PLACED = "placed"
@@ -18,3 +20,36 @@ class Order(BaseModel):
     shipDate: str
     status: OrderStatus
     complete: bool
+
+
+def parse_authors(value: Optional[str]) -> List[str]:
+    """Decode the authors column, stored as a Python list literal"""
+    if not value:
+        return []
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+
+class Source(NamedTuple):
+    """A row of the sources table, decoded once and shared read-only"""
+    id: int
+    title: str
+    authors: List[str]
+    abstract: Optional[str]
+    url: Optional[str]
+    year: Optional[int]
+    field: Optional[str]
+    type: Optional[str]
+    created_at: Optional[str]
+
+    @classmethod
+    def from_row(cls, cursor, row) -> 'Source':
+        """sqlite3 row_factory for queries selecting SOURCE_COLUMNS"""
+        return cls(row[0], row[1], parse_authors(row[2]), *row[3:])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for a response body"""
+        return self._asdict()
+
+SOURCE_COLUMNS = ', '.join(Source._fields)
@@ -0,0 +1,73 @@
+import json
+import os
+from typing import Any, Dict
+
+from .local_validator import validate_locally
+from .openai_service import OpenAIService
+from .prompt_builder import build_budgeted_source_messages, render_source_content
+from .rate_limiter import INTERACTIVE
+from .request_context import DeadlineExceededError
+from .resilience import CircuitOpenError
+from .types import Source
+
+# Local confidence at or above this is trusted without a model round trip
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv('VALIDATION_LOCAL_THRESHOLD', '0.75'))
+
+
+class ValidationService:
+    def __init__(self, threshold: float = LOCAL_CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+
+    async def validate(self, source: Source, ai_response: str, constraints: Dict[str, Any], logger, priority: str = INTERACTIVE) -> Dict[str, Any]:
+        """Validate a response against a source, escalating to the model only when unsure"""
+        local_report = validate_locally(ai_response, render_source_content(source), constraints)
+        escalate = local_report['needsModel'] or local_report['confidence'] < self.threshold
+
+        logger.info('Local validation finished', {
+            'sourceId': source.id,
+            'confidence': local_report['confidence'],
+            'threshold': self.threshold,
+            'escalate': escalate,
+        })
+
+        local_result = {
+            'method': 'local',
+            'validationReport': {
+                'confidence': local_report['confidence'],
+                'issues': local_report['issues'],
+                'signals': local_report['signals'],
+            },
+        }
+        if not escalate:
+            return local_result
+
+        openai = OpenAIService()
+        prompt = (
+            f"Validate this AI response against the source and constraints:\n\n"
+            f"AI Response: {ai_response}\n\n"
+            f"Constraints: {json.dumps(constraints)}\n\n"
+            f"Local checks: {json.dumps({'confidence': local_report['confidence'], 'issues': local_report['issues']})}\n\n"
+            f"Provide a validation report as JSON with confidence score and flagged inconsistencies."
+        )
+
+        try:
+            response = await openai.create_completion(
+                messages=build_budgeted_source_messages(source, prompt, openai.model, logger, sourceId=source.id),
+                response_format={"type": "json_object"},
+                temperature=0.5,
+                logger=logger,
+                priority=priority,
+            )
+        except (CircuitOpenError, DeadlineExceededError):
+            # The local report is still useful when the model is unavailable or too slow
+            logger.warn('Model unavailable, returning local validation', {'sourceId': source.id})
+            return {**local_result, 'degraded': True}
+
+        return {
+            'method': 'llm',
+            'validationReport': json.loads(response.choices[0].message.content),
+            'localReport': local_report,
+        }
+
+
+validation_service = ValidationService()
@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from src.services.interaction_log_service import BUCKET_SECONDS, bucket_start, interaction_log_service
+
+config = {
+    'type': 'api',
+    'name': 'Activity Analytics API',
+    'description': 'API endpoint for aggregated user activity',
+    'path': '/api/v1/analytics/activity',
+    'method': 'GET',
+    'emits': [],
+    'flows': ['research'],
+}
+
+# Default window and most buckets returned per granularity
+DEFAULT_BUCKETS = {'hour': 24, 'day': 30}
+MAX_BUCKETS = {'hour': 24 * 7, 'day': 366}
+MAX_LIMIT = 100
+# Timestamps accepted in from/to: the epoch through the end of year 9999 UTC
+MAX_TIMESTAMP = 253402300799
+
+def query_param(req, name, default=None):
+    value = (req.get('queryParams') or {}).get(name, default)
+    if isinstance(value, list):
+        value = value[0] if value else default
+    return value
+
+def parse_time(value):
+    """Epoch seconds or ISO 8601 (UTC unless an offset is given)"""
+    try:
+        timestamp = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        timestamp = parsed.timestamp()
+    # Out-of-range values would overflow SQLite integers; NaN fails this too
+    if not 0 <= timestamp <= MAX_TIMESTAMP:
+        raise ValueError(f'Timestamp out of range: {value}')
+    return timestamp
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+async def handler(req, context):
+    """Handler for activity analytics API"""
+    logger = context.logger
+    
+    bucket = query_param(req, 'bucket', 'hour')
+    if bucket not in BUCKET_SECONDS:
+        return {
+            'status': 400,
+            'body': {
+                'message': f'Invalid bucket. Must be one of: {", ".join(BUCKET_SECONDS)}'
+            },
+        }
+    width = BUCKET_SECONDS[bucket]
+    
+    try:
+        end_param = query_param(req, 'to')
+        end = bucket_start(parse_time(end_param) if end_param else time.time(), bucket) + width
+        start_param = query_param(req, 'from')
+        start = bucket_start(parse_time(start_param), bucket) if start_param else end - DEFAULT_BUCKETS[bucket] * width
+        limit = min(int(query_param(req, 'limit', 10)), MAX_LIMIT)
+    except (TypeError, ValueError):
+        return {
+            'status': 400,
+            'body': {
+                'message': 'from and to must be epoch seconds or ISO 8601 timestamps between 1970 and 9999, limit an integer'
+            },
+        }
+    
+    if start >= end or (end - start) // width > MAX_BUCKETS[bucket]:
+        return {
+            'status': 400,
+            'body': {
+                'message': f'Range must cover between 1 and {MAX_BUCKETS[bucket]} {bucket} buckets'
+            },
+        }
+    
+    try:
+        activity = await interaction_log_service.activity(bucket, start, end, max(limit, 1))
+        for point in activity['series']:
+            point['bucketStart'] = iso(point['bucketStart'])
+        
+        return {
+            'status': 200,
+            'body': {
+                'bucket': bucket,
+                'from': iso(start),
+                'to': iso(end),
+                **activity
+            },
+        }
+    except Exception as error:
+        logger.error('Error reading activity analytics', {'error': str(error)})
+        
+        return {
+            'status': 500,
+            'body': {
+                'message': 'Failed to read activity analytics',
+                'error': str(error)
+            },
+        }
@@ -0,0 +1,83 @@
+import os
+import sys
+from pydantic import BaseModel
+sys.path.insert(0, os.getcwd())
+from src.services.database_service import database_service
+from src.services.job_service import JOB_TIMEOUT, JOB_TOPIC, job_error, job_service
+from src.services.rate_limiter import BATCH
+from src.services.report_review_service import feedback_result, report_review_service
+from src.services.request_context import current_user_id, start_deadline
+from src.services.source_action_service import action_result, perform_action
+
+class InputSchema(BaseModel):
+    jobId: str
+    kind: str
+
+config = {
+    'type': 'event',
+    'name': 'Job Runner',
+    'description': 'Runs submitted source action and report feedback jobs off the request path',
+    'subscribes': [JOB_TOPIC],
+    'emits': [],
+    'input': InputSchema.model_json_schema(),
+    'flows': ['research'],
+}
+
+async def run_source_action(job, logger):
+    payload = job['payload']
+    source = await database_service.get_source_by_id(payload['sourceId'])
+    if not source:
+        return None, {'status': 404, 'message': 'Source not found'}
+    # Nobody is waiting on the response, so chat goes first
+    ai_response, cached = await perform_action(source, payload['actionType'], payload['context'], logger, priority=BATCH)
+    return action_result(source, payload['actionType'], ai_response, cached), None
+
+async def run_report_feedback(job, logger):
+    payload = job['payload']
+
+    async def on_progress(completed, total):
+        try:
+            await job_service.progress(job['id'], completed, total)
+        except Exception as error:
+            # Progress is informational; never lose a review over it
+            logger.warn('Failed to record job progress', {'jobId': job['id'], 'error': str(error)})
+
+    review = await report_review_service.review_report(payload['reportContent'], payload['flags'], logger, on_progress)
+    return feedback_result(review), None
+
+RUNNERS = {
+    'source_action': run_source_action,
+    'report_feedback': run_report_feedback,
+}
+
+async def handler(input_data, context):
+    """Handler for submitted jobs"""
+    logger = context.logger
+    job_id = input_data.get('jobId')
+    
+    job = await job_service.get(job_id)
+    if job is None or job['kind'] not in RUNNERS:
+        logger.error('Unknown job', {'jobId': job_id, 'kind': input_data.get('kind')})
+        return
+    
+    # Redelivered events find the job already claimed
+    if not await job_service.claim(job_id):
+        logger.info('Job already claimed', {'jobId': job_id, 'status': job['status']})
+        return
+    
+    # Quotas and deadlines apply as they would to the original request
+    current_user_id.set(job['user_id'])
+    start_deadline(JOB_TIMEOUT)
+    logger.info('Running job', {'jobId': job_id, 'kind': job['kind']})
+    
+    try:
+        result, error = await RUNNERS[job['kind']](job, logger)
+    except Exception as exception:
+        result, error = None, job_error(exception)
+    
+    if error is not None:
+        await job_service.fail(job_id, error)
+        logger.error('Job failed', {'jobId': job_id, 'kind': job['kind'], **error})
+    else:
+        await job_service.complete(job_id, result)
+        logger.info('Job completed', {'jobId': job_id, 'kind': job['kind']})
@@ -0,0 +1,66 @@
+import os
+import sys
+sys.path.insert(0, os.getcwd())
+from src.services.job_service import job_service
+from src.services.request_context import ANONYMOUS_USER, bind_user
+
+config = {
+    'type': 'api',
+    'name': 'Job Status API',
+    'description': 'API endpoint for polling submitted jobs',
+    'path': '/api/jobs/:jobId',
+    'method': 'GET',
+    'emits': [],
+    'flows': ['research'],
+}
+
+async def handler(req, context):
+    """Handler for job status API"""
+    logger = context.logger
+    
+    path_params = req.get('pathParams', {})
+    job_id = path_params.get('jobId', '')
+    user_id = bind_user(req)
+    
+    if not job_id:
+        return {
+            'status': 400,
+            'body': {
+                'message': 'Job ID is required'
+            },
+        }
+    
+    try:
+        job = await job_service.get(job_id)
+        # Jobs submitted by a known user are only visible to that user
+        if job is None or (job['user_id'] != ANONYMOUS_USER and job['user_id'] != user_id):
+            return {
+                'status': 404,
+                'body': {
+                    'message': 'Job not found'
+                },
+            }
+        
+        return {
+            'status': 200,
+            'body': {
+                'jobId': job['id'],
+                'kind': job['kind'],
+                'status': job['status'],
+                'progress': job['progress'],
+                'result': job['result'],
+                'error': job['error'],
+                'createdAt': job['created_at'],
+                'updatedAt': job['updated_at']
+            },
+        }
+    except Exception as error:
+        logger.error('Error fetching job', {'jobId': job_id, 'error': str(error)})
+        
+        return {
+            'status': 500,
+            'body': {
+                'message': 'Failed to fetch job',
+                'error': str(error)
+            },
+        }
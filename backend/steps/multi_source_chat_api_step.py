@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import sys
+sys.path.insert(0, os.getcwd())
+from src.services.api_errors import RETRY_LATER_ERRORS, prompt_too_large_response, retry_later_response
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from src.services.passage_index import passage_index
+from src.services.prompt_builder import build_multi_source_messages, mode_instruction, record_cache_usage
+from src.services.request_context import DeadlineExceededError, bind_user, start_deadline
+from src.services.token_budget import PromptTooLargeError, token_budget
+
+config = {
+    'type': 'api',
+    'name': 'Multi-Source Chat API',
+    'description': 'API endpoint for chatting across several research sources',
+    'path': '/api/sources/chat',
+    'method': 'POST',
+    'emits': [],
+    'flows': ['research'],
+}
+
+MAX_SOURCES = 20
+# Tokens of retrieved passages included in the prompt
+PASSAGE_BUDGET = int(os.getenv('MULTI_SOURCE_PASSAGE_TOKENS', '2000'))
+CITATION_PATTERN = re.compile(r'\[S(\d+)\]')
+
+async def handler(req, context):
+    """Handler for multi-source chat API"""
+    logger = context.logger
+    start_deadline()
+
+    body_raw = req.get('body', '{}')
+
+    # Parse JSON body if it's a string
+    if isinstance(body_raw, str):
+        try:
+            body = json.loads(body_raw)
+        except json.JSONDecodeError:
+            return {
+                'status': 400,
+                'body': {
+                    'error': 'Invalid JSON in request body'
+                },
+            }
+    else:
+        body = body_raw
+
+    bind_user(req, body)
+    source_ids = body.get('sourceIds', [])
+    user_message = body.get('message', '')
+    mode = body.get('mode', 'summary')  # summary, explanation, implementation
+
+    if not isinstance(source_ids, list) or not source_ids or not user_message:
+        return {
+            'status': 400,
+            'body': {
+                'message': 'Source IDs and message are required'
+            },
+        }
+
+    if len(source_ids) > MAX_SOURCES:
+        return {
+            'status': 400,
+            'body': {
+                'message': f'At most {MAX_SOURCES} sources can be chatted with at once'
+            },
+        }
+
+    # Keep request order (it decides the citation labels) but drop duplicates
+    requested = list(dict.fromkeys(int(sid) for sid in source_ids if str(sid).isdigit()))
+
+    logger.info('Chatting with sources', {
+        'sourceIds': requested,
+        'mode': mode
+    })
+
+    try:
+        # One query for every source not already cached
+        loaded = await database_service.get_sources_by_ids(requested)
+        sources = [loaded[sid] for sid in requested if sid in loaded]
+        missing = [str(sid) for sid in source_ids if not str(sid).isdigit() or int(sid) not in loaded]
+
+        if not sources:
+            return {
+                'status': 404,
+                'body': {
+                    'message': 'Sources not found',
+                    'missingSourceIds': missing
+                },
+            }
+
+        openai = OpenAIService()
+
+        # Checked before retrieval so an oversized message costs no embedding call
+        instruction = f"{mode_instruction(mode, user_message, 'these research sources')}\n\nBe concise but informative."
+        fixed_tokens = token_budget.count_messages(build_multi_source_messages({}, instruction), openai.model)
+        budget = min(PASSAGE_BUDGET, token_budget.room_for(fixed_tokens, openai.model))
+
+        # Rank every passage across all requested sources against the question;
+        # sources seen for the first time are indexed in the same embedding call
+        scored = await passage_index.retrieve(sources, user_message, openai.model, logger)
+        selected = passage_index.select(scored, budget)
+
+        # Label sources in request order; group their passages in document order
+        labels = {source.id: f'S{i}' for i, source in enumerate(sources, 1)}
+        grouped = {}
+        for score, passage in selected:
+            grouped.setdefault(passage.source_id, []).append((passage.position, passage.text, score))
+        passages = {
+            labels[source.id]: (source, [text for _, text, _ in sorted(grouped[source.id])])
+            for source in sources if source.id in grouped
+        }
+
+        logger.info('Selected passages for multi-source chat', {
+            'candidates': len(scored),
+            'selected': len(selected),
+            'passageTokens': sum(passage.tokens for _, passage in selected),
+            'budget': budget,
+            'sources': len(passages)
+        })
+
+        response = await openai.create_completion(
+            messages=build_multi_source_messages(passages, instruction),
+            temperature=0.7,
+            logger=logger,
+        )
+        record_cache_usage(response, logger, sourceIds=requested, mode=mode)
+
+        ai_response = response.choices[0].message.content
+        cited = {f'S{n}' for n in CITATION_PATTERN.findall(ai_response)}
+
+        return {
+            'status': 200,
+            'body': {
+                'message': 'Chat response generated',
+                'response': ai_response,
+                'mode': mode,
+                'sources': [
+                    {
+                        'label': labels[source.id],
+                        'id': source.id,
+                        'title': source.title,
+                        'authors': source.authors,
+                        'year': source.year,
+                        'passagesUsed': len(grouped.get(source.id, [])),
+                        'topScore': round(max((score for _, _, score in grouped.get(source.id, [])), default=0.0), 3),
+                        'cited': labels[source.id] in cited
+                    }
+                    for source in sources
+                ],
+                'missingSourceIds': missing
+            },
+        }
+    except PromptTooLargeError as error:
+        return prompt_too_large_response(error)
+    except RETRY_LATER_ERRORS as error:
+        return retry_later_response(error)
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
+    except Exception as error:
+        logger.error('Error in multi-source chat', {'error': str(error)})
+
+        return {
+            'status': 500,
+            'body': {
+                'message': 'Failed to generate chat response',
+                'error': str(error)
+            },
+        }
@@ -2,7 +2,11 @@ import json
 import os
 import sys
 sys.path.insert(0, os.getcwd())
-from src.services.openai_service import OpenAIService
+from src.services.api_errors import RETRY_LATER_ERRORS, prompt_too_large_response, retry_later_response
+from src.services.job_service import JOB_TOPIC, job_service
+from src.services.report_review_service import feedback_result, report_review_service
+from src.services.request_context import DeadlineExceededError, bind_user, start_deadline
+from src.services.token_budget import PromptTooLargeError
 
 config = {
     'type': 'api',
@@ -10,13 +14,17 @@ config = {
     'description': 'API endpoint for getting AI feedback on research reports',
     'path': '/api/report/feedback',
     'method': 'POST',
-    'emits': [],
+    'emits': [JOB_TOPIC],
     'flows': ['research'],
 }
 
+# Section reviews run in parallel, but long reports still need more than the default budget
+REQUEST_TIMEOUT = float(os.getenv('REPORT_FEEDBACK_TIMEOUT_SECONDS', '120'))
+
 async def handler(req, context):
     """Handler for report feedback API"""
     logger = context.logger
+    start_deadline(REQUEST_TIMEOUT)
     
     body_raw = req.get('body', '{}')
     
@@ -34,8 +42,10 @@ async def handler(req, context):
     else:
         body = body_raw
     
+    user_id = bind_user(req, body)
     report_content = body.get('reportContent', '')
     flags = body.get('flags', {})  # e.g., {'replicability': True, 'evidence_check': True}
+    run_async = bool(body.get('async'))  # submit as a job and poll for the result
     
     if not report_content:
         return {
@@ -51,51 +61,21 @@ async def handler(req, context):
     })
     
     try:
-        openai = OpenAIService()
-        
-        # Build prompt based on flags
-        flag_descriptions = []
-        if flags.get('replicability'):
-            flag_descriptions.append("Check for replicability issues")
-        if flags.get('evidence_check'):
-            flag_descriptions.append("Verify evidence and citations")
-        
-        flags_text = "; ".join(flag_descriptions) if flag_descriptions else "General review"
-        
-        prompt = f"""Review this research report and provide structured feedback. Focus on: {flags_text}
-
-Report Content:
-{report_content[:10000]}
-
-Provide feedback in JSON format with the following structure:
-{{
-  "feedback": [
-    {{
-      "section": "section name or 'general'",
-      "issueType": "replicability|evidence|citation|methodology|clarity|other",
-      "suggestion": "specific improvement suggestion",
-      "confidence": 0.0-1.0
-    }}
-  ]
-}}"""
-        
-        response = await openai.create_completion(
-            messages=[
-                {"role": "system", "content": "You are an expert research reviewer. Provide constructive, specific feedback on research reports."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3,
-        )
+        if run_async:
+            return {
+                'status': 202,
+                'body': await job_service.submit('report_feedback', {
+                    'reportContent': report_content,
+                    'flags': flags
+                }, user_id, context),
+            }
         
-        feedback_data = json.loads(response.choices[0].message.content)
+        # Review changed sections concurrently; unchanged ones reuse cached feedback
+        review = await report_review_service.review_report(report_content, flags, logger)
         
         return {
             'status': 200,
-            'body': {
-                'message': 'Feedback generated successfully',
-                'feedback': feedback_data.get('feedback', [])
-            },
+            'body': feedback_result(review),
         }
     except ValueError as e:
         if "API key not set" in str(e):
@@ -107,6 +87,17 @@ Provide feedback in JSON format with the following structure:
                 },
             }
         raise
+    except PromptTooLargeError as error:
+        return prompt_too_large_response(error)
+    except RETRY_LATER_ERRORS as error:
+        return retry_later_response(error)
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
     except Exception as error:
         logger.error('Error generating feedback', {'error': str(error)})
         
@@ -2,8 +2,10 @@ import json
 import os
 import sys
 sys.path.insert(0, os.getcwd())
-from src.services.openai_service import OpenAIService
-from src.services.database_service import database_service
+from src.services.database_service import year_range
+from src.services.interaction_log_service import interaction_log_service
+from src.services.research_query_service import research_query_service
+from src.services.request_context import DeadlineExceededError, bind_user, start_deadline
 
 config = {
     'type': 'api',
@@ -18,6 +20,7 @@ config = {
 async def handler(req, context):
     """Handler for research query API"""
     logger = context.logger
+    start_deadline()
     
     body_raw = req.get('body', '{}')
     
@@ -35,6 +38,7 @@ async def handler(req, context):
     else:
         body = body_raw
     
+    user_id = bind_user(req, body)
     query = body.get('query', '')
     filters = body.get('filters', {})
     
@@ -46,51 +50,55 @@ async def handler(req, context):
             },
         }
     
+    try:
+        year_from, year_to = year_range(filters)
+    except (TypeError, ValueError):
+        return {
+            'status': 400,
+            'body': {
+                'message': 'year, yearFrom and yearTo must be integers'
+            },
+        }
+    if year_from is not None and year_to is not None and year_from > year_to:
+        return {
+            'status': 400,
+            'body': {
+                'message': 'yearFrom must not be after yearTo'
+            },
+        }
+    
     logger.info('Querying research sources', {
         'query': query,
         'filters': filters
     })
     
     try:
-        # Ensure table exists
-        await database_service.create_sources_table()
-        
-        # First, search existing sources in database
-        existing_sources = await database_service.search_sources(query, filters)
-        
-        sources = []
-        # Convert DB results to expected format
-        for source in existing_sources:
-            sources.append({
-                'title': source['title'],
-                'authors': source['authors'] or [],
-                'abstract': source['abstract'] or '',
-                'url': source['url'] or '',
-                'year': source['year'],
-                'field': source['field'],
-                'type': source['type']
-            })
-        
-        # If we have less than 5 sources, generate new ones with OpenAI
-        if len(sources) < 5:
-            openai = OpenAIService()
-            generated_sources = await openai.research_sources(query, filters)
-            
-            # Store new sources in database
-            for source in generated_sources:
-                try:
-                    await database_service.insert_source(source)
-                    sources.append(source)
-                except Exception as e:
-                    logger.error('Error storing source', {'error': str(e), 'source': source})
-                    # Still add to response even if DB fails
-                    sources.append(source)
+        result, cached = await research_query_service.query(query, filters, logger)
+        logger.info('Research query cache', {
+            'cached': cached,
+            'hitRate': research_query_service.snapshot()['hitRate']
+        })
+        # Query frequencies feed the popular-query rollups used for cache warming
+        interaction_log_service.record([{
+            'action': 'research_query',
+            'metadata': {'query': query, 'filters': filters}
+        }], user_id, logger)
         
         return {
             'status': 200,
             'body': {
                 'message': 'Sources retrieved successfully',
-                'sources': sources[:10]  # Limit to 10 sources
+                'sources': result['sources'],
+                'partial': result['partial'],
+                'facets': result['facets'],
+                'cached': cached
+            },
+        }
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
             },
         }
     except Exception as error:
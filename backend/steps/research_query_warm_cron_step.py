@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.getcwd())
+from src.services.interaction_log_service import bucket_start, interaction_log_service
+from src.services.research_query_service import research_query_service
+
+config = {
+    'type': 'cron',
+    'cron': os.getenv('RESEARCH_QUERY_WARM_CRON', '0 6 * * *'),  # daily, ahead of the morning peak
+    'name': 'ResearchQueryCacheWarmer',
+    'description': 'Precomputes results for the most popular research queries',
+    'emits': [],
+    'flows': ['research'],
+}
+
+# How many of the most frequent queries to warm, and over how many days to count them
+TOP_QUERIES = int(os.getenv('RESEARCH_QUERY_WARM_TOP_N', '20'))
+LOOKBACK_DAYS = int(os.getenv('RESEARCH_QUERY_WARM_DAYS', '7'))
+
+async def handler(context):
+    """Warm the research query cache with the top queries of the last few days"""
+    logger = context.logger
+    
+    end = bucket_start(time.time(), 'day') + 86400
+    popular = await interaction_log_service.popular_queries(end - LOOKBACK_DAYS * 86400, end, TOP_QUERIES)
+    
+    warmed = 0
+    failed = 0
+    started = time.monotonic()
+    for query, _ in popular:
+        try:
+            # Rollups count query text only, so the unfiltered form is warmed
+            result = await research_query_service.warm(query, {}, logger)
+        except Exception as error:
+            failed += 1
+            logger.error('Error warming research query', {'query': query, 'error': str(error)})
+            continue
+        if result['partial']:
+            # Remaining queries would fail the same way; the next run retries them
+            logger.warn('OpenAI unavailable, stopping cache warming', {'query': query})
+            break
+        warmed += 1
+    
+    logger.info('Warmed research query cache', {
+        'candidates': len(popular),
+        'warmed': warmed,
+        'failed': failed,
+        'durationSeconds': round(time.monotonic() - started, 2),
+        'cache': research_query_service.snapshot()
+    })
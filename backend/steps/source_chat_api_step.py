@@ -2,8 +2,15 @@ import json
 import os
 import sys
 sys.path.insert(0, os.getcwd())
+from src.services.api_errors import RETRY_LATER_ERRORS, prompt_too_large_response, retry_later_response
+from src.services.chat_session_service import chat_session_service
 from src.services.database_service import database_service
+from src.services.embedding_service import embedding_service
 from src.services.openai_service import OpenAIService
+from src.services.prompt_builder import build_budgeted_source_messages, mode_instruction, record_cache_usage, source_content_hash
+from src.services.request_context import ANONYMOUS_USER, DeadlineExceededError, bind_user, start_deadline
+from src.services.semantic_cache import chat_answer_cache
+from src.services.token_budget import PromptTooLargeError
 
 config = {
     'type': 'api',
@@ -18,6 +25,7 @@ config = {
 async def handler(req, context):
     """Handler for source chat API"""
     logger = context.logger
+    start_deadline()
     
     path_params = req.get('pathParams', {})
     source_id = path_params.get('sourceId', '')
@@ -37,8 +45,11 @@ async def handler(req, context):
     else:
         body = body_raw
     
+    user_id = bind_user(req, body)
     user_message = body.get('message', '')
-    mode = body.get('mode', 'summary')  # summary, explanation, implementation
+    mode = body.get('mode')  # summary, explanation, implementation; defaults to the saved preference
+    session_id = body.get('sessionId')  # continues a session
+    start_session = body.get('startSession') is True  # starts one; otherwise the chat is stateless
     
     if not source_id or not user_message:
         return {
@@ -48,11 +59,6 @@ async def handler(req, context):
             },
         }
     
-    logger.info('Chatting with source', {
-        'sourceId': source_id,
-        'mode': mode
-    })
-    
     try:
         # Fetch source from database by ID
         source = await database_service.get_source_by_id(int(source_id))
@@ -65,31 +71,98 @@ async def handler(req, context):
                 },
             }
         
-        # Use source content (title + abstract as the content)
-        content = f"Title: {source['title']}\n\nAbstract: {source['abstract']}\n\nAuthors: {', '.join(source['authors'])}\n\nYear: {source['year']}\n\nField: {source['field']}"
+        if not mode:
+            # Anonymous callers have no saved preference
+            saved_mode = await database_service.get_mode_preference(user_id, source.id) if user_id != ANONYMOUS_USER else None
+            mode = saved_mode or 'summary'
+        
+        logger.info('Chatting with source', {
+            'sourceId': source_id,
+            'mode': mode
+        })
+        
+        session = None
+        if session_id or start_session:
+            session = await chat_session_service.open(session_id, source.id, user_id)
+            if session is None:
+                return {
+                    'status': 404,
+                    'body': {
+                        'message': 'Chat session not found'
+                    },
+                }
+        history = chat_session_service.history_messages(session) if session else []
+        
+        source_info = {
+            'id': source.id,
+            'title': source.title,
+            'authors': source.authors,
+            'year': source.year
+        }
+        
+        # Near-identical questions about the same source and mode reuse the
+        # earlier answer; the content hash keeps answers from outliving edits.
+        # Answers that depend on earlier turns are neither served nor stored.
+        cache_key = (source.id, source_content_hash(source), mode)
+        query_vector = None
+        if not history:
+            try:
+                query_vector = (await embedding_service.embed([user_message], logger))[0]
+            except Exception as error:
+                logger.warn('Skipping semantic cache, embedding failed', {'error': str(error)})
+        
+        if query_vector is not None:
+            cached = chat_answer_cache.lookup(cache_key, query_vector)
+            if cached is not None:
+                ai_response, similarity = cached
+                logger.info('Serving cached chat answer', {
+                    'sourceId': source_id,
+                    'mode': mode,
+                    'similarity': round(similarity, 3),
+                    'hitRate': chat_answer_cache.hit_rate()
+                })
+                if session:
+                    await chat_session_service.record_exchange(session, user_message, ai_response, OpenAIService(), logger)
+                return {
+                    'status': 200,
+                    'body': {
+                        'message': 'Chat response generated',
+                        'response': ai_response,
+                        'mode': mode,
+                        'sessionId': session['id'] if session else None,
+                        'cached': True,
+                        'source': source_info
+                    },
+                }
         
         openai = OpenAIService()
         
-        # Craft prompt based on mode and user message
-        if mode == 'summary':
-            prompt = f"Based on this research source, provide a point-form summary addressing: {user_message}\n\nSource Content:\n{content}"
-        elif mode == 'explanation':
-            prompt = f"Explain the concepts in this research source as they relate to: {user_message}\n\nSource Content:\n{content}"
-        elif mode == 'implementation':
-            prompt = f"Provide step-by-step implementation guidance based on this research source for: {user_message}\n\nSource Content:\n{content}"
-        else:
-            prompt = f"Respond to: {user_message}\n\nBased on this research source:\n{content}"
+        # Craft the mode-specific instruction; the source itself lives in the
+        # shared, cacheable prefix built by build_budgeted_source_messages
+        prompt = mode_instruction(mode, user_message)
         
         # Use chat completion
         response = await openai.create_completion(
-            messages=[
-                {"role": "system", "content": "You are a helpful research assistant that provides accurate information based on the given research source. Be concise but informative."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_budgeted_source_messages(
+                source,
+                f"{prompt}\n\nBe concise but informative.",
+                openai.model,
+                logger,
+                history=history,
+                sourceId=source_id,
+                mode=mode,
+                sessionId=session['id'] if session else None,
+            ),
             temperature=0.7,
+            logger=logger,
         )
+        record_cache_usage(response, logger, sourceId=source_id, mode=mode)
         
         ai_response = response.choices[0].message.content
+        if query_vector is not None:
+            chat_answer_cache.store(cache_key, query_vector, ai_response)
+        if session:
+            await chat_session_service.record_exchange(session, user_message, ai_response, openai, logger)
         
         return {
             'status': 200,
@@ -97,12 +170,20 @@ async def handler(req, context):
                 'message': 'Chat response generated',
                 'response': ai_response,
                 'mode': mode,
-                'source': {
-                    'id': source['id'],
-                    'title': source['title'],
-                    'authors': source['authors'],
-                    'year': source['year']
-                }
+                'sessionId': session['id'] if session else None,
+                'cached': False,
+                'source': source_info
+            },
+        }
+    except PromptTooLargeError as error:
+        return prompt_too_large_response(error)
+    except RETRY_LATER_ERRORS as error:
+        return retry_later_response(error)
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
             },
         }
     except Exception as error:
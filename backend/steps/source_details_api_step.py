@@ -2,7 +2,9 @@ import json
 import os
 import sys
 sys.path.insert(0, os.getcwd())
+from src.services.api_errors import RETRY_LATER_ERRORS, retry_later_response
 from src.services.firecrawl_service import FirecrawlService
+from src.services.request_context import DeadlineExceededError, start_deadline
 
 config = {
     'type': 'api',
@@ -17,6 +19,7 @@ config = {
 async def handler(req, context):
     """Handler for source details API"""
     logger = context.logger
+    start_deadline()
     
     path_params = req.get('pathParams', {})
     source_id = path_params.get('sourceId', '')
@@ -115,6 +118,15 @@ async def handler(req, context):
                 },
             }
         raise
+    except RETRY_LATER_ERRORS as error:
+        return retry_later_response(error)
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
     except Exception as error:
         logger.error('Error fetching source details', {'error': str(error)})
         
@@ -3,6 +3,7 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from src.services.database_service import database_service
+from src.services.request_context import ANONYMOUS_USER, DeadlineExceededError, bind_user, start_deadline
 
 config = {
     'type': 'api',
@@ -17,6 +18,7 @@ config = {
 async def handler(req, context):
     """Handler for source mode toggle API"""
     logger = context.logger
+    start_deadline()
     
     path_params = req.get('pathParams', {})
     source_id = path_params.get('sourceId', '')
@@ -36,6 +38,7 @@ async def handler(req, context):
     else:
         body = body_raw
     
+    user_id = bind_user(req, body)
     mode = body.get('mode', 'summary')  # summary, explanation, implementation
     
     if not source_id:
@@ -71,8 +74,23 @@ async def handler(req, context):
                 },
             }
         
-        # Here you could store the mode preference in the database
-        # For now, just acknowledge and emit event for workflow refresh
+        # Callers without a user ID can't be told apart, so their mode is not
+        # saved; otherwise one visitor's toggle would change everyone's default
+        saved = user_id != ANONYMOUS_USER
+        previous_mode = await database_service.get_mode_preference(user_id, source.id) if saved else None
+        if mode != previous_mode:
+            if saved:
+                await database_service.save_mode_preference(user_id, source.id, mode)
+            # Lets downstream steps precompute mode-specific digests
+            await context.emit({
+                'topic': 'mode-changed',
+                'data': {
+                    'sourceId': source.id,
+                    'userId': user_id,
+                    'mode': mode,
+                    'previousMode': previous_mode
+                }
+            })
         
         return {
             'status': 200,
@@ -80,13 +98,21 @@ async def handler(req, context):
                 'message': 'Mode updated successfully',
                 'sourceId': source_id,
                 'mode': mode,
+                'previousMode': previous_mode,
                 'source': {
-                    'id': source['id'],
-                    'title': source['title'],
+                    'id': source.id,
+                    'title': source.title,
                     'currentMode': mode
                 }
             },
         }
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
     except Exception as error:
         logger.error('Error updating mode', {'error': str(error)})
         
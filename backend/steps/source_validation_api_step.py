@@ -1,8 +1,11 @@
-import json
 import os
 import sys
 sys.path.insert(0, os.getcwd())
-from src.services.openai_service import OpenAIService
+from src.services.api_errors import RETRY_LATER_ERRORS, prompt_too_large_response, retry_later_response
+from src.services.database_service import database_service
+from src.services.validation_service import validation_service
+from src.services.request_context import DeadlineExceededError, bind_user, start_deadline
+from src.services.token_budget import PromptTooLargeError
 
 config = {
     'type': 'api',
@@ -17,10 +20,12 @@ config = {
 async def handler(req, context):
     """Handler for source validation API"""
     logger = context.logger
+    start_deadline()
     
     query_params = req.get('queryParams', {})
     source_id = query_params.get('sourceId', '')
     body = req.get('body', {})
+    bind_user(req, body)
     ai_response = body.get('aiResponse', '')
     constraints = body.get('constraints', {})
     
@@ -32,32 +37,39 @@ async def handler(req, context):
             },
         }
     
+    if not str(source_id).isdigit():
+        return {
+            'status': 400,
+            'body': {
+                'message': 'Source ID must be a number'
+            },
+        }
+    
     logger.info('Validating AI response', {
         'sourceId': source_id,
         'constraints': constraints
     })
     
     try:
-        openai = OpenAIService()
-        
-        prompt = f"Validate this AI response against the source and constraints:\n\nAI Response: {ai_response}\n\nConstraints: {json.dumps(constraints)}\n\nProvide a validation report with confidence score and flagged inconsistencies."
-        
-        response = await openai.create_completion(
-            messages=[
-                {"role": "system", "content": "You are a validation assistant. Check accuracy and consistency."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.5,
-        )
+        source = await database_service.get_source_by_id(int(source_id))
+        if not source:
+            return {
+                'status': 404,
+                'body': {
+                    'message': 'Source not found'
+                },
+            }
         
-        validation_report = json.loads(response.choices[0].message.content)
+        # Cheap local grounding checks first; only uncertain cases reach the model
+        result = await validation_service.validate(source, ai_response, constraints, logger)
         
         return {
             'status': 200,
             'body': {
                 'message': 'Validation completed successfully',
-                'validationReport': validation_report
+                'validationMethod': result['method'],
+                'degraded': result.get('degraded', False),
+                'validationReport': result['validationReport']
             },
         }
     except ValueError as e:
@@ -70,6 +82,17 @@ async def handler(req, context):
                 },
             }
         raise
+    except PromptTooLargeError as error:
+        return prompt_too_large_response(error)
+    except RETRY_LATER_ERRORS as error:
+        return retry_later_response(error)
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
     except Exception as error:
         logger.error('Error validating response', {'error': str(error)})
         
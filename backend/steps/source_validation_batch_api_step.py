@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import sys
+import uuid
+sys.path.insert(0, os.getcwd())
+from src.services.database_service import database_service
+from src.services.rate_limiter import BATCH, QuotaExceededError
+from src.services.request_context import DeadlineExceededError, bind_user, remaining_time, start_deadline
+from src.services.token_budget import PromptTooLargeError
+from src.services.validation_service import validation_service
+
+config = {
+    'type': 'api',
+    'name': 'Source Validation Batch API',
+    'description': 'API endpoint for validating many AI responses in one request',
+    'path': '/api/v1/source/validate/batch',
+    'method': 'POST',
+    'emits': [],
+    'flows': ['research'],
+}
+
+MAX_BATCH_ITEMS = 100
+MAX_CONCURRENT_VALIDATIONS = int(os.getenv('VALIDATION_BATCH_CONCURRENCY', '8'))
+REQUEST_TIMEOUT = float(os.getenv('VALIDATION_BATCH_TIMEOUT_SECONDS', '120'))
+
+async def handler(req, context):
+    """Handler for batch source validation API"""
+    logger = context.logger
+    start_deadline(REQUEST_TIMEOUT)
+
+    body_raw = req.get('body', '{}')
+
+    # Parse JSON body if it's a string
+    if isinstance(body_raw, str):
+        try:
+            body = json.loads(body_raw)
+        except json.JSONDecodeError:
+            return {
+                'status': 400,
+                'body': {
+                    'error': 'Invalid JSON in request body'
+                },
+            }
+    else:
+        body = body_raw
+
+    bind_user(req, body)
+    items = body.get('items', [])
+    default_constraints = body.get('constraints', {})
+
+    if not isinstance(items, list) or not items:
+        return {
+            'status': 400,
+            'body': {
+                'message': 'Items are required'
+            },
+        }
+
+    if len(items) > MAX_BATCH_ITEMS:
+        return {
+            'status': 400,
+            'body': {
+                'message': f'At most {MAX_BATCH_ITEMS} items can be validated per request'
+            },
+        }
+
+    # Clients may pick the batch ID so they can subscribe to the stream up front
+    batch_id = str(body.get('batchId') or uuid.uuid4())
+    logger.info('Validating AI responses in batch', {
+        'batchId': batch_id,
+        'items': len(items)
+    })
+
+    try:
+        # Load every distinct source once
+        source_ids = {
+            int(item['sourceId']) for item in items
+            if isinstance(item, dict) and str(item.get('sourceId', '')).isdigit()
+        }
+        sources = await database_service.get_sources_by_ids(list(source_ids))
+
+        stream = getattr(getattr(context, 'streams', None), 'validationResult', None)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_VALIDATIONS)
+
+        async def validate_item(index, item):
+            if not isinstance(item, dict):
+                return {'id': str(index), 'index': index, 'sourceId': '', 'status': 400, 'error': 'Item must be an object'}
+
+            source_id = str(item.get('sourceId', ''))
+            ai_response = item.get('aiResponse', '')
+            result = {'id': str(index), 'index': index, 'sourceId': source_id}
+
+            if not source_id or not ai_response:
+                return {**result, 'status': 400, 'error': 'Source ID and AI response are required'}
+
+            source = sources.get(int(source_id)) if source_id.isdigit() else None
+            if not source:
+                return {**result, 'status': 404, 'error': 'Source not found'}
+
+            try:
+                async with semaphore:
+                    validation = await validation_service.validate(
+                        source, ai_response, item.get('constraints', default_constraints), logger, priority=BATCH
+                    )
+                return {
+                    **result,
+                    'status': 200,
+                    'validationMethod': validation['method'],
+                    'degraded': validation.get('degraded', False),
+                    'validationReport': validation['validationReport']
+                }
+            except QuotaExceededError as error:
+                return {**result, 'status': 429, 'error': str(error), 'retryAfter': round(error.retry_after)}
+            except DeadlineExceededError as error:
+                return {**result, 'status': 504, 'error': str(error)}
+            except PromptTooLargeError as error:
+                return {**result, 'status': 400, 'error': str(error)}
+            except Exception as error:
+                logger.error('Error validating batch item', {'batchId': batch_id, 'index': index, 'error': str(error)})
+                return {**result, 'status': 500, 'error': str(error)}
+
+        # Stream each report as soon as it finishes, then return them in order
+        results = [None] * len(items)
+        tasks = [asyncio.ensure_future(validate_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for finished in asyncio.as_completed(tasks, timeout=remaining_time()):
+                result = await finished
+                results[result['index']] = result
+                if stream is not None:
+                    await stream.set(batch_id, result['id'], result)
+        except asyncio.TimeoutError:
+            # Return what finished; abandon the rest
+            for task in tasks:
+                task.cancel()
+            logger.warn('Batch validation deadline exceeded', {
+                'batchId': batch_id,
+                'completed': sum(result is not None for result in results),
+                'items': len(items)
+            })
+            for index, result in enumerate(results):
+                if result is None:
+                    results[index] = {
+                        'id': str(index),
+                        'index': index,
+                        'sourceId': str(items[index].get('sourceId', '')) if isinstance(items[index], dict) else '',
+                        'status': 504,
+                        'error': 'Request deadline exceeded'
+                    }
+
+        return {
+            'status': 200,
+            'body': {
+                'message': 'Batch validation completed',
+                'batchId': batch_id,
+                'results': results,
+                'partial': any(result['status'] == 504 for result in results)
+            },
+        }
+    except DeadlineExceededError:
+        return {
+            'status': 504,
+            'body': {
+                'message': 'Request deadline exceeded'
+            },
+        }
+    except Exception as error:
+        logger.error('Error validating batch', {'batchId': batch_id, 'error': str(error)})
+
+        return {
+            'status': 500,
+            'body': {
+                'message': 'Failed to validate batch',
+                'error': str(error)
+            },
+        }
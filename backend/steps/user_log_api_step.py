@@ -2,6 +2,8 @@ import json
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from src.services.interaction_log_service import interaction_log_service
+from src.services.request_context import bind_user
 
 config = {
     'type': 'api',
@@ -18,7 +20,7 @@ async def handler(req, context):
     logger = context.logger
     
     body = req.get('body', {})
-    user_id = body.get('userId', 'anonymous')
+    user_id = bind_user(req, body)
     action = body.get('action', '')
     metadata = body.get('metadata', {})
     timestamp = body.get('timestamp', None)
@@ -31,22 +33,19 @@ async def handler(req, context):
             },
         }
     
-    logger.info('User action logged', {
-        'userId': user_id,
-        'action': action,
-        'metadata': metadata,
-        'timestamp': timestamp
-    })
-    
     try:
-        # Here you could store the log in a database or emit an event
-        # For now, just acknowledge the log
+        # Buffered in memory and written in batches; never waits on disk
+        logged = interaction_log_service.record([{
+            'action': action,
+            'metadata': metadata,
+            'timestamp': timestamp
+        }], user_id, logger) > 0
         
         return {
             'status': 200,
             'body': {
                 'message': 'User action logged successfully',
-                'logged': True
+                'logged': logged
             },
         }
     except Exception as error:
@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from src.services.interaction_log_service import interaction_log_service
+from src.services.request_context import bind_user
+
+config = {
+    'type': 'api',
+    'name': 'User Log Batch API',
+    'description': 'API endpoint for logging batches of user interactions',
+    'path': '/api/v1/user/log/batch',
+    'method': 'POST',
+    'emits': [],
+    'flows': ['research'],
+}
+
+MAX_BATCH_EVENTS = 500
+
+async def handler(req, context):
+    """Handler for batched user logging API"""
+    logger = context.logger
+    
+    body_raw = req.get('body', '{}')
+    
+    # Parse JSON body if it's a string
+    if isinstance(body_raw, str):
+        try:
+            body = json.loads(body_raw)
+        except json.JSONDecodeError:
+            return {
+                'status': 400,
+                'body': {
+                    'error': 'Invalid JSON in request body'
+                },
+            }
+    else:
+        body = body_raw
+    
+    user_id = bind_user(req, body)
+    events = body.get('events', [])
+    
+    if not isinstance(events, list) or not events:
+        return {
+            'status': 400,
+            'body': {
+                'message': 'Events array is required'
+            },
+        }
+    
+    if len(events) > MAX_BATCH_EVENTS:
+        return {
+            'status': 400,
+            'body': {
+                'message': f'At most {MAX_BATCH_EVENTS} events can be logged per batch'
+            },
+        }
+    
+    # Reject malformed events individually so one bad click doesn't drop the batch
+    valid = []
+    rejected = []
+    for index, event in enumerate(events):
+        if not isinstance(event, dict) or not event.get('action'):
+            rejected.append({'index': index, 'message': 'Action is required'})
+        elif not isinstance(event.get('metadata') or {}, dict):
+            rejected.append({'index': index, 'message': 'Metadata must be an object'})
+        else:
+            valid.append(event)
+    
+    try:
+        accepted = interaction_log_service.record(valid, user_id, logger) if valid else 0
+        
+        logger.info('User action batch logged', {
+            'userId': user_id,
+            'accepted': accepted,
+            'rejected': len(rejected),
+            'dropped': len(valid) - accepted
+        })
+        
+        return {
+            'status': 200,
+            'body': {
+                'message': 'User actions logged successfully',
+                'accepted': accepted,
+                'dropped': len(valid) - accepted,
+                'rejected': rejected
+            },
+        }
+    except Exception as error:
+        logger.error('Error logging user action batch', {'error': str(error)})
+        
+        return {
+            'status': 500,
+            'body': {
+                'message': 'Failed to log user actions',
+                'error': str(error)
+            },
+        }
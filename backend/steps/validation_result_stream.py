@@ -0,0 +1,17 @@
+config = {
+    'name': 'validationResult',
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'id': {'type': 'string'},
+            'index': {'type': 'integer'},
+            'sourceId': {'type': 'string'},
+            'status': {'type': 'integer'},
+            'validationMethod': {'type': 'string'},
+            'validationReport': {'type': 'object'},
+            'error': {'type': 'string'}
+        },
+        'required': ['id', 'index', 'sourceId', 'status']
+    },
+    'baseConfig': {'storageType': 'default'}
+}
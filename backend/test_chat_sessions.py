@@ -0,0 +1,109 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.chat_session_service import chat_session_service
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from steps.source_chat_api_step import handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def test_chat_sessions_fold_history_into_summary():
+    """Sessions carry context between messages while keeping prompts bounded"""
+    context = MockContext()
+    prompts = []
+    original_create_completion = OpenAIService.create_completion
+    original_threshold = chat_session_service.threshold
+    original_recent_turns = chat_session_service.recent_turns
+
+    async def fake_create_completion(self, messages, **kwargs):
+        if messages[0]['content'].startswith('You summarize'):
+            content = 'Summary: the user asked about the method and results.'
+        else:
+            prompts.append(messages)
+            content = 'A fairly detailed answer about the source. ' * 5
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({'title': 'Chat Session Test Paper', 'authors': ['A. Author']}))
+    OpenAIService.create_completion = fake_create_completion
+    chat_session_service.threshold = 120
+    chat_session_service.recent_turns = 2
+
+    async def chat(message, session_id=None, start_session=False, user_id='alice'):
+        body = {'message': message, 'mode': 'explanation', 'userId': user_id}
+        if session_id:
+            body['sessionId'] = session_id
+        if start_session:
+            body['startSession'] = True
+        return await handler({'pathParams': {'sourceId': str(source_id)}, 'body': body}, context)
+
+    async def conversation():
+        # Without startSession or a sessionId nothing is persisted
+        stateless = await chat('What is this paper about?')
+        assert stateless['status'] == 200
+        assert stateless['body']['sessionId'] is None
+
+        first = await chat('How does the method work?', start_session=True)
+        session_id = first['body']['sessionId']
+        assert first['status'] == 200
+        assert len(prompts[1]) == 2
+
+        for i in range(5):
+            response = await chat(f'Follow-up question number {i}?', session_id)
+            assert response['body']['sessionId'] == session_id
+            # Summaries are written in the background, after the response
+            await chat_session_service.wait_for_summaries()
+
+        # Another user cannot read or extend the session
+        other_user = await chat('What did they ask?', session_id, user_id='mallory')
+        assert other_user['status'] == 404
+        return session_id
+
+    try:
+        session_id = asyncio.run(conversation())
+
+        print("Prompt sizes:", [len(messages) for messages in prompts])
+        # Follow-ups see earlier turns, but never more than the summary plus recent turns
+        assert prompts[2][1] == {'role': 'user', 'content': 'How does the method work?'}
+        assert max(len(messages) for messages in prompts) <= 2 + 1 + 3
+        assert prompts[-1][1]['content'].startswith('Summary of the conversation so far')
+
+        session = asyncio.run(database_service.get_chat_session(session_id))
+        assert session['summary'].startswith('Summary:')
+        assert len(session['turns']) <= 4
+
+        missing = asyncio.run(chat('Hello?', 'no-such-session'))
+        assert missing['status'] == 404
+
+        # Idle sessions are deleted with their turns
+        assert asyncio.run(database_service.delete_idle_chat_sessions(3600)) == 0
+        with database_service.get_connection() as conn:
+            conn.execute("UPDATE chat_sessions SET updated_at = datetime('now', '-2 hours')")
+        assert asyncio.run(database_service.delete_idle_chat_sessions(3600)) == 1
+        assert asyncio.run(database_service.get_chat_session(session_id)) is None
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        chat_session_service.threshold = original_threshold
+        chat_session_service.recent_turns = original_recent_turns
+
+if __name__ == "__main__":
+    test_chat_sessions_fold_history_into_summary()
+    print("\n✅ All chat session tests passed!")
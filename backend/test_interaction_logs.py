@@ -0,0 +1,152 @@
+import asyncio
+import sqlite3
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from src.services.interaction_log_service import InteractionLogService, interaction_log_service
+from steps.activity_analytics_api_step import handler as analytics_handler
+from steps.user_log_api_step import handler as log_handler
+from steps.user_log_batch_api_step import handler as batch_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def count_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM interaction_logs').fetchone()[0]
+
+def test_buffer_flushes_by_size_and_time():
+    """Events are written in batches, never on the recording call"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'logs.db')
+    service = InteractionLogService(db_path, flush_size=5, flush_interval=0.05, max_buffered=8)
+
+    async def run():
+        service.record([{'action': 'click'}] * 3, 'user-1')
+        # Nothing is written synchronously
+        assert service.snapshot()['buffered'] == 3 and service.stats['written'] == 0
+
+        # Reaching flush_size writes the whole buffer in one transaction
+        service.record([{'action': 'click'}] * 2, 'user-1')
+        await asyncio.sleep(0.01)
+        assert service.stats['written'] == 5 and service.stats['flushes'] == 1
+
+        # A partial batch is written once the interval passes
+        service.record([{'action': 'drag', 'metadata': {'sourceId': 7}}], 'user-2')
+        await asyncio.sleep(0.1)
+        assert service.stats['written'] == 6 and service.stats['flushes'] == 2
+
+        # Beyond the buffer bound events are dropped, not blocked on
+        service.flush_interval = 60
+        assert service.record([{'action': 'scroll'}] * 10, 'user-3') == 8
+        assert service.stats['dropped'] == 2
+        await service.flush()
+
+    asyncio.run(run())
+    service.close()
+    assert count_rows(db_path) == 14
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute("SELECT source_id FROM interaction_logs WHERE action = 'drag'").fetchone()[0] == '7'
+
+def test_log_endpoints():
+    """Single and batch endpoints buffer events for the shared log service"""
+    context = MockContext()
+    original_db_path = interaction_log_service.db_path
+    interaction_log_service.close()
+    interaction_log_service.db_path = os.path.join(tempfile.mkdtemp(), 'logs.db')
+    try:
+        async def run():
+            response = await log_handler({'body': {'userId': 'u1', 'action': 'click', 'metadata': {'element': 'search'}}}, context)
+            assert response['status'] == 200 and response['body']['logged']
+
+            response = await log_handler({'body': {'userId': 'u1'}}, context)
+            assert response['status'] == 400
+
+            response = await batch_handler({'body': {'userId': 'u1', 'events': [
+                {'action': 'click', 'timestamp': '2025-12-21T10:30:00.000Z'},
+                {'action': 'mode_toggle', 'sourceId': 3, 'metadata': {'to': 'explanation'}},
+                {'metadata': {'element': 'card'}},
+            ]}}, context)
+            print("Batch body:", response['body'])
+            assert response['status'] == 200
+            assert response['body']['accepted'] == 2
+            assert response['body']['rejected'] == [{'index': 2, 'message': 'Action is required'}]
+
+            response = await batch_handler({'body': {'events': []}}, context)
+            assert response['status'] == 400
+
+            await interaction_log_service.flush()
+
+        asyncio.run(run())
+        assert count_rows(interaction_log_service.db_path) == 3
+    finally:
+        interaction_log_service.close()
+        interaction_log_service.db_path = original_db_path
+
+def test_activity_rollups():
+    """Rollups are maintained at ingest and served without scanning raw logs"""
+    context = MockContext()
+    original_db_path = interaction_log_service.db_path
+    interaction_log_service.close()
+    interaction_log_service.db_path = os.path.join(tempfile.mkdtemp(), 'logs.db')
+    try:
+        async def run():
+            await batch_handler({'body': {'userId': 'u1', 'events': [
+                {'action': 'search', 'metadata': {'query': 'Graph  Neural Networks'}},
+                {'action': 'open_source', 'sourceId': 4},
+                {'action': 'open_source', 'sourceId': 4},
+            ]}}, context)
+            await batch_handler({'body': {'userId': 'u2', 'events': [
+                {'action': 'search', 'metadata': {'query': 'graph neural networks'}},
+                {'action': 'open_source', 'sourceId': 9},
+            ]}}, context)
+            # Split across flushes: user u1 must still be counted once
+            await interaction_log_service.flush()
+            await batch_handler({'body': {'userId': 'u1', 'events': [{'action': 'search', 'metadata': {'query': 'transformers'}}]}}, context)
+            await interaction_log_service.flush()
+            return await analytics_handler({'queryParams': {'bucket': 'hour'}}, context)
+
+        response = asyncio.run(run())
+        print("Analytics body:", response['body'])
+        assert response['status'] == 200
+        body = response['body']
+        assert len(body['series']) == 24
+        assert sum(point['events'] for point in body['series']) == 6
+        assert body['series'][-1]['activeUsers'] in (1, 2)
+        assert body['topSources'] == [{'sourceId': '4', 'events': 2}, {'sourceId': '9', 'events': 1}]
+        assert body['topActions'][0] == {'action': 'open_source', 'events': 3}
+        assert body['popularQueries'][0] == {'query': 'graph neural networks', 'count': 2}
+
+        # Reads touch the rollups only, so they don't change with raw log size
+        with sqlite3.connect(interaction_log_service.db_path) as conn:
+            conn.execute('DELETE FROM interaction_logs')
+        response = asyncio.run(analytics_handler({'queryParams': {'bucket': 'day'}}, context))
+        assert response['body']['series'][-1]['activeUsers'] == 2
+
+        assert asyncio.run(analytics_handler({'queryParams': {'bucket': 'week'}}, context))['status'] == 400
+        assert asyncio.run(analytics_handler({'queryParams': {'bucket': 'hour', 'from': '2020-01-01T00:00:00Z'}}, context))['status'] == 400
+        # Out-of-range timestamps are rejected before they reach SQLite
+        for bad_range in ({'to': '1e20'}, {'from': '-5', 'to': '0'}, {'to': 'nan'}, {'from': 'inf'}):
+            assert asyncio.run(analytics_handler({'queryParams': {'bucket': 'day', **bad_range}}, context))['status'] == 400
+    finally:
+        interaction_log_service.close()
+        interaction_log_service.db_path = original_db_path
+
+if __name__ == "__main__":
+    test_buffer_flushes_by_size_and_time()
+    test_log_endpoints()
+    test_activity_rollups()
+    print("\n✅ All interaction log tests passed!")
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import uuid
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.job_service import job_service
+from src.services.openai_service import OpenAIService
+from src.services.rate_limiter import BATCH, QuotaExceededError
+from steps import job_runner_step
+from steps.job_runner_step import handler as job_runner
+from steps.job_status_api_step import handler as job_status
+from steps.report_feedback_api_step import handler as feedback_handler
+from steps.source_action_api_step import handler as action_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+        self.events = []
+
+    async def emit(self, event):
+        self.events.append(event)
+
+priorities = []
+
+async def fake_create_completion(self, messages, **kwargs):
+    priorities.append(kwargs.get('priority'))
+    if 'Section: ' in messages[-1]['content']:
+        content = json.dumps({'feedback': [{'issueType': 'clarity', 'suggestion': 'Be specific', 'confidence': 0.7}]})
+    else:
+        content = 'An outline.'
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def test_async_jobs():
+    """Jobs are accepted immediately, run by the event step and polled for results"""
+    context = MockContext()
+    headers = {'x-user-id': 'job-user'}
+    original_create_completion = OpenAIService.create_completion
+    original_perform_action = job_runner_step.perform_action
+
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({'title': 'Job Test Paper'}))
+
+    def status(job_id, user_headers=headers):
+        return asyncio.run(job_status({'pathParams': {'jobId': job_id}, 'headers': user_headers}, context))
+
+    OpenAIService.create_completion = fake_create_completion
+    try:
+        # Source action job
+        response = asyncio.run(action_handler({
+            'pathParams': {'sourceId': str(source_id)},
+            'headers': headers,
+            'body': {'actionType': 'summarize_section', 'context': 'Methods', 'async': True}
+        }, context))
+        assert response['status'] == 202
+        job_id = response['body']['jobId']
+        assert context.events[-1] == {'topic': 'job-submitted', 'data': {'jobId': job_id, 'kind': 'source_action'}}
+        assert status(job_id)['body']['status'] == 'queued'
+
+        asyncio.run(job_runner(context.events[-1]['data'], context))
+        body = status(job_id)['body']
+        print("Action job:", body)
+        assert body['status'] == 'completed'
+        assert body['result']['response'] == 'An outline.'
+        assert body['result']['sourceId'] == str(source_id)
+        # Background actions don't compete with interactive calls
+        assert priorities[-1] == BATCH
+
+        # Redelivery doesn't rerun a finished job; other users can't see it
+        asyncio.run(job_runner(context.events[-1]['data'], context))
+        assert status(job_id)['body']['updatedAt'] == body['updatedAt']
+        assert status(job_id, {'x-user-id': 'someone-else'})['status'] == 404
+
+        # Report feedback job records per-section progress
+        report = f"# Introduction\nIntro {uuid.uuid4()}\n\n# Results\nResults {uuid.uuid4()}\n"
+        response = asyncio.run(feedback_handler({'headers': headers, 'body': {'reportContent': report, 'async': True}}, context))
+        assert response['status'] == 202
+        asyncio.run(job_runner(context.events[-1]['data'], context))
+        body = status(response['body']['jobId'])['body']
+        print("Feedback job:", body)
+        assert body['status'] == 'completed'
+        assert body['progress'] == {'completed': 2, 'total': 2}
+        assert [item['section'] for item in body['result']['feedback']] == ['Introduction', 'Results']
+
+        # Failures are stored with the status a synchronous call would return
+        async def over_quota(*args, **kwargs):
+            raise QuotaExceededError('job-user', 42)
+        job_runner_step.perform_action = over_quota
+        response = asyncio.run(action_handler({
+            'pathParams': {'sourceId': str(source_id)},
+            'headers': headers,
+            'body': {'actionType': 'explain_term', 'context': 'attention', 'async': True}
+        }, context))
+        asyncio.run(job_runner(context.events[-1]['data'], context))
+        body = status(response['body']['jobId'])['body']
+        assert body['status'] == 'failed'
+        assert body['error'] == {'status': 429, 'message': 'Token quota exceeded, try again later', 'retryAfter': 42}
+
+        assert status('no-such-job')['status'] == 404
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        job_runner_step.perform_action = original_perform_action
+
+def test_stale_jobs_fail():
+    """Jobs left queued or running past the timeout are failed, not polled forever"""
+    context = MockContext()
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_jobs_table())
+    for job_id in ('lost-event', 'dead-runner', 'live-runner'):
+        asyncio.run(database_service.create_job(job_id, 'source_action', 'job-user', {}))
+    asyncio.run(database_service.claim_job('dead-runner'))
+    asyncio.run(database_service.claim_job('live-runner'))
+    with database_service.get_connection() as conn:
+        conn.execute("UPDATE jobs SET updated_at = datetime('now', '-2 hours') WHERE id != 'live-runner'")
+        conn.commit()
+
+    def status(job_id):
+        return asyncio.run(job_status({'pathParams': {'jobId': job_id}, 'headers': {'x-user-id': 'job-user'}}, context))['body']
+
+    for job_id in ('lost-event', 'dead-runner'):
+        body = status(job_id)
+        assert body['status'] == 'failed'
+        assert body['error'] == {'status': 504, 'message': 'Job deadline exceeded'}
+    assert status('live-runner')['status'] == 'running'
+
+    # A job whose event can't be emitted fails straight away
+    class FailingContext(MockContext):
+        async def emit(self, event):
+            raise RuntimeError('bus down')
+
+    try:
+        asyncio.run(job_service.submit('source_action', {}, 'job-user', FailingContext()))
+        assert False, 'submit should re-raise the emit failure'
+    except RuntimeError:
+        pass
+    with database_service.get_connection() as conn:
+        statuses = [row[0] for row in conn.execute("SELECT status FROM jobs WHERE id NOT IN ('lost-event', 'dead-runner', 'live-runner')")]
+    assert statuses == ['failed']
+
+if __name__ == "__main__":
+    test_async_jobs()
+    test_stale_jobs_fail()
+    print("\n✅ All job tests passed!")
@@ -24,6 +24,8 @@ async def test_handler():
     class MockContext:
         def __init__(self):
             self.logger = MockLogger()
+        async def emit(self, event):
+            print(f"EMIT: {event}")
 
     context = MockContext()
 
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from src.services.request_context import ANONYMOUS_USER
+from steps.source_chat_api_step import handler as chat_handler
+from steps.source_mode_api_step import handler as mode_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+        self.events = []
+
+    async def emit(self, event):
+        self.events.append(event)
+
+def test_mode_preference_is_saved_and_used_by_chat():
+    """Mode changes persist per user and source, emit once, and default chat"""
+    context = MockContext()
+    user_id = 'mode-test-user'
+    headers = {'x-user-id': user_id}
+    prompts = []
+    original_create_completion = OpenAIService.create_completion
+
+    async def fake_create_completion(self, messages, **kwargs):
+        prompts.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='An answer.'))])
+
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({'title': 'Mode Preference Test Paper'}))
+
+    def set_mode(mode, headers=headers):
+        return asyncio.run(mode_handler({'pathParams': {'sourceId': str(source_id)}, 'headers': headers, 'body': {'mode': mode}}, context))
+
+    OpenAIService.create_completion = fake_create_completion
+    try:
+        response = set_mode('implementation')
+        assert response['status'] == 200
+        assert response['body']['previousMode'] is None
+        assert context.events == [{
+            'topic': 'mode-changed',
+            'data': {'sourceId': source_id, 'userId': user_id, 'mode': 'implementation', 'previousMode': None}
+        }]
+
+        # Re-selecting the same mode is not a change
+        set_mode('implementation')
+        assert len(context.events) == 1
+
+        # Stored, not just cached
+        database_service.mode_cache.clear()
+        assert asyncio.run(database_service.get_mode_preference(user_id, source_id)) == 'implementation'
+
+        # Chat without a mode uses the preference; an explicit mode still wins
+        response = asyncio.run(chat_handler({'pathParams': {'sourceId': str(source_id)}, 'headers': headers, 'body': {'message': 'How would I build this?'}}, context))
+        assert response['body']['mode'] == 'implementation'
+        response = asyncio.run(chat_handler({'pathParams': {'sourceId': str(source_id)}, 'headers': headers, 'body': {'message': 'Summarize it', 'mode': 'summary'}}, context))
+        assert response['body']['mode'] == 'summary'
+
+        # Preferences are per user
+        assert asyncio.run(database_service.get_mode_preference('someone-else', source_id)) is None
+
+        # Anonymous toggles are not saved, so they can't change other visitors' default
+        response = set_mode('explanation', headers={})
+        assert response['status'] == 200
+        assert response['body']['previousMode'] is None
+        assert context.events[-1]['data']['userId'] == ANONYMOUS_USER
+        assert asyncio.run(database_service.get_mode_preference(ANONYMOUS_USER, source_id)) is None
+        response = asyncio.run(chat_handler({'pathParams': {'sourceId': str(source_id)}, 'body': {'message': 'What is it about?'}}, context))
+        assert response['body']['mode'] == 'summary'
+    finally:
+        OpenAIService.create_completion = original_create_completion
+
+if __name__ == "__main__":
+    test_mode_preference_is_saved_and_used_by_chat()
+    print("\n✅ All mode preference tests passed!")
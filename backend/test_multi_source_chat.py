@@ -0,0 +1,108 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.embedding_service import embedding_service
+from src.services.openai_service import OpenAIService
+from src.services.passage_index import split_passages
+from steps.multi_source_chat_api_step import handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def test_split_passages():
+    """Passages keep whole sentences and respect the token limit"""
+    text = "First sentence here. Second sentence here.\n\nA new paragraph. " + "word " * 200
+    passages = split_passages(text, 20, 'gpt-4')
+    print("Passages:", passages)
+    assert passages[0] == 'First sentence here. Second sentence here. A new paragraph.'
+    assert all(len(passage) <= 20 * 4 for passage in passages[1:])
+
+def test_multi_source_chat_api():
+    """Answers draw on passages from several sources and attribute them"""
+    context = MockContext()
+    prompts = []
+    embed_calls = []
+    original_create_completion = OpenAIService.create_completion
+    original_embed = embedding_service.embed
+
+    async def fake_create_completion(self, messages, **kwargs):
+        prompts.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Dropout regularizes training [S2].'))])
+
+    async def counting_embed(texts, logger=None, **kwargs):
+        embed_calls.append(len(texts))
+        return await original_embed(texts, logger, **kwargs)
+
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    attention_id = asyncio.run(database_service.insert_source({
+        'title': 'Sparse Attention', 'year': 2020,
+        'abstract': 'Sparse attention reduces quadratic cost in transformers for long documents.'
+    }))
+    dropout_id = asyncio.run(database_service.insert_source({
+        'title': 'Dropout Networks', 'year': 2014,
+        'abstract': 'Dropout randomly drops units during training to prevent overfitting in neural networks.'
+    }))
+
+    OpenAIService.create_completion = fake_create_completion
+    embedding_service.embed = counting_embed
+    try:
+        # Test 1: Validation
+        response = asyncio.run(handler({'body': {'message': 'Hi'}}, context))
+        assert response['status'] == 400
+
+        # Test 2: Cross-source answer with attribution
+        response = asyncio.run(handler({'body': {
+            'sourceIds': [attention_id, dropout_id, 999999],
+            'message': 'How does dropout prevent overfitting during training?'
+        }}, context))
+        print(f"Body: {response['body']}")
+        assert response['status'] == 200
+        sources = response['body']['sources']
+        assert [s['label'] for s in sources] == ['S1', 'S2']
+        assert sources[1]['cited'] and not sources[0]['cited']
+        assert sources[1]['topScore'] > sources[0]['topScore']
+        assert response['body']['missingSourceIds'] == ['999999']
+        assert '[S2] Dropout Networks (2014)' in prompts[0][0]['content']
+        # Query and all new passages were embedded in a single call
+        assert len(embed_calls) == 1
+
+        # Test 3: Indexed sources are reused; only the query is embedded
+        asyncio.run(handler({'body': {'sourceIds': [attention_id, dropout_id], 'message': 'What is sparse attention?'}}, context))
+        assert embed_calls[1] == 1
+
+        # Test 4: No known sources
+        response = asyncio.run(handler({'body': {'sourceIds': [999999], 'message': 'Hi'}}, context))
+        assert response['status'] == 404
+
+        # Test 5: A message too long for the model is rejected before any call
+        calls = len(prompts), len(embed_calls)
+        response = asyncio.run(handler({'body': {'sourceIds': [attention_id], 'message': 'Why? ' * 10000}}, context))
+        print(f"Body: {response['body']}")
+        assert response['status'] == 400
+        assert response['body']['promptTokens'] > response['body']['maxPromptTokens']
+        assert (len(prompts), len(embed_calls)) == calls
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        embedding_service.embed = original_embed
+
+if __name__ == "__main__":
+    test_split_passages()
+    test_multi_source_chat_api()
+    print("\n✅ All multi-source chat tests passed!")
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+import os
+import threading
+import httpx
+sys.path.insert(0, os.getcwd())
+
+from src.services.pet_store import PetStoreService
+
+def test_requests_share_one_client():
+    """Calls reuse a single pooled client pointed at the configured base URL"""
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        body = json.loads(request.content)
+        return httpx.Response(200, json={'id': len(requests), **body})
+
+    service = PetStoreService('http://petstore.test/v2', transport=httpx.MockTransport(handle))
+
+    async def run():
+        pet = await service.create_pet({'name': 'Rex', 'photoUrl': 'http://img/rex.png'})
+        client = service.client
+        order = await service.create_order({'pet_id': str(pet['id']), 'quantity': 2})
+        assert service.client is client
+        await service.aclose()
+        assert client.is_closed
+        return pet, order
+
+    pet, order = asyncio.run(run())
+    assert [str(request.url) for request in requests] == ['http://petstore.test/v2/pet', 'http://petstore.test/v2/store/order']
+    assert pet['name'] == 'Rex' and pet['photoUrls'] == ['http://img/rex.png']
+    assert order['petId'] == '1' and order['quantity'] == 2
+    assert requests[0].headers['content-type'] == 'application/json'
+
+    # A new event loop gets a fresh client rather than a pool bound to a closed loop
+    asyncio.run(service.create_pet({'name': 'Fido'}))
+    assert len(requests) == 3
+    asyncio.run(service.aclose())
+
+def test_clients_from_other_loops_are_closed():
+    """Replacing the client of another event loop closes it instead of dropping its pool"""
+    service = PetStoreService('http://petstore.test/v2', transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+
+    async def current_client():
+        return service.client
+
+    # A loop running in another thread closes its client there
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        threaded = asyncio.run_coroutine_threadsafe(current_client(), other_loop).result()
+        asyncio.run(current_client())
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), other_loop).result()
+        assert threaded.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
+
+    # An idle loop's client is closed at exit, along with the current one
+    idle_loop = asyncio.new_event_loop()
+    try:
+        idle = idle_loop.run_until_complete(current_client())
+        latest_loop = asyncio.new_event_loop()
+        latest = latest_loop.run_until_complete(current_client())
+        assert not idle.is_closed
+        service.close_at_exit()
+        assert idle.is_closed and latest.is_closed
+    finally:
+        idle_loop.close()
+        latest_loop.close()
+
+if __name__ == "__main__":
+    test_requests_share_one_client()
+    test_clients_from_other_loops_are_closed()
+    print("\n✅ All pet store tests passed!")
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from src.services.prompt_builder import PromptCacheStats
+from src.services.source_action_service import perform_action
+from steps.source_chat_api_step import handler as chat_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def test_actions_and_chat_share_the_source_prefix():
+    """Every call on a source starts with the same bytes, so the provider can cache them"""
+    context = MockContext()
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({
+        'title': 'Sparse Attention', 'authors': ['A. Author'], 'year': 2020, 'abstract': 'Sparse attention reduces quadratic cost.'
+    }))
+    calls = []
+    original_create_completion = OpenAIService.create_completion
+
+    async def fake_create_completion(self, messages, **kwargs):
+        calls.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='An answer.'))])
+
+    OpenAIService.create_completion = fake_create_completion
+    try:
+        source = asyncio.run(database_service.get_source_by_id(source_id))
+        asyncio.run(perform_action(source, 'explain_term', 'attention', context.logger))
+        asyncio.run(perform_action(source, 'summarize_section', 'Methods', context.logger))
+        response = asyncio.run(chat_handler({
+            'pathParams': {'sourceId': str(source_id)},
+            'body': {'message': 'What is the main idea?', 'mode': 'explanation'}
+        }, context))
+        assert response['status'] == 200
+    finally:
+        OpenAIService.create_completion = original_create_completion
+
+    assert len(calls) == 3
+    assert calls[0][0] == calls[1][0] == calls[2][0]
+    assert 'Sparse attention reduces quadratic cost.' in calls[0][0]['content']
+    # Only the instruction differs
+    assert len({messages[-1]['content'] for messages in calls}) == 3
+
+def test_cache_stats_read_cached_tokens():
+    """Cached prompt tokens are read from the usage details and accumulated"""
+    stats = PromptCacheStats()
+    usage = SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1536))
+    assert stats.record(SimpleNamespace(usage=usage)) == {'promptTokens': 2000, 'cachedTokens': 1536}
+    # Responses without usage details, e.g. mock responses, count as uncached
+    assert stats.record(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=None))) == {
+        'promptTokens': 2000, 'cachedTokens': 0
+    }
+    assert stats.record(SimpleNamespace()) == {'promptTokens': 0, 'cachedTokens': 0}
+    assert stats.requests == 3
+    assert stats.hit_ratio() == 1536 / 4000
+
+if __name__ == "__main__":
+    test_actions_and_chat_share_the_source_prefix()
+    test_cache_stats_read_cached_tokens()
+    print("\n✅ All prompt cache tests passed!")
@@ -0,0 +1,210 @@
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.rate_limiter import BATCH, INTERACTIVE, QuotaExceededError, RateLimiter, UserTokenQuota
+from src.services.request_context import ANONYMOUS_USER
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self):
+        super().__init__('Rate limit reached')
+        self.response = SimpleNamespace(status_code=429, headers={'retry-after': '0.05'})
+
+def test_rate_limiter_retries_and_adapts():
+    """429s are retried after Retry-After and shrink the concurrency window"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, initial_concurrency=4, max_concurrency=4, max_retries=3)
+    state = {'calls': 0, 'active': 0, 'peak': 0}
+
+    async def call():
+        state['calls'] += 1
+        call_number = state['calls']
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        try:
+            await asyncio.sleep(0.01)
+            if call_number == 2:
+                raise RateLimitError()
+            return 'ok'
+        finally:
+            state['active'] -= 1
+
+    async def run_all():
+        return await asyncio.gather(*(limiter.run(call, estimated_tokens=50, logger=MockLogger()) for _ in range(12)))
+
+    results = asyncio.run(run_all())
+    snapshot = limiter.snapshot()
+    print("Snapshot:", snapshot)
+    assert results == ['ok'] * 12
+    assert snapshot['throttled'] == 1
+    assert snapshot['retries'] == 1
+    assert snapshot['inFlight'] == 0
+    assert state['peak'] <= 4
+
+def test_rate_limiter_does_not_retry_client_errors():
+    """Non-retryable errors propagate immediately and release their slot"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ValueError('bad request')
+
+    try:
+        asyncio.run(limiter.run(call))
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+    assert len(attempts) == 1
+    assert limiter.snapshot()['inFlight'] == 0
+
+def test_rate_limiter_dispatches_interactive_first():
+    """Queued interactive calls go before batch calls, which keep a share of the window"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, initial_concurrency=2, max_concurrency=2, batch_share=0.5)
+    order = []
+
+    def make_call(name):
+        async def call():
+            order.append(name)
+            await asyncio.sleep(0.01)
+            return name
+        return call
+
+    async def run_all():
+        batch = [asyncio.ensure_future(limiter.run(make_call(f'batch-{i}'), priority=BATCH)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = [asyncio.ensure_future(limiter.run(make_call(f'chat-{i}'), priority=INTERACTIVE)) for i in range(3)]
+        await asyncio.gather(*batch, *interactive)
+
+    asyncio.run(run_all())
+    print("Dispatch order:", order)
+    # batch-0 took the single batch slot; every chat call ran before the remaining batch work
+    assert order[0] == 'batch-0'
+    assert order[1:4] == ['chat-0', 'chat-1', 'chat-2']
+    assert limiter.snapshot()['dispatchedByClass'] == {INTERACTIVE: 3, BATCH: 3}
+
+def test_rate_limiter_promotes_starved_batch_work():
+    """Batch calls queued past the starvation timeout are served before new interactive calls"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, initial_concurrency=1, max_concurrency=1, starvation_timeout=0.02)
+    order = []
+
+    def make_call(name):
+        async def call():
+            order.append(name)
+            await asyncio.sleep(0.015)
+        return call
+
+    async def run_all():
+        calls = [asyncio.ensure_future(limiter.run(make_call('chat-0')))]
+        await asyncio.sleep(0)
+        calls.append(asyncio.ensure_future(limiter.run(make_call('batch-0'), priority=BATCH)))
+        calls.extend(asyncio.ensure_future(limiter.run(make_call(f'chat-{i}'))) for i in range(1, 5))
+        await asyncio.gather(*calls)
+
+    asyncio.run(run_all())
+    print("Dispatch order:", order)
+    assert order.index('batch-0') < 4
+    assert limiter.snapshot()['starvationPromotions'] == 1
+
+def test_rate_limiter_shares_capacity_between_users():
+    """A user with a deep queue does not delay another user's calls"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, initial_concurrency=1, max_concurrency=1)
+    order = []
+
+    def make_call(name):
+        async def call():
+            order.append(name)
+            await asyncio.sleep(0.005)
+        return call
+
+    async def run_all():
+        calls = [asyncio.ensure_future(limiter.run(make_call(f'alice-{i}'), estimated_tokens=500, user_id='alice')) for i in range(6)]
+        await asyncio.sleep(0)
+        calls.extend(asyncio.ensure_future(limiter.run(make_call(f'bob-{i}'), estimated_tokens=500, user_id='bob')) for i in range(2))
+        await asyncio.gather(*calls)
+
+    asyncio.run(run_all())
+    print("Dispatch order:", order)
+    # bob's calls interleave with alice's backlog instead of waiting behind it
+    assert order.index('bob-1') < 6
+
+def test_rate_limiter_enforces_user_token_budget():
+    """Users over their token budget are rejected; refunds give tokens back"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, user_token_budget=1000, user_budget_window=60)
+
+    async def call():
+        return 'ok'
+
+    async def run_all():
+        await limiter.run(call, estimated_tokens=800, user_id='alice')
+        try:
+            await limiter.run(call, estimated_tokens=800, user_id='alice')
+            assert False, 'expected QuotaExceededError'
+        except QuotaExceededError as error:
+            assert 0 < error.retry_after <= 60
+        limiter.refund_tokens(600, user_id='alice')
+        await limiter.run(call, estimated_tokens=800, user_id='alice')
+        # Other users are unaffected
+        await limiter.run(call, estimated_tokens=800, user_id='bob')
+        # Callers without a user ID share one budget instead of escaping it
+        await limiter.run(call, estimated_tokens=800)
+        try:
+            await limiter.run(call, estimated_tokens=800, user_id=ANONYMOUS_USER)
+            assert False, 'expected QuotaExceededError'
+        except QuotaExceededError:
+            pass
+
+    asyncio.run(run_all())
+    assert limiter.quota.used('alice') == 1000
+    assert limiter.quota.used(ANONYMOUS_USER) == 800
+    assert limiter.snapshot()['quotaRejections'] == 2
+
+def test_anonymous_budget_is_configurable():
+    """The shared anonymous budget can differ from the per-user one"""
+    quota = UserTokenQuota(budget=1000, window_seconds=60, anonymous_budget=5000)
+    quota.consume(ANONYMOUS_USER, 3000)
+    quota.consume(ANONYMOUS_USER, 1500)
+    assert quota.used(ANONYMOUS_USER) == 4500
+    assert not UserTokenQuota(budget=1000, window_seconds=60, anonymous_budget=0).enforced(ANONYMOUS_USER)
+
+def test_rate_limiter_cancels_queued_calls_cleanly():
+    """Calls cancelled while queued raise CancelledError even if their slot holder is cancelled too"""
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1000000, initial_concurrency=1, max_concurrency=1)
+
+    async def call():
+        await asyncio.sleep(10)
+
+    async def cancel_all():
+        tasks = [asyncio.ensure_future(limiter.run(call, estimated_tokens=50)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # The holder and the queued calls are cancelled in the same tick, as at a deadline
+        for task in tasks:
+            task.cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(cancel_all())
+    print("Results:", results)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert limiter.snapshot()['inFlight'] == 0
+    assert limiter._queued() == 0
+
+if __name__ == "__main__":
+    test_rate_limiter_retries_and_adapts()
+    test_rate_limiter_does_not_retry_client_errors()
+    test_rate_limiter_dispatches_interactive_first()
+    test_rate_limiter_promotes_starved_batch_work()
+    test_rate_limiter_shares_capacity_between_users()
+    test_rate_limiter_enforces_user_token_budget()
+    test_anonymous_budget_is_configurable()
+    test_rate_limiter_cancels_queued_calls_cleanly()
+    print("\n✅ All rate limiter tests passed!")
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from src.services.report_review_service import split_report_sections
+from steps import report_feedback_api_step
+from steps.report_feedback_api_step import handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def use_test_environment():
+    """Review into a fresh database, as if an API key were configured"""
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    original_key = os.environ.get('OPENAI_API_KEY')
+    os.environ['OPENAI_API_KEY'] = 'test-key'
+    return original_key
+
+def restore_api_key(original_key):
+    if original_key is None:
+        os.environ.pop('OPENAI_API_KEY', None)
+    else:
+        os.environ['OPENAI_API_KEY'] = original_key
+
+REPORT = """Working notes on the study.
+
+# Introduction
+We study attention in long documents.
+
+## Methods
+We fine-tune on 10,000 examples.
+
+# Empty
+
+# Results
+Accuracy improves by 4%.
+"""
+
+def test_split_report_sections():
+    """Sections are split by headings and empty ones are dropped"""
+    sections = split_report_sections(REPORT)
+    print("Sections:", [label for label, _ in sections])
+    assert [label for label, _ in sections] == ['general', 'Introduction', 'Methods', 'Results']
+    assert sections[2][1] == 'We fine-tune on 10,000 examples.'
+
+def test_report_feedback_api():
+    """Test the report feedback API handler"""
+    context = MockContext()
+    original_create_completion = OpenAIService.create_completion
+    original_key = use_test_environment()
+
+    print("Testing Report Feedback API...")
+
+    # Test 1: Missing report content
+    print("\n1. Testing missing report content...")
+    response = asyncio.run(handler({'body': {}}, context))
+    print(f"Status: {response['status']}")
+    assert response['status'] == 400
+
+    reviewed_sections = []
+
+    async def fake_create_completion(self, messages, **kwargs):
+        reviewed_sections.append(messages[1]['content'].split('Section: ')[1].split('\n')[0])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({
+            'feedback': [{'issueType': 'clarity', 'suggestion': 'Be specific', 'confidence': 0.7}]
+        })))])
+
+    OpenAIService.create_completion = fake_create_completion
+    try:
+        # Test 2: Every section is reviewed and labelled
+        print("\n2. Testing section-parallel review...")
+        response = asyncio.run(handler({'body': {'reportContent': REPORT}}, context))
+        print(f"Status: {response['status']}")
+        print(f"Feedback: {response['body']['feedback']}")
+        assert response['status'] == 200
+        assert [item['section'] for item in response['body']['feedback']] == ['general', 'Introduction', 'Methods', 'Results']
+
+        # Test 3: Resubmission only re-reviews the edited section
+        print("\n3. Testing incremental re-review...")
+        reviewed_sections.clear()
+        response = asyncio.run(handler({'body': {'reportContent': REPORT.replace('by 4%', 'by 5%')}}, context))
+        print(f"Reviewed sections: {reviewed_sections}")
+        print(f"Reused sections: {response['body']['reusedSections']}")
+        assert response['status'] == 200
+        assert reviewed_sections == ['Results']
+        assert len(response['body']['feedback']) == 4
+
+        # Test 4: Mock responses without an API key are not cached
+        print("\n4. Testing mock responses are not cached...")
+        OpenAIService.create_completion = original_create_completion
+        os.environ.pop('OPENAI_API_KEY')
+        edited = REPORT.replace('by 4%', 'by 6%')
+        asyncio.run(handler({'body': {'reportContent': edited}}, context))
+        os.environ['OPENAI_API_KEY'] = 'test-key'
+        OpenAIService.create_completion = fake_create_completion
+        reviewed_sections.clear()
+        asyncio.run(handler({'body': {'reportContent': edited}}, context))
+        assert reviewed_sections == ['Results']
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        restore_api_key(original_key)
+
+    print("\n✅ All report feedback tests passed!")
+
+def test_report_feedback_returns_partial_results_at_deadline():
+    """Sections still running at the deadline are reported, not waited for"""
+    context = MockContext()
+    original_create_completion = OpenAIService.create_completion
+    original_timeout = report_feedback_api_step.REQUEST_TIMEOUT
+    original_key = use_test_environment()
+
+    async def slow_results_completion(self, messages, **kwargs):
+        section = messages[1]['content'].split('Section: ')[1].split('\n')[0]
+        await asyncio.sleep(5 if section == 'Results' else 0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps({
+            'feedback': [{'issueType': 'clarity', 'suggestion': 'Be specific', 'confidence': 0.7}]
+        })))])
+
+    OpenAIService.create_completion = slow_results_completion
+    report_feedback_api_step.REQUEST_TIMEOUT = 0.2
+    try:
+        response = asyncio.run(handler({'body': {'reportContent': REPORT}}, context))
+        print(f"Body: {response['body']}")
+        assert response['status'] == 200
+        assert response['body']['timedOutSections'] == ['Results']
+        assert 'Results' not in [item['section'] for item in response['body']['feedback']]
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        report_feedback_api_step.REQUEST_TIMEOUT = original_timeout
+        restore_api_key(original_key)
+
+if __name__ == "__main__":
+    test_split_report_sections()
+    test_report_feedback_api()
+    test_report_feedback_returns_partial_results_at_deadline()
@@ -0,0 +1,150 @@
+import asyncio
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.interaction_log_service import interaction_log_service
+from src.services.research_query_service import query_cache_key, research_query_service, source_result
+from src.services.ttl_cache import MISSING
+from src.services.types import Source
+from steps.research_query_api_step import handler as query_handler
+from steps.research_query_warm_cron_step import handler as warm_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def test_popular_queries_are_warmed():
+    """The cron step precomputes results for the most frequent queries"""
+    context = MockContext()
+    original_db_path = interaction_log_service.db_path
+    interaction_log_service.close()
+    interaction_log_service.db_path = os.path.join(tempfile.mkdtemp(), 'logs.db')
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    research_query_service.result_cache.clear()
+    try:
+        async def run():
+            first = await query_handler({'body': {'query': 'Quantum Error Correction'}}, context)
+            assert first['status'] == 200 and not first['body']['cached']
+            # Case and spacing variants share a cache entry
+            second = await query_handler({'body': {'query': 'quantum  error correction'}}, context)
+            assert second['body']['cached']
+            assert second['body']['sources'] == first['body']['sources']
+            await query_handler({'body': {'query': 'Protein Folding'}}, context)
+            await interaction_log_service.flush()
+
+            # Entries expire overnight; the warmer brings the popular ones back
+            research_query_service.result_cache.clear()
+            assert research_query_service.result_cache.get(query_cache_key('quantum error correction', {})) is MISSING
+            await warm_handler(context)
+
+        asyncio.run(run())
+        cache = research_query_service.result_cache
+        warmed = cache.get(query_cache_key('quantum error correction', {}))
+        assert warmed is not MISSING
+        assert warmed['sources'] and all('quantum error correction' in source['title'].lower() for source in warmed['sources'])
+        assert cache.get(query_cache_key('protein folding', {})) is not MISSING
+
+        response = asyncio.run(query_handler({'body': {'query': 'Quantum Error Correction'}}, context))
+        assert response['body']['cached']
+    finally:
+        interaction_log_service.close()
+        interaction_log_service.db_path = original_db_path
+        research_query_service.result_cache.clear()
+
+def test_canonical_cache_keys():
+    """Case, whitespace, word order, stopwords and filter order don't split the cache"""
+    key = query_cache_key('Transformers for Protein Folding', {'year': 2024, 'field': 'Biology'})
+    assert query_cache_key('  protein FOLDING transformers ', {'field': 'biology', 'year': '2024'}) == key
+    assert query_cache_key('folding of protein with transformers', {'field': 'Biology', 'year': 2024, 'type': ''}) == key
+    assert query_cache_key('protein folding', {'field': 'Biology', 'year': 2024}) != key
+    assert query_cache_key('Transformers for Protein Folding', {'year': 2023, 'field': 'Biology'}) != key
+    # Stopword-only queries don't collapse onto one empty key
+    assert query_cache_key('the', {}) != query_cache_key('of', {})
+
+def test_matching_inserts_invalidate_results():
+    """A new source drops the cached results it could appear in, and only those"""
+    context = MockContext()
+    original_db_path = interaction_log_service.db_path
+    interaction_log_service.close()
+    interaction_log_service.db_path = os.path.join(tempfile.mkdtemp(), 'logs.db')
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    research_query_service.result_cache.clear()
+    try:
+        async def run():
+            await query_handler({'body': {'query': 'Spiking Neural Networks'}}, context)
+            await query_handler({'body': {'query': 'Coral Reef Bleaching'}}, context)
+            assert (await query_handler({'body': {'query': 'spiking neural networks'}}, context))['body']['cached']
+
+            await database_service.insert_source({
+                'title': 'Energy-efficient spiking neural networks on neuromorphic chips',
+                'abstract': 'We train spiking networks end to end.'
+            })
+            spiking = await query_handler({'body': {'query': 'Spiking Neural Networks'}}, context)
+            assert not spiking['body']['cached']
+            assert any('neuromorphic' in source['title'] for source in spiking['body']['sources'])
+            assert (await query_handler({'body': {'query': 'Coral Reef Bleaching'}}, context))['body']['cached']
+            await interaction_log_service.flush()
+
+        asyncio.run(run())
+        snapshot = research_query_service.snapshot()
+        print("Cache snapshot:", snapshot)
+        assert snapshot['invalidations'] == 1
+        assert 0 < snapshot['hitRate'] < 1
+    finally:
+        interaction_log_service.close()
+        interaction_log_service.db_path = original_db_path
+        research_query_service.result_cache.clear()
+
+def test_word_order_shares_results():
+    """Queries with the same cache key search the same way, so cached results equal fresh ones"""
+    logger = MockLogger()
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    research_query_service.result_cache.clear()
+    try:
+        async def run():
+            await database_service.create_sources_table()
+            for n in range(5):
+                await database_service.insert_source({'title': f'Sparse Attention paper {n}', 'year': 2020})
+            first, cached = await research_query_service.query('Attention Sparse', {}, logger)
+            assert not cached
+            assert sorted(source['title'] for source in first['sources']) == [f'Sparse Attention paper {n}' for n in range(5)]
+            served, cached = await research_query_service.query('sparse attention', {}, logger)
+            assert cached
+            assert served == await research_query_service.compute('sparse attention', {}, logger)
+
+        asyncio.run(run())
+    finally:
+        research_query_service.result_cache.clear()
+
+def test_source_result_keeps_the_response_shape():
+    """Stored sources are returned without internal columns or null text"""
+    source = Source(1, 'Sparse Attention', ['A. Author'], None, None, 2020, 'Machine Learning', None, '2024-01-01 00:00:00')
+    result = source_result(source)
+    assert result == {
+        'title': 'Sparse Attention', 'authors': ['A. Author'], 'abstract': '', 'url': '',
+        'year': 2020, 'field': 'Machine Learning', 'type': None
+    }
+    # The cached record's authors list is not shared with the response
+    result['authors'].append('B. Author')
+    assert source.authors == ['A. Author']
+
+if __name__ == "__main__":
+    test_canonical_cache_keys()
+    test_source_result_keeps_the_response_shape()
+    test_word_order_shares_results()
+    test_matching_inserts_invalidate_results()
+    test_popular_queries_are_warmed()
+    print("\n✅ All research query cache tests passed!")
@@ -0,0 +1,200 @@
+import asyncio
+import sys
+import os
+import time
+import requests
+sys.path.insert(0, os.getcwd())
+
+from src.services import firecrawl_service
+from src.services.firecrawl_service import FirecrawlService, is_upstream_failure
+from src.services.request_context import DeadlineExceededError, remaining_time, run_within_deadline, start_deadline, timeout_within_deadline
+from src.services.resilience import CLOSED, OPEN, CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+def test_circuit_breaker_opens_and_probes():
+    """Consecutive failures open the circuit; a successful probe closes it"""
+    breaker = CircuitBreaker('upstream', failure_threshold=2, recovery_timeout=0.05)
+
+    async def fail():
+        raise ConnectionError('down')
+
+    async def succeed():
+        return 'ok'
+
+    async def run_all():
+        for _ in range(2):
+            try:
+                await breaker.call(fail)
+            except ConnectionError:
+                pass
+        assert breaker.state == OPEN
+
+        # Open circuits fail fast without touching the upstream
+        try:
+            await breaker.call(succeed)
+            assert False, 'expected CircuitOpenError'
+        except CircuitOpenError as error:
+            assert 0 < error.retry_after <= 0.05
+
+        await asyncio.sleep(0.06)
+        assert await breaker.call(succeed) == 'ok'
+
+    asyncio.run(run_all())
+    print("Breaker:", breaker.snapshot())
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['rejected'] == 1
+
+def test_circuit_breaker_ignores_non_failures():
+    """Errors outside is_failure do not count towards opening the circuit"""
+    breaker = CircuitBreaker('upstream', failure_threshold=1, is_failure=lambda error: isinstance(error, ConnectionError))
+
+    async def bad_request():
+        raise ValueError('bad request')
+
+    try:
+        asyncio.run(breaker.call(bad_request))
+    except ValueError:
+        pass
+    assert breaker.state == CLOSED
+
+def test_firecrawl_breaker_counts_only_upstream_failures():
+    """Transport errors and 5xx count; bad URLs and the caller's deadline do not"""
+    class HTTPError(Exception):
+        def __init__(self, status_code):
+            super().__init__(f'HTTP {status_code}')
+            self.status_code = status_code
+
+    class DNSResolutionError(HTTPError):
+        pass
+
+    assert is_upstream_failure(ConnectionError('reset'))
+    assert is_upstream_failure(requests.Timeout('read timed out'))
+    assert is_upstream_failure(HTTPError(503))
+    assert is_upstream_failure(HTTPError(429))
+    assert not is_upstream_failure(HTTPError(404))
+    assert not is_upstream_failure(HTTPError(400))
+    assert not is_upstream_failure(DNSResolutionError(500))
+    assert not is_upstream_failure(DeadlineExceededError())
+    assert not is_upstream_failure(ValueError('bad url'))
+
+def test_hedged_request_races_slow_primary():
+    """A call slower than the tracked p95 is raced by a backup"""
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(10):
+        tracker.record(0.01)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        # The first attempt hangs; the backup answers quickly
+        await asyncio.sleep(1.0 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    started = time.monotonic()
+    result = asyncio.run(hedged(call, tracker, min_delay=0.02, logger=MockLogger()))
+    assert result == 2
+    assert len(attempts) == 2
+    assert time.monotonic() - started < 0.5
+
+def test_firecrawl_serves_cached_content_when_open():
+    """Once the breaker opens, the last good scrape is served"""
+    class FlakyApp:
+        healthy = True
+
+        def scrape_url(self, url, timeout=None):
+            if not self.healthy:
+                raise ConnectionError('Firecrawl unavailable')
+            return {'data': {'markdown': f'# Content of {url}'}}
+
+    original_breaker = firecrawl_service.firecrawl_breaker
+    firecrawl_service.firecrawl_breaker = CircuitBreaker('firecrawl', failure_threshold=1, recovery_timeout=60)
+    try:
+        service = FirecrawlService()
+        service.app = FlakyApp()
+        url = 'https://example.com/resilience-test'
+
+        assert asyncio.run(service.extract_content(url, MockLogger())) == f'# Content of {url}'
+        service.app.healthy = False
+        assert asyncio.run(service.extract_content(url, MockLogger())) == f'# Content of {url}'
+        assert firecrawl_service.firecrawl_breaker.state == OPEN
+        # Served from cache again, this time without calling Firecrawl at all
+        assert asyncio.run(service.extract_content(url, MockLogger())) == f'# Content of {url}'
+        assert firecrawl_service.firecrawl_breaker.snapshot()['rejected'] == 1
+
+        try:
+            asyncio.run(service.extract_content('https://example.com/never-scraped', MockLogger()))
+            assert False, 'expected CircuitOpenError'
+        except CircuitOpenError:
+            pass
+    finally:
+        firecrawl_service.firecrawl_breaker = original_breaker
+
+def test_firecrawl_calls_get_the_remaining_budget():
+    """The SDK's own timeout is capped by the request deadline, so its thread stops too"""
+    timeouts = []
+
+    class App:
+        def search(self, query, timeout=None):
+            timeouts.append(timeout)
+            return {'data': []}
+
+    service = FirecrawlService()
+    service.app = App()
+
+    async def search(deadline):
+        if deadline is not None:
+            start_deadline(deadline)
+        return await service.search('timeout test', MockLogger())
+
+    asyncio.run(search(None))
+    asyncio.run(search(2))
+    assert timeouts[0] == firecrawl_service.REQUEST_TIMEOUT * 1000
+    assert 1000 < timeouts[1] <= 2000
+
+def test_deadline_cancels_abandoned_work():
+    """Work still running at the request deadline is cancelled"""
+    state = {'cancelled': False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state['cancelled'] = True
+            raise
+
+    async def run_all():
+        assert remaining_time() is None
+        start_deadline(0.05)
+        assert timeout_within_deadline(60) <= 0.05
+        try:
+            await run_within_deadline(slow())
+            assert False, 'expected DeadlineExceededError'
+        except DeadlineExceededError:
+            pass
+        try:
+            timeout_within_deadline(60)
+            assert False, 'expected DeadlineExceededError'
+        except DeadlineExceededError:
+            pass
+
+    asyncio.run(run_all())
+    assert state['cancelled']
+
+if __name__ == "__main__":
+    test_circuit_breaker_opens_and_probes()
+    test_circuit_breaker_ignores_non_failures()
+    test_firecrawl_breaker_counts_only_upstream_failures()
+    test_hedged_request_races_slow_primary()
+    test_firecrawl_serves_cached_content_when_open()
+    test_firecrawl_calls_get_the_remaining_budget()
+    test_deadline_cancels_abandoned_work()
+    print("\n✅ All resilience tests passed!")
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.embedding_service import cosine_similarity, hash_embed
+from src.services.openai_service import OpenAIService
+from src.services.semantic_cache import SemanticCache
+from steps.source_chat_api_step import handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+def test_hash_embed_matches_rephrasings():
+    """Rephrasings score close to each other and far from unrelated questions"""
+    question = hash_embed('What is the main contribution of this paper?')
+    rephrased = hash_embed('what is the main contribution')
+    unrelated = hash_embed('How do I implement the training loop?')
+    print("Similarity:", cosine_similarity(question, rephrased), cosine_similarity(question, unrelated))
+    assert cosine_similarity(question, rephrased) > 0.9
+    assert cosine_similarity(question, unrelated) < 0.3
+
+def test_semantic_cache_lookup_and_eviction():
+    """Lookups are scoped by key; the least recently used answer is evicted"""
+    cache = SemanticCache(max_entries=2, threshold=0.9)
+    cache.store(('source', 1), hash_embed('main contribution'), 'answer-1')
+    cache.store(('source', 2), hash_embed('main contribution'), 'answer-2')
+
+    assert cache.lookup(('source', 1), hash_embed('the main contribution'))[0] == 'answer-1'
+    assert cache.lookup(('source', 3), hash_embed('main contribution')) is None
+
+    cache.store(('source', 1), hash_embed('training details'), 'answer-3')
+    assert cache.lookup(('source', 2), hash_embed('main contribution')) is None
+    assert cache.snapshot()['evictions'] == 1
+    assert cache.hit_rate() == round(1 / 3, 3)
+
+def test_source_chat_reuses_similar_answers():
+    """A rephrased question about the same source and mode is answered from cache"""
+    context = MockContext()
+    calls = []
+    original_create_completion = OpenAIService.create_completion
+
+    async def fake_create_completion(self, messages, **kwargs):
+        calls.append(messages[1]['content'])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='The main contribution is X.'))])
+
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({'title': 'Semantic Cache Test Paper', 'authors': ['A. Author']}))
+    OpenAIService.create_completion = fake_create_completion
+    try:
+        def chat(message, mode='summary'):
+            return asyncio.run(handler({
+                'pathParams': {'sourceId': str(source_id)},
+                'body': {'message': message, 'mode': mode}
+            }, context))
+
+        first = chat('What is the main contribution of this paper?')
+        second = chat('what is the main contribution')
+        other_mode = chat('what is the main contribution', mode='explanation')
+        print("Responses:", first['body'], second['body'], other_mode['body'])
+        assert first['body']['cached'] is False
+        assert second['body']['cached'] is True
+        assert second['body']['response'] == 'The main contribution is X.'
+        assert other_mode['body']['cached'] is False
+        assert len(calls) == 2
+    finally:
+        OpenAIService.create_completion = original_create_completion
+
+if __name__ == "__main__":
+    test_hash_embed_matches_rephrasings()
+    test_semantic_cache_lookup_and_eviction()
+    test_source_chat_reuses_similar_answers()
+    print("\n✅ All semantic cache tests passed!")
@@ -0,0 +1,73 @@
+import asyncio
+import sys
+import os
+import tempfile
+from types import SimpleNamespace
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.openai_service import OpenAIService
+from src.services.prompt_builder import source_content_hash
+from src.services.source_action_service import perform_action
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def warn(self, msg, data=None):
+        print(f"WARN: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+def test_artifacts_are_served_until_the_source_changes():
+    """Context-free actions are answered once per source content"""
+    logger = MockLogger()
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+    source_id = asyncio.run(database_service.insert_source({
+        'title': 'Sparse Attention', 'year': 2020, 'abstract': 'Sparse attention reduces quadratic cost.'
+    }))
+    calls = []
+    original_create_completion = OpenAIService.create_completion
+    original_key = os.environ.get('OPENAI_API_KEY')
+
+    async def fake_create_completion(self, messages, **kwargs):
+        calls.append(messages)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f'Outline {len(calls)}'))])
+
+    def run(action_type):
+        source = asyncio.run(database_service.get_source_by_id(source_id))
+        return asyncio.run(perform_action(source, action_type, '', logger))
+
+    try:
+        # Without an API key the mock response is returned but never stored
+        os.environ.pop('OPENAI_API_KEY', None)
+        response, cached = run('create_outline')
+        assert response.startswith('This is a mock response') and not cached
+        source = asyncio.run(database_service.get_source_by_id(source_id))
+        assert asyncio.run(database_service.get_source_artifact(source_id, 'create_outline', source_content_hash(source))) is None
+
+        os.environ['OPENAI_API_KEY'] = 'test-key'
+        OpenAIService.create_completion = fake_create_completion
+        assert run('create_outline') == ('Outline 1', False)
+        assert run('create_outline') == ('Outline 1', True)
+        # Actions that depend on request context are never materialized
+        assert run('explain_term') == ('Outline 2', False)
+        assert run('explain_term') == ('Outline 3', False)
+
+        # Updating the source drops its artifacts
+        asyncio.run(database_service.update_source(source_id, {'abstract': 'Now with linear cost.'}))
+        assert run('create_outline') == ('Outline 4', False)
+        assert run('create_outline') == ('Outline 4', True)
+        assert len(calls) == 4
+    finally:
+        OpenAIService.create_completion = original_create_completion
+        if original_key is None:
+            os.environ.pop('OPENAI_API_KEY', None)
+        else:
+            os.environ['OPENAI_API_KEY'] = original_key
+
+if __name__ == "__main__":
+    test_artifacts_are_served_until_the_source_changes()
+    print("\n✅ All source artifact tests passed!")
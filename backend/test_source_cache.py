@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import DatabaseService
+from src.services.ttl_cache import MISSING, TTLCache
+from src.services.types import Source
+
+SOURCE = {
+    'title': 'Sparse Attention for Long Documents',
+    'authors': ['A. Author', "B. O'Brien"],
+    'abstract': 'We introduce a sparse attention mechanism.',
+    'url': 'https://arxiv.org/abs/0000.00000',
+    'year': 2024,
+    'field': 'Machine Learning',
+    'type': 'Conference Paper'
+}
+
+def make_service():
+    service = DatabaseService()
+    service.db_path = os.path.join(tempfile.mkdtemp(), 'test.db')
+    asyncio.run(service.create_sources_table())
+    return service
+
+def test_ttl_cache_evicts_and_expires():
+    """Least recently used entries are evicted; expired entries miss"""
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is MISSING
+    cache.set('d', None, ttl_seconds=0)
+    assert cache.get('d') is MISSING
+    snapshot = cache.snapshot()
+    print("Cache:", snapshot)
+    assert snapshot['evictions'] == 2
+    assert snapshot['expirations'] == 1
+
+def test_get_source_by_id_reads_through_cache():
+    """Hot lookups are served without opening a connection"""
+    service = make_service()
+    source_id = asyncio.run(service.insert_source(SOURCE))
+
+    first = asyncio.run(service.get_source_by_id(source_id))
+    assert first.authors == SOURCE['authors']
+
+    def no_connection():
+        raise AssertionError('cache hit should not touch SQLite')
+
+    original_get_connection = service.get_connection
+    service.get_connection = no_connection
+    assert asyncio.run(service.get_source_by_id(source_id)) is first
+    assert asyncio.run(service.get_sources_by_ids([source_id])) == {source_id: first}
+    service.get_connection = original_get_connection
+
+    # Updates invalidate the cached record
+    asyncio.run(service.update_source(source_id, {'title': 'Renamed'}))
+    assert asyncio.run(service.get_source_by_id(source_id)).title == 'Renamed'
+    print("Source cache:", service.source_cache.snapshot())
+    assert service.source_cache.snapshot()['hits'] == 2
+
+def test_get_source_by_id_caches_not_found():
+    """Unknown IDs are cached as misses until a source is inserted under them"""
+    service = make_service()
+    assert asyncio.run(service.get_source_by_id(1)) is None
+    assert service.source_cache.get(1) is None
+
+    source_id = asyncio.run(service.insert_source(SOURCE))
+    assert source_id == 1
+    assert asyncio.run(service.get_source_by_id(1)).title == SOURCE['title']
+
+def test_search_sources_decodes_source_records():
+    """Rows are decoded straight into Source records and serialized on demand"""
+    service = make_service()
+    asyncio.run(service.insert_source(SOURCE))
+    results = asyncio.run(service.search_sources('Sparse', {}))
+    assert len(results) == 1
+    assert isinstance(results[0], Source)
+    assert results[0].authors == SOURCE['authors']
+    data = results[0].to_dict()
+    assert data['id'] == 1
+    assert {k: data[k] for k in SOURCE} == SOURCE
+
+if __name__ == "__main__":
+    test_ttl_cache_evicts_and_expires()
+    test_get_source_by_id_reads_through_cache()
+    test_get_source_by_id_caches_not_found()
+    test_search_sources_decodes_source_records()
+    print("\n✅ All source cache tests passed!")
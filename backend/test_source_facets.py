@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import DatabaseService
+
+def test_filters_and_facets():
+    """Normalized filters, year ranges and facet counts from one pass"""
+    topic = 'facet'
+    service = DatabaseService()
+    service.db_path = os.path.join(tempfile.mkdtemp(), 'test.db')
+
+    async def run():
+        await service.create_sources_table()
+        for title, field, source_type, year in [
+            ('A', 'Computer Science', 'Journal Article', 2019),
+            ('B', 'computer  science', 'Conference Paper', 2021),
+            ('C', 'Biology', 'Journal Article', 2021),
+            ('D', 'Biology', 'Journal Article', 2023),
+        ]:
+            await service.insert_source({'title': f'{topic} {title}', 'field': field, 'type': source_type, 'year': year})
+
+        # Field and type match on their normalized form, not as substrings
+        sources = await service.search_sources(topic, {'field': 'COMPUTER SCIENCE'})
+        assert sorted(s.title[-1] for s in sources) == ['A', 'B']
+        assert await service.search_sources(topic, {'field': 'Computer'}) == []
+
+        # Filters apply to every match, including title-only matches
+        sources = await service.search_sources(topic, {'yearFrom': 2020, 'yearTo': 2022})
+        assert sorted(s.title[-1] for s in sources) == ['B', 'C']
+        sources = await service.search_sources(topic, {'year': 2023})
+        assert [s.title[-1] for s in sources] == ['D']
+
+        facets = await service.source_facets(topic, {'field': 'biology'})
+        print("Facets:", facets)
+        # Each facet ignores its own filter but honours the others
+        assert facets['field'] == [{'value': 'Biology', 'count': 2}, {'value': 'Computer Science', 'count': 2}]
+        assert facets['type'] == [{'value': 'Journal Article', 'count': 2}]
+        assert facets['year'] == [{'value': 2023, 'count': 1}, {'value': 2021, 'count': 1}]
+
+    asyncio.run(run())
+
+    with service.get_connection() as conn:
+        plan = ' '.join(row[3] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM sources WHERE (title LIKE ? OR abstract LIKE ?) AND field_key = ? AND year >= ?',
+            ('%x%', '%x%', 'biology', 2020)
+        ))
+    assert 'idx_sources_field_year' in plan
+
+def test_existing_table_is_migrated():
+    """Older tables gain the facet columns, backfilled from field and type"""
+    service = DatabaseService()
+    service.db_path = os.path.join(tempfile.mkdtemp(), 'old.db')
+    with sqlite3.connect(service.db_path) as conn:
+        conn.execute("""
+            CREATE TABLE sources (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, authors TEXT, abstract TEXT,
+                url TEXT, year INTEGER, field TEXT, type TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO sources (title, field, type, year) VALUES ('Old', ' Neuro Science ', 'Book', 2001)")
+
+    asyncio.run(service.create_sources_table())
+    with sqlite3.connect(service.db_path) as conn:
+        assert conn.execute('SELECT field_key, type_key FROM sources').fetchone() == ('neuro science', 'book')
+    sources = asyncio.run(service.search_sources('Old', {'field': 'neuro science', 'yearTo': 2005}))
+    assert [s.title for s in sources] == ['Old']
+
+if __name__ == "__main__":
+    test_filters_and_facets()
+    test_existing_table_is_migrated()
+    print("\n✅ All source facet tests passed!")
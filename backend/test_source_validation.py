@@ -0,0 +1,135 @@
+import asyncio
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.getcwd())
+
+from src.services.database_service import database_service
+from src.services.local_validator import validate_locally
+from steps.source_validation_api_step import handler
+from steps.source_validation_batch_api_step import handler as batch_handler
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+    def error(self, msg, data=None):
+        print(f"ERROR: {msg}", data or "")
+
+class MockContext:
+    def __init__(self):
+        self.logger = MockLogger()
+
+SOURCE_TEXT = """Title: Sparse Attention for Long Documents
+
+Abstract: We introduce BigBird, a sparse attention mechanism that reduces the
+quadratic dependency on sequence length to linear. On the arXiv benchmark it
+reaches 92.3% accuracy with 4096 tokens of context."""
+
+def test_validate_locally():
+    """Grounded responses score high; invented facts score low"""
+    grounded = validate_locally(
+        'BigBird is a sparse attention mechanism that reduces the quadratic dependency on sequence length to linear, '
+        'reaching 92.3% accuracy with 4096 tokens.',
+        SOURCE_TEXT
+    )
+    print("Grounded:", grounded)
+    assert grounded['confidence'] >= 0.75
+    assert grounded['issues'] == []
+
+    invented = validate_locally(
+        'Longformer reaches 97.1% accuracy, described as "the best model ever trained on documents".',
+        SOURCE_TEXT
+    )
+    print("Invented:", invented)
+    assert invented['confidence'] < 0.5
+    assert len(invented['issues']) == 3
+
+    quoted = validate_locally('The authors state "reduces the quadratic dependency on sequence length".', SOURCE_TEXT, {'must_cite_sources': True})
+    assert quoted['signals']['quoteSupport'] == 1.0
+    assert not quoted['needsModel']
+
+def test_source_validation_api():
+    """Test the source validation API handler"""
+    context = MockContext()
+    database_service.use_database(os.path.join(tempfile.mkdtemp(), 'test.db'))
+    asyncio.run(database_service.create_sources_table())
+
+    print("Testing Source Validation API...")
+
+    # Test 1: Missing AI response
+    print("\n1. Testing missing AI response...")
+    response = asyncio.run(handler({'queryParams': {'sourceId': '1'}, 'body': {}}, context))
+    print(f"Status: {response['status']}")
+    assert response['status'] == 400
+
+    # Test 2: Non-numeric source ID
+    print("\n2. Testing non-numeric source ID...")
+    response = asyncio.run(handler({
+        'queryParams': {'sourceId': 'abc'},
+        'body': {'aiResponse': 'This is a test abstract'}
+    }, context))
+    print(f"Status: {response['status']}")
+    assert response['status'] == 400
+
+    # Test 3: Unknown source
+    print("\n3. Testing unknown source...")
+    response = asyncio.run(handler({
+        'queryParams': {'sourceId': '999'},
+        'body': {'aiResponse': 'This is a test abstract'}
+    }, context))
+    print(f"Status: {response['status']}")
+    assert response['status'] == 404
+
+    # Test 4: Valid request
+    print("\n4. Testing valid request...")
+    source_id = asyncio.run(database_service.insert_source({
+        'title': 'Sparse Attention for Long Documents',
+        'abstract': 'We introduce BigBird, a sparse attention mechanism that reduces the quadratic dependency on sequence length to linear.'
+    }))
+    response = asyncio.run(handler({
+        'queryParams': {'sourceId': str(source_id)},
+        'body': {'aiResponse': 'BigBird is a sparse attention mechanism that reduces the quadratic dependency on sequence length.'}
+    }, context))
+    print(f"Status: {response['status']}")
+    print(f"Body: {response['body']}")
+    assert response['status'] == 200
+    assert response['body']['validationMethod'] == 'local'
+
+    print("\n✅ All validation tests passed!")
+
+def test_source_validation_batch_api():
+    """Test the batch validation API handler"""
+    context = MockContext()
+
+    print("Testing Source Validation Batch API...")
+
+    # Test 1: Missing items
+    print("\n1. Testing missing items...")
+    response = asyncio.run(batch_handler({'body': {}}, context))
+    print(f"Status: {response['status']}")
+    assert response['status'] == 400
+
+    # Test 2: Per-item reports come back in request order
+    print("\n2. Testing per-item results...")
+    response = asyncio.run(batch_handler({'body': {'items': [
+        {'sourceId': '1', 'aiResponse': 'This is a test abstract'},
+        {'sourceId': '1'},
+        {'sourceId': 'not-a-number', 'aiResponse': 'Anything'},
+        'oops'
+    ]}}, context))
+    print(f"Status: {response['status']}")
+    print(f"Results: {response['body']['results']}")
+    assert response['status'] == 200
+    assert [r['index'] for r in response['body']['results']] == [0, 1, 2, 3]
+    assert response['body']['results'][1]['status'] == 400
+    assert response['body']['results'][2]['status'] == 404
+    # A malformed item fails on its own, not the whole batch
+    assert response['body']['results'][3]['status'] == 400
+
+    print("\n✅ All batch validation tests passed!")
+
+if __name__ == "__main__":
+    test_validate_locally()
+    test_source_validation_api()
+    test_source_validation_batch_api()
@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+from src.services.prompt_builder import build_budgeted_source_messages
+from src.services.token_budget import DEFAULT_CONTEXT_WINDOW, PromptTooLargeError, TokenBudget
+from src.services.types import Source
+
+TEXT = 'Sparse attention reduces the quadratic cost of transformers on long documents. ' * 40
+
+def estimating_budget():
+    """A budget that uses the character estimate, as when tiktoken can't load"""
+    budget = TokenBudget()
+    budget._encodings['gpt-4'] = None
+    return budget
+
+def test_context_windows_match_longest_prefix():
+    """Model names resolve to the most specific family in the table"""
+    budget = TokenBudget()
+    assert budget.context_window('gpt-4') == 8192
+    assert budget.context_window('gpt-4-0613') == 8192
+    assert budget.context_window('gpt-4-32k-0613') == 32768
+    assert budget.context_window('gpt-4o-2024-08-06') == 128000
+    assert budget.context_window('gpt-4o-mini') == 128000
+    assert budget.context_window('gpt-4.1-mini') == 1047576
+    assert budget.context_window('some-other-model') == DEFAULT_CONTEXT_WINDOW
+    assert budget.prompt_budget('gpt-4') == 8192 - 1024
+    assert budget.prompt_budget('gpt-4', completion_reserve=10000) == 0
+
+def test_character_estimate():
+    """Without a tokenizer, counts, truncation and chunks use four characters per token"""
+    budget = estimating_budget()
+    assert budget.count('', 'gpt-4') == 0
+    assert budget.count('abcde', 'gpt-4') == 2
+    assert budget.count_messages([{'role': 'user', 'content': 'abcd'}, {'role': 'user', 'content': None}], 'gpt-4') == 9
+    assert budget.truncate('abcdefghij', 2, 'gpt-4') == 'abcdefgh'
+    assert budget.truncate('abcdefghij', 0, 'gpt-4') == ''
+    assert budget.chunk('abcdefghij', 1, 'gpt-4') == ['abcd', 'efgh', 'ij']
+    assert budget.chunk('', 1, 'gpt-4') == []
+
+def test_truncate_and_chunk_respect_the_budget():
+    """Truncated text and every chunk fit the limit, and chunks cover the text"""
+    budget = TokenBudget()
+    total = budget.count(TEXT, 'gpt-4')
+    assert total > 100
+    assert budget.truncate(TEXT, total, 'gpt-4') == TEXT
+    truncated = budget.truncate(TEXT, 50, 'gpt-4')
+    assert TEXT.startswith(truncated)
+    assert 0 < budget.count(truncated, 'gpt-4') <= 50
+
+    chunks = budget.chunk(TEXT, 50, 'gpt-4')
+    assert ''.join(chunks) == TEXT
+    assert len(chunks) == -(-total // 50)
+    assert all(budget.count(chunk, 'gpt-4') <= 50 for chunk in chunks)
+
+def test_source_counts_are_cached_by_content():
+    """A source is counted once per content hash; the oldest counts are evicted"""
+    budget = TokenBudget(max_cached_sources=2)
+    assert budget.count_source(1, 'hash-a', TEXT, 'gpt-4') == budget.count(TEXT, 'gpt-4')
+    # A cached count is returned for the same content without re-counting
+    assert budget.count_source(1, 'hash-a', 'ignored', 'gpt-4') == budget.count(TEXT, 'gpt-4')
+    assert budget.count_source(1, 'hash-b', 'abcd', 'gpt-4') == budget.count('abcd', 'gpt-4')
+    budget.count_source(2, 'hash-c', 'abcd', 'gpt-4')
+    assert budget.count_source(1, 'hash-a', 'abcd', 'gpt-4') == budget.count('abcd', 'gpt-4')
+
+class MockLogger:
+    def info(self, msg, data=None):
+        print(f"INFO: {msg}", data or "")
+
+def test_oversized_prompts_are_rejected_locally():
+    """Only the source is trimmed; an instruction that can't fit raises before any call"""
+    budget = TokenBudget()
+    assert budget.room_for(1000, 'gpt-4') == budget.prompt_budget('gpt-4') - 1000
+    try:
+        budget.room_for(budget.prompt_budget('gpt-4'), 'gpt-4')
+        assert False, 'expected PromptTooLargeError'
+    except PromptTooLargeError as error:
+        assert error.budget == budget.prompt_budget('gpt-4')
+
+    source = Source(1, 'Sparse Attention', [], TEXT * 20, None, 2020, None, None, None)
+    messages = build_budgeted_source_messages(source, 'Summarize.', 'gpt-4', MockLogger())
+    assert messages[-1]['content'] == 'Summarize.'
+    try:
+        build_budgeted_source_messages(source, 'Summarize this. ' * 5000, 'gpt-4', MockLogger())
+        assert False, 'expected PromptTooLargeError'
+    except PromptTooLargeError as error:
+        assert error.tokens > error.budget
+
+if __name__ == "__main__":
+    test_context_windows_match_longest_prefix()
+    test_character_estimate()
+    test_truncate_and_chunk_respect_the_budget()
+    test_source_counts_are_cached_by_content()
+    test_oversized_prompts_are_rejected_locally()
+    print("\n✅ All token budget tests passed!")